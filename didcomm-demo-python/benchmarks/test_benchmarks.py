@@ -0,0 +1,28 @@
+# Run with pytest-benchmark installed (pip install -e .[bench]):
+#   pytest benchmarks --benchmark-json=bench.json
+import pytest
+
+from didcomm_demo.bench import bench_cases, DEFAULT_MESSAGE_SIZES
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.secrets_resolver_sqlite import SecretsResolverSqlite
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture(scope="module")
+def demo(tmp_path_factory):
+    secrets_resolver = SecretsResolverSqlite(tmp_path_factory.mktemp("bench") / "secrets.db")
+    yield DIDCommDemo(secrets_resolver)
+    secrets_resolver.close()
+
+
+# the cases are only listed here (their setup is not called), so no demo instance is needed yet
+CASE_IDS = [name + "-" + "-".join(str(v) for v in params.values())
+            for name, params, _ in bench_cases(None, DEFAULT_MESSAGE_SIZES)]
+
+
+@pytest.mark.parametrize("index", [pytest.param(i, id=case_id) for i, case_id in enumerate(CASE_IDS)])
+def test_benchmark(benchmark, demo, index):
+    name, params, setup = list(bench_cases(demo, DEFAULT_MESSAGE_SIZES))[index]
+    benchmark.extra_info.update(params)
+    benchmark(setup())
@@ -0,0 +1,184 @@
+import json
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Callable, List, Optional, Iterator, Tuple
+
+from didcomm.pack_encrypted import PackEncryptedConfig
+from peerdid.types import VerificationMaterialFormatPeerDID
+
+from didcomm_demo.connection import Connection
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.peer_did_doc import resolve_peer_did_doc, resolve_peer_did_doc_json, clear_segment_caches
+from didcomm_demo.secrets_resolver_sqlite import SecretsResolverSqlite
+
+DEFAULT_MESSAGE_SIZES = (64, 4096, 65536)
+MULTICAST_RECIPIENTS = 8
+
+PACK_VARIANTS = {
+    "anoncrypt": dict(authcrypt=False, signed=False, protect_sender_id=True),
+    "authcrypt": dict(authcrypt=True, signed=False, protect_sender_id=False),
+    "authcrypt-protect-sender-id": dict(authcrypt=True, signed=False, protect_sender_id=True),
+    "authcrypt-signed": dict(authcrypt=True, signed=True, protect_sender_id=True),
+}
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    name: str
+    params: dict
+    iterations: int
+    ops_per_sec: float
+    p50_ms: float
+    p99_ms: float
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def measure(name: str, params: dict, op: Callable[[], object], iterations: int, warmup: int = 1) -> BenchResult:
+    for _ in range(warmup):
+        op()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        op()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    total = sum(timings)
+    return BenchResult(
+        name=name,
+        params=params,
+        iterations=iterations,
+        ops_per_sec=iterations / total if total > 0 else float("inf"),
+        p50_ms=_percentile(timings, 0.5) * 1000,
+        p99_ms=_percentile(timings, 0.99) * 1000
+    )
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def bench_cases(demo: DIDCommDemo,
+                message_sizes=DEFAULT_MESSAGE_SIZES) -> Iterator[Tuple[str, dict, Callable[[], Callable[[], object]]]]:
+    # (name, params, setup) triples; setup is called once and returns the operation to be measured
+
+    # 1. create_peer_did
+    for auth_keys_count, agreement_keys_count in ((1, 0), (1, 1), (2, 2), (5, 5)):
+        params = dict(numalgo=0 if (auth_keys_count, agreement_keys_count) == (1, 0) else 2,
+                      auth_keys_count=auth_keys_count, agreement_keys_count=agreement_keys_count)
+        yield "create_peer_did", params, lambda a=auth_keys_count, b=agreement_keys_count: (
+            lambda: demo.create_peer_did(auth_keys_count=a, agreement_keys_count=b)
+        )
+
+    # 2. resolve_peer_did
+    for numalgo in (0, 2):
+        for format in (VerificationMaterialFormatPeerDID.JWK, VerificationMaterialFormatPeerDID.MULTIBASE):
+            def setup(n=numalgo, f=format):
+                did = demo.create_peer_did(auth_keys_count=1, agreement_keys_count=0 if n == 0 else 1)
+                return lambda: DIDCommDemo.resolve_peer_did(did, f)
+
+            yield "resolve_peer_did", dict(numalgo=numalgo, format=format.name.lower()), setup
+
+    # 3. resolve_did_doc: peer DID -> DID Doc through the JSON DID Doc of the peer DID lib or directly
+    # (with the decoded segments memoized, or decoded again for each call with "direct-cold")
+    for numalgo in (0, 2):
+        for path in ("json", "direct", "direct-cold"):
+            def setup(n=numalgo, p=path):
+                if n == 0:
+                    did = demo.create_peer_did(auth_keys_count=1, agreement_keys_count=0)
+                else:
+                    did = demo.create_peer_did(service_endpoint="http://mediator/",
+                                               service_routing_keys=["did:example:mediator#key-1"])
+                if p == "json":
+                    return lambda: resolve_peer_did_doc_json(did)
+                if p == "direct":
+                    return lambda: resolve_peer_did_doc(did)
+                return lambda: (clear_segment_caches(), resolve_peer_did_doc(did))
+
+            yield "resolve_did_doc", dict(numalgo=numalgo, format="jwk", path=path), setup
+
+    # 4. pack / unpack
+    for variant, options in PACK_VARIANTS.items():
+        for size in message_sizes:
+            params = dict(variant=variant, message_size=size)
+            yield "pack", params, lambda o=options, s=size: _pack_op(demo, s, **o)
+            yield "unpack", params, lambda o=options, s=size: _unpack_op(demo, s, **o)
+
+    # 5. connection_send: the body as a dict or as its JSON in bytes (spliced into the message template as is)
+    for body in ("dict", "bytes"):
+        for size in message_sizes:
+            yield "connection_send", dict(body=body, message_size=size), \
+                lambda b=body, s=size: _connection_send_op(demo, s, b)
+
+    # 6. pack_multicast: a signed message to several recipients, signed for each of them or once
+    for sign_once in (False, True):
+        for size in message_sizes:
+            yield "pack_multicast", dict(sign_once=sign_once, recipients=MULTICAST_RECIPIENTS, message_size=size), \
+                lambda o=sign_once, s=size: _pack_multicast_op(demo, s, o)
+
+
+def _pack_op(demo: DIDCommDemo, size: int, authcrypt: bool, signed: bool, protect_sender_id: bool):
+    frm = demo.create_peer_did() if authcrypt or signed else None
+    to = demo.create_peer_did()
+    msg = "x" * size
+    return lambda: demo.pack(
+        msg=msg,
+        to=to,
+        frm=frm if authcrypt else None,
+        sign_frm=frm if signed else None,
+        config=PackEncryptedConfig(protect_sender_id=protect_sender_id)
+    )
+
+
+def _unpack_op(demo: DIDCommDemo, size: int, authcrypt: bool, signed: bool, protect_sender_id: bool):
+    packed_msg = _pack_op(demo, size, authcrypt, signed, protect_sender_id)().packed_msg
+    return lambda: demo.unpack(packed_msg)
+
+
+def _connection_send_op(demo: DIDCommDemo, size: int, body: str):
+    connection = Connection(demo, demo.create_peer_did(), demo.create_peer_did())
+    msg = "x" * size
+    if body == "dict":
+        return lambda: connection.send(msg)
+    body_json = json.dumps({"msg": msg}).encode()
+    return lambda: connection.send(body=body_json)
+
+
+def _pack_multicast_op(demo: DIDCommDemo, size: int, sign_once: bool):
+    frm = demo.create_peer_did()
+    to = [demo.create_peer_did() for _ in range(MULTICAST_RECIPIENTS)]
+    msg = "x" * size
+    return lambda: demo.pack_multicast(msg, to, frm=frm, sign_frm=frm, sign_once=sign_once)
+
+
+def run_benchmarks(iterations: int = 100,
+                   message_sizes=DEFAULT_MESSAGE_SIZES,
+                   name_filter: Optional[str] = None,
+                   demo: Optional[DIDCommDemo] = None) -> List[BenchResult]:
+    # by default, secrets are kept in a temporary SQLite store, so that the store size does not skew the results
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        secrets_resolver = None
+        if demo is None:
+            secrets_resolver = SecretsResolverSqlite(Path(tmp_dir) / "secrets.db")
+            demo = DIDCommDemo(secrets_resolver)
+        try:
+            return [
+                measure(name, params, setup(), iterations)
+                for name, params, setup in bench_cases(demo, message_sizes)
+                if name_filter is None or fnmatchcase(name, name_filter)
+            ]
+        finally:
+            if secrets_resolver is not None:
+                secrets_resolver.close()
+
+
+def format_results(results: List[BenchResult]) -> str:
+    lines = [f"{'benchmark':<70} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}"]
+    for r in results:
+        name = r.name + " " + " ".join(f"{k}={v}" for k, v in r.params.items())
+        lines.append(f"{name:<70} {r.ops_per_sec:>10.1f} {r.p50_ms:>9.3f} {r.p99_ms:>9.3f}")
+    return "\n".join(lines)
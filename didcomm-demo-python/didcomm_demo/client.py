@@ -0,0 +1,50 @@
+import itertools
+import json
+import socket
+from typing import Optional
+
+
+class DIDCommClient:
+    """
+    Client of a `DIDCommServer` listening on a Unix socket.
+
+    It needs only the standard library, so that a CLI command forwarded to the server starts fast.
+    """
+
+    def __init__(self, sock: socket.socket) -> None:
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def connect(cls, path: str) -> Optional["DIDCommClient"]:
+        # returns None if no server is running on the path
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            return None
+        return cls(sock)
+
+    def call(self, command: str, **args) -> dict:
+        request_id = next(self._ids)
+        request = {"id": request_id, "command": command, "args": args}
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection")
+        response = json.loads(line)
+        response.pop("id", None)
+        return response
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
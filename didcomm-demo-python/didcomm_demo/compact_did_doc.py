@@ -0,0 +1,96 @@
+from typing import List, Optional
+
+from authlib.jose.rfc7517 import AsymmetricKey
+from didcomm.common.types import DID, DID_URL, VerificationMethodType, VerificationMaterial, \
+    VerificationMaterialFormat
+from didcomm.core.utils import extract_key
+from didcomm.did_doc.did_doc import DIDDoc, VerificationMethod, DIDCommService
+
+
+class CompactVerificationMethod(VerificationMethod):
+    """
+    `VerificationMethod` of a JWK public key.
+
+    The key is parsed on first use and kept (see `key`), so it's not parsed again for every message.
+    It must be a `VerificationMethod` (the DIDComm lib checks the type to parse its key),
+    so unlike `CompactDIDDoc` it has a `__dict__` inherited from the (non-slotted) dataclass.
+    """
+
+    def __init__(self, id: DID_URL, controller: str, jwk: str) -> None:
+        self.id = id
+        self.controller = controller
+        self.jwk = jwk
+        self._key = None
+
+    @property
+    def type(self) -> VerificationMethodType:
+        return VerificationMethodType.JSON_WEB_KEY_2020
+
+    @property
+    def verification_material(self) -> VerificationMaterial:
+        return VerificationMaterial(format=VerificationMaterialFormat.JWK, value=self.jwk)
+
+    @property
+    def key(self) -> AsymmetricKey:
+        if self._key is None:
+            self._key = extract_key(self)
+        return self._key
+
+    def __eq__(self, other):
+        if not isinstance(other, VerificationMethod):
+            return NotImplemented
+        return (self.id, self.type, self.controller, self.verification_material) == \
+               (other.id, other.type, other.controller, other.verification_material)
+
+
+class CompactDIDDoc:
+    """
+    DID Doc with the verification methods indexed by kid.
+
+    It implements the interface of `DIDDoc` without being one: a subclass of the (non-slotted) dataclass
+    would have a `__dict__` whatever its `__slots__`, and the attributes are only kept in slots here.
+    """
+
+    __slots__ = ("did", "key_agreement_kids", "authentication_kids", "verification_methods", "didcomm_services",
+                 "_methods")
+
+    def __init__(self,
+                 did: DID,
+                 key_agreement_kids: List[DID_URL],
+                 authentication_kids: List[DID_URL],
+                 verification_methods: List[CompactVerificationMethod],
+                 didcomm_services: List[DIDCommService]) -> None:
+        self.did = did
+        self.key_agreement_kids = key_agreement_kids
+        self.authentication_kids = authentication_kids
+        self.verification_methods = verification_methods
+        self.didcomm_services = didcomm_services
+        self._methods = {m.id: m for m in verification_methods}
+
+    def get_verification_method(self, id: DID_URL) -> Optional[CompactVerificationMethod]:
+        return self._methods.get(id)
+
+    def get_didcomm_service(self, id: str) -> Optional[DIDCommService]:
+        return next((s for s in self.didcomm_services if s.id == id), None)
+
+    def get_key(self, kid: DID_URL) -> Optional[AsymmetricKey]:
+        method = self._methods.get(kid)
+        return method.key if method is not None else None
+
+    def __eq__(self, other):
+        if not isinstance(other, (DIDDoc, CompactDIDDoc)):
+            return NotImplemented
+        return (self.did, self.key_agreement_kids, self.authentication_kids, self.verification_methods,
+                self.didcomm_services) == \
+               (other.did, other.key_agreement_kids, other.authentication_kids, other.verification_methods,
+                other.didcomm_services)
+
+    def __repr__(self):
+        return f"CompactDIDDoc(did={self.did!r}, key_agreement_kids={self.key_agreement_kids!r}, " \
+               f"authentication_kids={self.authentication_kids!r}, " \
+               f"verification_methods={self.verification_methods!r}, didcomm_services={self.didcomm_services!r})"
+
+
+def extract_public_key(method: VerificationMethod) -> AsymmetricKey:
+    # the key kept by a compact verification method, or parsed now for any other one
+    return method.key if isinstance(method, CompactVerificationMethod) else extract_key(method)
@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from typing import Optional, List, Dict
+
+from authlib.common.encoding import to_bytes, to_unicode, urlsafe_b64decode
+from authlib.jose import JsonWebEncryption
+from didcomm.common.types import DID, DID_URL
+from didcomm.core.anoncrypt import anoncrypt, is_anoncrypted
+from didcomm.core.authcrypt import is_authcrypted, _build_header as _build_authcrypt_header
+from didcomm.core.keys.authcrypt_keys_selector import find_authcrypt_pack_sender_and_recipient_keys
+from didcomm.core.serialization import dict_to_json, json_str_to_dict, json_bytes_to_dict
+from didcomm.core.types import Key
+from didcomm.core.utils import extract_key
+from didcomm.core.validation import validate_anoncrypt_jwe, validate_authcrypt_jwe
+from didcomm.errors import MalformedMessageError, MalformedMessageCode, DIDUrlNotFoundError
+from didcomm.message import Message
+from didcomm.pack_encrypted import PackEncryptedConfig, PackEncryptedResult
+
+from didcomm_demo.compact_did_doc import extract_public_key
+from didcomm_demo.didcomm_demo import DIDCommDemo, _run
+from didcomm_demo.message_template import MessageTemplate, MessageBody, MessageAttachment, DEFAULT_MESSAGE_TYPE
+
+
+@dataclass(frozen=True)
+class _ConnectionKeys:
+    # my key agreement key used for sending and their keys compatible with it
+    sender: Key
+    recipients: List[Key]
+    # all key agreement keys of both sides (with secrets for mine) by kid, for receiving
+    mine: Dict[DID_URL, Key]
+    theirs: Dict[DID_URL, Key]
+
+
+class Connection:
+    """
+    Pairwise connection between `my_did` and `their_did`.
+
+    Both DIDs are resolved, the keys are selected, and my secrets are loaded once (on the first use),
+    so `send` and `receive` only encrypt and decrypt.
+    Messages are authcrypted (and anoncrypted if `protect_sender_id` of the config is set)
+    and can be unpacked by `DIDCommDemo.unpack` as well.
+    They are serialized by a `MessageTemplate` per message type, so large bodies can be sent from `bytes`.
+
+    Call `invalidate` when the secrets or DID Docs change, so that the keys are loaded again.
+    """
+
+    def __init__(self,
+                 demo: DIDCommDemo,
+                 my_did: DID,
+                 their_did: DID,
+                 config: Optional[PackEncryptedConfig] = None) -> None:
+        self.demo = demo
+        self.my_did = my_did
+        self.their_did = their_did
+        self.config = config or PackEncryptedConfig(protect_sender_id=True)
+        self._keys: Optional[_ConnectionKeys] = None
+        # precompiled message headers by message type
+        self._templates: Dict[str, MessageTemplate] = {}
+
+    def invalidate(self):
+        self._keys = None
+
+    async def _load_keys(self) -> _ConnectionKeys:
+        if self._keys is not None:
+            return self._keys
+
+        with self.demo.instrumentation.stage("connection.load_keys"):
+            resolvers_config = self.demo.resolvers_config
+            pack_keys = await find_authcrypt_pack_sender_and_recipient_keys(
+                self.my_did, self.their_did, resolvers_config
+            )
+            my_did_doc = await resolvers_config.did_resolver.resolve(self.my_did)
+            their_did_doc = await resolvers_config.did_resolver.resolve(self.their_did)
+
+            mine = {}
+            for kid in await resolvers_config.secrets_resolver.get_keys(my_did_doc.key_agreement_kids):
+                secret = await resolvers_config.secrets_resolver.get_key(kid)
+                if secret is not None:
+                    mine[kid] = Key(kid=kid, key=extract_key(secret))
+            theirs = {
+                kid: Key(kid=kid, key=extract_public_key(their_did_doc.get_verification_method(kid)))
+                for kid in their_did_doc.key_agreement_kids
+            }
+            self._keys = _ConnectionKeys(
+                sender=mine[pack_keys.sender_private_key.kid],
+                recipients=[theirs[vm.id] for vm in pack_keys.recipient_public_keys],
+                mine=mine,
+                theirs=theirs
+            )
+        return self._keys
+
+    def send(self,
+             msg: Optional[str] = None,
+             body: Optional[MessageBody] = None,
+             type: str = DEFAULT_MESSAGE_TYPE,
+             attachments: Optional[List[MessageAttachment]] = None) -> PackEncryptedResult:
+        return _run(self.send_async(msg, body=body, type=type, attachments=attachments))
+
+    async def send_async(self,
+                         msg: Optional[str] = None,
+                         body: Optional[MessageBody] = None,
+                         type: str = DEFAULT_MESSAGE_TYPE,
+                         attachments: Optional[List[MessageAttachment]] = None) -> PackEncryptedResult:
+        # the body is {"msg": msg} unless given (as a dict or as its JSON in bytes or a memoryview)
+        keys = await self._load_keys()
+        with self.demo.instrumentation.stage("connection.send"):
+            template = self._templates.get(type)
+            if template is None:
+                template = self._templates[type] = MessageTemplate(type, self.my_did, [self.their_did])
+            plaintext = template.serialize(body if body is not None else {"msg": msg}, attachments)
+            # authcrypt() of the DIDComm lib takes a dict, so the plaintext is encrypted as is here
+            packed_msg = JsonWebEncryption().serialize_json(
+                _build_authcrypt_header(keys.recipients, keys.sender, self.config.enc_alg_auth),
+                plaintext,
+                [k.key for k in keys.recipients],
+                sender_key=keys.sender.key
+            )
+            if self.config.protect_sender_id:
+                packed_msg = anoncrypt(packed_msg, keys.recipients, self.config.enc_alg_anon).msg
+            return PackEncryptedResult(
+                packed_msg=dict_to_json(packed_msg),
+                to_kids=[k.kid for k in keys.recipients],
+                from_kid=keys.sender.kid,
+                sign_from_kid=None,
+                from_prior_issuer_kid=None,
+                service_metadata=None
+            )
+
+    def receive(self, packed_msg: str) -> Optional[str]:
+        return _run(self.receive_async(packed_msg))
+
+    async def receive_async(self, packed_msg: str) -> Optional[str]:
+        # returns the message text (the "msg" of the body)
+        return (await self.receive_message_async(packed_msg)).body.get("msg")
+
+    def receive_message(self, packed_msg: str) -> Message:
+        return _run(self.receive_message_async(packed_msg))
+
+    async def receive_message_async(self, packed_msg: str) -> Message:
+        # accepts messages authcrypted from `their_did` to `my_did` (optionally anoncrypted as well)
+        keys = await self._load_keys()
+        with self.demo.instrumentation.stage("connection.receive"):
+            msg = json_str_to_dict(packed_msg)
+            if is_anoncrypted(msg):
+                validate_anoncrypt_jwe(msg)
+                msg = json_bytes_to_dict(self._decrypt(keys, msg))
+            if not is_authcrypted(msg):
+                raise MalformedMessageError(MalformedMessageCode.CAN_NOT_DECRYPT)
+
+            protected = validate_authcrypt_jwe(msg)
+            frm_kid = protected.get("skid") or to_unicode(urlsafe_b64decode(to_bytes(protected["apu"])))
+            sender_key = keys.theirs.get(frm_kid)
+            if sender_key is None:
+                raise DIDUrlNotFoundError(f"`{frm_kid}` is not a keyAgreement key of `{self.their_did}`")
+
+            message = Message.from_json(self._decrypt(keys, msg, sender_key))
+            if message.frm is not None and message.frm != self.their_did:
+                raise MalformedMessageError(MalformedMessageCode.INVALID_PLAINTEXT)
+            return message
+
+    def _decrypt(self, keys: _ConnectionKeys, msg: dict, sender_key: Optional[Key] = None) -> bytes:
+        to_keys = [keys.mine[r["header"]["kid"]] for r in msg["recipients"] if r["header"]["kid"] in keys.mine]
+        if not to_keys:
+            raise DIDUrlNotFoundError(f"The message is not encrypted to any keyAgreement key of `{self.my_did}`")
+        for to_key in to_keys:
+            try:
+                return JsonWebEncryption().deserialize_json(
+                    msg, (to_key.kid, to_key.key), sender_key=sender_key.key if sender_key else None
+                )["payload"]
+            except Exception as e:
+                error = e
+        raise MalformedMessageError(MalformedMessageCode.CAN_NOT_DECRYPT) from error
@@ -0,0 +1,15 @@
+from didcomm.common.types import DID
+from didcomm.did_doc.did_doc import DIDDoc
+
+from didcomm_demo.lru_cache import LRUCache, LRUCacheStats
+
+DIDDocCacheStats = LRUCacheStats
+
+
+class DIDDocCache(LRUCache[DID, DIDDoc]):
+    """
+    Bounded thread-safe LRU cache of resolved DID Docs keyed by DID.
+
+    Peer DIDs are self-certifying, so a resolved DID Doc never changes and can be kept until evicted.
+    The same instance can be shared by several resolvers (and so by several `DIDCommDemo` instances).
+    """
@@ -0,0 +1,102 @@
+import json
+import sqlite3
+import threading
+from typing import Optional, List, Tuple
+
+from didcomm.common.types import DID, DID_URL
+from didcomm.did_doc.did_doc import DIDDoc, DIDCommService
+
+from didcomm_demo.compact_did_doc import CompactDIDDoc, CompactVerificationMethod
+
+
+class DIDDocIndexSqlite:
+    """
+    Persistent index of resolved DID Docs backed by a SQLite database, keyed by DID and by kid.
+
+    Nothing is loaded up front: the database is opened on first access, and each DID Doc is read
+    (by the primary key index) only when it's requested, so a restart doesn't re-resolve all known peer DIDs.
+    The same instance can be shared by several resolvers.
+    """
+
+    def __init__(self, file_path="did_docs.db"):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # must be called with the lock held
+        if self._conn is None:
+            self._conn = sqlite3.connect(str(self.file_path), check_same_thread=False)
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS did_docs (did TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS kids (kid TEXT PRIMARY KEY, did TEXT NOT NULL)")
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get(self, did: DID) -> Optional[CompactDIDDoc]:
+        with self._lock:
+            row = self._connection().execute("SELECT doc FROM did_docs WHERE did = ?", (did,)).fetchone()
+        return _load_did_doc(did, row[0]) if row else None
+
+    def get_by_kid(self, kid: DID_URL) -> Optional[CompactDIDDoc]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT did_docs.did, did_docs.doc FROM kids JOIN did_docs ON kids.did = did_docs.did "
+                "WHERE kids.kid = ?", (kid,)
+            ).fetchone()
+        return _load_did_doc(*row) if row else None
+
+    def find_did(self, kid: DID_URL) -> Optional[DID]:
+        with self._lock:
+            row = self._connection().execute("SELECT did FROM kids WHERE kid = ?", (kid,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, did: DID, did_doc: DIDDoc):
+        self.put_many([(did, did_doc)])
+
+    def put_many(self, did_docs: List[Tuple[DID, DIDDoc]]):
+        # stores any number of DID Docs in a single transaction
+        docs = [(did, _dump_did_doc(did_doc)) for did, did_doc in did_docs]
+        kids = [(m.id, did) for did, did_doc in did_docs for m in did_doc.verification_methods]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO did_docs (did, doc) VALUES (?, ?)", docs)
+                conn.executemany("INSERT OR REPLACE INTO kids (kid, did) VALUES (?, ?)", kids)
+
+    def __contains__(self, did: DID) -> bool:
+        with self._lock:
+            return self._connection().execute("SELECT 1 FROM did_docs WHERE did = ?", (did,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM did_docs").fetchone()[0]
+
+
+def _dump_did_doc(did_doc: DIDDoc) -> str:
+    # the DID is the key of the row and the controller of the methods, so it's not stored in the document
+    return json.dumps({
+        "ka": did_doc.key_agreement_kids,
+        "auth": did_doc.authentication_kids,
+        "vm": [[m.id, m.verification_material.value] for m in did_doc.verification_methods],
+        "s": [[s.id, s.service_endpoint, s.routing_keys, s.accept] for s in did_doc.didcomm_services]
+    })
+
+
+def _load_did_doc(did: DID, doc: str) -> CompactDIDDoc:
+    doc = json.loads(doc)
+    return CompactDIDDoc(
+        did=did,
+        key_agreement_kids=doc["ka"],
+        authentication_kids=doc["auth"],
+        verification_methods=[CompactVerificationMethod(id=id, controller=did, jwk=jwk) for id, jwk in doc["vm"]],
+        didcomm_services=[
+            DIDCommService(id=id, service_endpoint=service_endpoint, routing_keys=routing_keys, accept=accept)
+            for id, service_endpoint, routing_keys, accept in doc["s"]
+        ]
+    )
@@ -1,46 +1,55 @@
-import json
 from typing import Optional
 
-from didcomm.common.types import DID, VerificationMethodType, VerificationMaterial, VerificationMaterialFormat
-from didcomm.did_doc.did_doc import DIDDoc, VerificationMethod, DIDCommService
+from didcomm.common.types import DID
+from didcomm.did_doc.did_doc import DIDDoc
 from didcomm.did_doc.did_resolver import DIDResolver
-from peerdid import peer_did
-from peerdid.core.did_doc_types import DIDCommServicePeerDID
-from peerdid.did_doc import DIDDocPeerDID
-from peerdid.types import VerificationMaterialFormatPeerDID
+
+from didcomm_demo.compact_did_doc import CompactDIDDoc
+from didcomm_demo.did_doc_cache import DIDDocCache
+from didcomm_demo.did_doc_index_sqlite import DIDDocIndexSqlite
+from didcomm_demo.instrumentation import Instrumentation, NO_INSTRUMENTATION
+from didcomm_demo.peer_did_doc import resolve_peer_did_doc
 
 
 class DIDResolverPeerDID(DIDResolver):
 
+    def __init__(self,
+                 cache: Optional[DIDDocCache] = None,
+                 instrumentation: Instrumentation = NO_INSTRUMENTATION,
+                 index: Optional[DIDDocIndexSqlite] = None) -> None:
+        self.cache = cache
+        self.instrumentation = instrumentation
+        # optional persistent index checked (and filled) on cache misses before resolving the peer DID
+        self.index = index
+
     async def resolve(self, did: DID) -> Optional[DIDDoc]:
-        # request DID Doc in JWK format
-        did_doc_json = peer_did.resolve_peer_did(did, format=VerificationMaterialFormatPeerDID.JWK)
-        did_doc = DIDDocPeerDID.from_json(did_doc_json)
-
-        return DIDDoc(
-            did=did_doc.did,
-            key_agreement_kids=did_doc.agreement_kids,
-            authentication_kids=did_doc.auth_kids,
-            verification_methods=[
-                VerificationMethod(
-                    id=m.id,
-                    type=VerificationMethodType.JSON_WEB_KEY_2020,
-                    controller=m.controller,
-                    verification_material=VerificationMaterial(
-                        format=VerificationMaterialFormat.JWK,
-                        value=json.dumps(m.ver_material.value)
-                    )
-                )
-                for m in did_doc.authentication + did_doc.key_agreement
-            ],
-            didcomm_services=[
-                DIDCommService(
-                    id=s.id,
-                    service_endpoint=s.service_endpoint,
-                    routing_keys=s.routing_keys,
-                    accept=s.accept
-                )
-                for s in did_doc.service
-                if isinstance(s, DIDCommServicePeerDID)
-            ] if did_doc.service else []
-        )
+        if self.cache is None:
+            return self._resolve_indexed(did)
+
+        did_doc = self.cache.get(did)
+        if did_doc is None:
+            self.instrumentation.count("did_doc_cache.miss")
+            did_doc = self._resolve_indexed(did)
+            self.cache.put(did, did_doc)
+        else:
+            self.instrumentation.count("did_doc_cache.hit")
+        return did_doc
+
+    def _resolve_indexed(self, did: DID) -> DIDDoc:
+        if self.index is not None:
+            with self.instrumentation.stage("did_doc_index.get"):
+                did_doc = self.index.get(did)
+            if did_doc is not None:
+                self.instrumentation.count("did_doc_index.hit")
+                return did_doc
+            self.instrumentation.count("did_doc_index.miss")
+
+        with self.instrumentation.stage("resolve_peer_did"):
+            did_doc = self._resolve(did)
+        if self.index is not None:
+            self.index.put(did, did_doc)
+        return did_doc
+
+    @staticmethod
+    def _resolve(did: DID) -> CompactDIDDoc:
+        return resolve_peer_did_doc(did)
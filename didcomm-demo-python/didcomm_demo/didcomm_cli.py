@@ -1,22 +1,91 @@
+import json
+import os
+from typing import Optional, TYPE_CHECKING
+
 import click
-from didcomm.errors import DIDCommError
-from didcomm.pack_encrypted import PackEncryptedConfig
-from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
-from peerdid.errors import MalformedPeerDIDError
-from peerdid.types import VerificationMaterialFormatPeerDID
 
-from didcomm_demo.didcomm_demo import DIDCommDemo
+# didcomm, peerdid and asyncio take most of the start-up time,
+# so they are imported by the commands which need them and not when the CLI is loaded
+if TYPE_CHECKING:
+    from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+    from didcomm_demo.didcomm_demo import DIDCommDemo
+
+# number of input lines processed at once per job by `pack --input` and `unpack --input`
+_LINES_PER_JOB = 16
+
+# created on first use, so that commands not needing secrets don't load (or create) the secrets file
+_secrets_resolver: Optional["SecretsResolverEditable"] = None
+
+
+def set_secrets_resolver(resolver: "SecretsResolverEditable"):
+    global _secrets_resolver
+    _secrets_resolver = resolver
+
+
+def get_secrets_resolver() -> "SecretsResolverEditable":
+    global _secrets_resolver
+    if _secrets_resolver is None:
+        # shared with a running `serve` and other CLI processes
+        from didcomm_demo.secrets_resolver_file import SecretsResolverFile
+        _secrets_resolver = SecretsResolverFile()
+    return _secrets_resolver
+
+
+def _create_demo(profile: bool = False) -> "DIDCommDemo":
+    from didcomm_demo.didcomm_demo import DIDCommDemo
+    from didcomm_demo.instrumentation import StageTimer
+    return DIDCommDemo(get_secrets_resolver(), instrumentation=StageTimer() if profile else None)
+
 
-secrets_resolver = SecretsResolverDemo()
+def _echo_profile(demo: "DIDCommDemo"):
+    # the breakdown goes to stderr, so the command's output stays the same
+    if demo.instrumentation.enabled:
+        click.echo(demo.instrumentation.format(), err=True)
 
 
-def set_secrets_resolver(resolver: SecretsResolverDemo):
-    global secrets_resolver
-    secrets_resolver = resolver
+def _execute(command: str, args: dict, profile: bool = False) -> dict:
+    # forwards the command to the server if it's running on the socket given to the group,
+    # otherwise executes it in this process (always, when profiling)
+    socket_path = click.get_current_context().find_root().params.get("socket_path")
+    if socket_path and not profile:
+        from didcomm_demo.client import DIDCommClient
+        client = DIDCommClient.connect(socket_path)
+        if client is not None:
+            with client:
+                return client.call(command, **args)
+    if command == "resolve-peer-did":
+        # needs neither didcomm nor the secrets
+        return _resolve_peer_did(**args)
+
+    from didcomm_demo.didcomm_demo import _run
+    from didcomm_demo.server import execute
+    demo = _create_demo(profile)
+    try:
+        return _run(execute(demo, command, args))
+    finally:
+        _echo_profile(demo)
+
+
+def _resolve_peer_did(did: str, format: str) -> dict:
+    from peerdid import peer_did
+    from peerdid.errors import MalformedPeerDIDError
+    from peerdid.types import VerificationMaterialFormatPeerDID
+    format = VerificationMaterialFormatPeerDID.MULTIBASE if format == "multibase" \
+        else VerificationMaterialFormatPeerDID.JWK
+    try:
+        return {"did_doc": peer_did.resolve_peer_did(did, format=format)}
+    except MalformedPeerDIDError as e:
+        return {"error": f"{e}"}
+
+
+profile_option = click.option('--profile', is_flag=True, help='Print per-stage timings to stderr')
 
 
 @click.group()
-def cli():
+@click.option('--socket', 'socket_path', envvar='DIDCOMM_CLI_SOCKET', default=None,
+              help='Unix socket of a running `serve` process. Commands are forwarded to it if it is running. '
+                   'Can be set by DIDCOMM_CLI_SOCKET environment variable.')
+def cli(socket_path):
     pass
 
 
@@ -25,20 +94,49 @@ def cli():
 @click.option('--agreement-keys-count', default=1, help='Number of agreement keys')
 @click.option('--service-endpoint', default=None, help='Optional service endpoint')
 @click.option('--service-routing-key', default=[], multiple=True, help='Optional service routing keys')
-def create_peer_did(auth_keys_count, agreement_keys_count, service_endpoint, service_routing_key):
+@profile_option
+def create_peer_did(auth_keys_count, agreement_keys_count, service_endpoint, service_routing_key, profile):
     click.echo()
-    demo = DIDCommDemo(secrets_resolver)
+    res = _execute("create-peer-did", dict(
+        auth_keys_count=auth_keys_count,
+        agreement_keys_count=agreement_keys_count,
+        service_endpoint=service_endpoint,
+        service_routing_keys=list(service_routing_key)
+    ), profile)
+    click.echo(f"{res['error']}" if "error" in res else f"{res['did']}")
+    click.echo()
+
+
+@cli.command()
+@click.option('--count', required=True, type=int, help='Number of peer DIDs to create')
+@click.option('--auth-keys-count', default=1, help='Number of authentication keys')
+@click.option('--agreement-keys-count', default=1, help='Number of agreement keys')
+@click.option('--service-endpoint', default=None, help='Optional service endpoint')
+@click.option('--service-routing-key', default=[], multiple=True, help='Optional service routing keys')
+@click.option('--out', type=click.File('w'), default='-', help='Output JSONL file (stdout by default)')
+@click.option('--batch-size', default=1000, help='Number of DIDs whose secrets are stored in a single write')
+@click.option('--jobs', default=1, help='Number of processes generating keys')
+def create_peer_dids(count, auth_keys_count, agreement_keys_count, service_endpoint, service_routing_key, out,
+                     batch_size, jobs):
+    from concurrent.futures import ProcessPoolExecutor
+    demo = _create_demo()
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
     try:
-        did = demo.create_peer_did(
-            auth_keys_count=auth_keys_count,
-            agreement_keys_count=agreement_keys_count,
-            service_endpoint=service_endpoint,
-            service_routing_keys=service_routing_key
-        )
-        click.echo(f"{did}")
+        for did in demo.create_peer_dids(
+                count=count,
+                auth_keys_count=auth_keys_count,
+                agreement_keys_count=agreement_keys_count,
+                service_endpoint=service_endpoint,
+                service_routing_keys=list(service_routing_key),
+                batch_size=batch_size,
+                executor=executor
+        ):
+            out.write(json.dumps({"did": did}) + "\n")
     except (ValueError, TypeError) as e:
-        click.echo(f"{e}")
-    click.echo()
+        click.echo(f"{e}", err=True)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
 
 @cli.command()
@@ -48,56 +146,372 @@ def create_peer_did(auth_keys_count, agreement_keys_count, service_endpoint, ser
               help='DID Doc format (JWK or Multibase)')
 def resolve_peer_did(did, format):
     click.echo()
-    format = VerificationMaterialFormatPeerDID.JWK if format == "jwk" else VerificationMaterialFormatPeerDID.MULTIBASE
-    try:
-        did_doc_json = DIDCommDemo.resolve_peer_did(did, format)
-        click.echo(f"{did_doc_json}")
-    except MalformedPeerDIDError as e:
-        click.echo(f"{e}")
+    res = _execute("resolve-peer-did", dict(did=did, format=format.lower()))
+    click.echo(f"{res['error']}" if "error" in res else f"{res['did_doc']}")
     click.echo()
 
 
 @cli.command()
-@click.argument('msg')
-@click.option('--to', required=True, help="Receiver's DID")
+@click.option('--input', 'input_file', type=click.File('r'), required=True,
+              help='File ("-" for stdin) with a peer DID per line: the DID itself or an object with "did" '
+                   '(as written by `create-peer-dids`)')
+@click.option('--output', type=click.File('w'), default='-', help='Output JSONL file (stdout by default)')
+@click.option('--format', type=click.Choice(['jwk', 'multibase'], case_sensitive=False),
+              default="jwk",
+              help='DID Doc format (JWK or Multibase)')
+@click.option('--jobs', default=1, help='Number of processes resolving DIDs')
+@click.option('--index', 'index_path', default=None,
+              help='SQLite DID Doc index to put the resolved DID Docs into (created if missing), '
+                   'so that they are not resolved again by the demo using it')
+def resolve_peer_dids(input_file, output, format, jobs, index_path):
+    from collections import deque
+    from peerdid.types import VerificationMaterialFormatPeerDID
+    from didcomm_demo.peer_did_doc import resolve_peer_dids as resolve
+    format = VerificationMaterialFormatPeerDID.MULTIBASE if format.lower() == "multibase" \
+        else VerificationMaterialFormatPeerDID.JWK
+
+    # DIDs are resolved lazily in batches while the input is read, and the results come in the input order,
+    # so the line number (and the error of a malformed line, which is passed on as no DID) is queued per DID
+    lines = deque()
+
+    def dids():
+        for line_number, line in enumerate(input_file, 1):
+            if not line.strip():
+                continue
+            try:
+                did = _parse_did_line(line)
+                lines.append((line_number, None))
+            except (ValueError, KeyError, TypeError) as e:
+                did = None
+                lines.append((line_number, f"Malformed input line: {e}"))
+            yield did
+
+    index = None
+    if index_path is not None:
+        from didcomm_demo.did_doc_index_sqlite import DIDDocIndexSqlite
+        index = DIDDocIndexSqlite(index_path)
+    try:
+        for did, res in resolve(dids(), format=format, workers=jobs, did_doc_index=index):
+            line_number, error = lines.popleft()
+            if error is not None:
+                item = {"line": line_number, "error": error}
+            elif isinstance(res, Exception):
+                item = {"line": line_number, "did": did, "error": f"{res}"}
+            else:
+                item = {"line": line_number, "did": did, "did_doc": res}
+            output.write(json.dumps(item) + "\n")
+    finally:
+        if index is not None:
+            index.close()
+
+
+def _parse_did_line(line: str) -> str:
+    line = line.strip()
+    if not line.startswith("{"):
+        return line
+    did = json.loads(line)["did"]
+    if not isinstance(did, str):
+        raise ValueError('"did" must be a string')
+    return did
+
+
+@cli.command()
+@click.argument('msg', required=False)
+@click.option('--to', multiple=True,
+              help="Receiver's DID. Can be repeated to encrypt the message to several receivers.")
 @click.option('--from', 'frm', default=None, help="Sender's DID. Anonymous encryption is used if not set.")
 @click.option('--sign-from', default=None,
               help="Sender's DID for optional signing. The message is not signed if not set.")
 @click.option('--protect-sender-id', default=True,
               help="Whether the sender's ID (DID) must be hidden. True by default.")
-def pack(msg, to, frm, sign_from, protect_sender_id):
+@click.option('--mode', type=click.Choice(['encrypted', 'signed', 'plaintext']), default='encrypted',
+              help='encrypted (by default), signed (by --sign-from) but not encrypted, or plaintext. '
+                   'A signed or plaintext message is a single message addressed to all --to (which are optional).')
+@click.option('--sign-once', is_flag=True,
+              help='With --sign-from and several --to: sign the message once and encrypt the same signed message '
+                   'to each receiver instead of signing it for each of them. The message lists all receivers then.')
+@click.option('--input', 'input_file', type=click.File('r'), default=None,
+              help='JSONL file ("-" for stdin) with a message to pack per line instead of MSG: '
+                   'a JSON string or an object with "msg" (or a "body" object and an optional message "type") '
+                   'and optional "to", "frm", "sign_frm" and "protect_sender_id" (the options are used by default). '
+                   'Results are written as JSONL.')
+@click.option('--output', type=click.File('w'), default='-', help='Output JSONL file for --input (stdout by default)')
+@click.option('--jobs', default=1, help='Number of processes packing messages from --input')
+@click.option('--file', 'content_file', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='File with (large) content to send instead of MSG: the content is encrypted chunk by chunk '
+                   'into --file-out, and the packed message carries the content key and the path of --file-out')
+@click.option('--file-out', 'content_file_out', type=click.Path(dir_okay=False), default=None,
+              help='Output file for the encrypted content of --file (FILE.enc by default)')
+@profile_option
+def pack(msg, to, frm, sign_from, protect_sender_id, mode, sign_once, input_file, output, jobs, content_file,
+         content_file_out, profile):
+    if mode != "encrypted" and (content_file is not None or input_file is not None):
+        raise click.UsageError("--file and --input require --mode=encrypted")
+    if content_file is not None:
+        if msg is not None or input_file is not None or len(to) != 1:
+            raise click.UsageError("--file requires exactly one --to and neither MSG nor --input")
+        _pack_file(content_file, content_file_out or content_file + ".enc", to[0], frm, sign_from,
+                   protect_sender_id, profile)
+        return
+    if input_file is not None:
+        if len(to) > 1:
+            raise click.UsageError("--to can't be repeated with --input")
+        defaults = dict(to=to[0] if to else None, frm=frm, sign_frm=sign_from, protect_sender_id=protect_sender_id)
+        _process_jsonl(input_file, output, jobs, lambda line: _parse_pack_line(line, defaults), "pack")
+        return
+    if msg is None or (not to and mode == "encrypted"):
+        raise click.UsageError("MSG and --to are required unless --input is given")
+    if mode == "signed" and sign_from is None:
+        raise click.UsageError("--mode=signed requires --sign-from")
+
+    args = dict(
+        msg=msg,
+        to=list(to) if len(to) > 1 or mode != "encrypted" else to[0],
+        frm=frm,
+        sign_frm=sign_from,
+        protect_sender_id=protect_sender_id
+    )
+    # sent only if set, so that a server not knowing them still serves the defaults
+    if mode != "encrypted":
+        args["mode"] = mode
+    if sign_once:
+        args["sign_once"] = True
+    click.echo()
+    res = _execute("pack", args, profile)
+    for r in res.get("results", [res]):
+        click.echo(f"{r['error']}" if "error" in r else f"{r['packed_msg']}")
+    click.echo()
+
+
+@cli.command()
+@click.argument('msg', required=False)
+@click.option('--input', 'input_file', type=click.File('r'), default=None,
+              help='JSONL file ("-" for stdin) with a packed message to unpack per line instead of MSG: '
+                   'the packed message itself or an object with "packed_msg" (as written by `pack --input`). '
+                   'Results are written as JSONL.')
+@click.option('--output', type=click.File('w'), default='-', help='Output JSONL file for --input (stdout by default)')
+@click.option('--jobs', default=1, help='Number of processes unpacking messages from --input')
+@click.option('--out', 'content_out', type=click.Path(dir_okay=False), default=None,
+              help='Output file for the content of MSG packed by `pack --file`')
+@click.option('--file', 'content_file', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Encrypted content of MSG for --out')
+@click.option('--content-dir', type=click.Path(exists=True, file_okay=False), default=None,
+              help='Read the encrypted content of MSG for --out from the file MSG links to, '
+                   'which must be inside the given directory (instead of --file)')
+@profile_option
+def unpack(msg, input_file, output, jobs, content_out, content_file, content_dir, profile):
+    if content_out is not None:
+        if msg is None:
+            raise click.UsageError("MSG is required with --out")
+        if content_file is None and content_dir is None:
+            raise click.UsageError("--file or --content-dir is required with --out")
+        _unpack_file(msg, content_file, content_dir, content_out, profile)
+        return
+    if input_file is not None:
+        _process_jsonl(input_file, output, jobs, _parse_unpack_line, "unpack")
+        return
+    if msg is None:
+        raise click.UsageError("MSG is required unless --input is given")
+
+    click.echo()
+    res = _execute("unpack", dict(packed_msg=msg), profile)
+    if "error" in res:
+        click.echo(f"{res['error']}")
+    else:
+        click.echo()
+        if "signed" in res:
+            # not encrypted
+            line = f"{'signed' if res['signed'] else 'plaintext'} {res['msg']}"
+            if res["frm"]:
+                line += f" from {res['frm']}"
+            if res["to"]:
+                line += f" to {res['to']}"
+            click.echo(line)
+        elif res["frm"]:
+            click.echo(f"authcrypted {res['msg']} from {res['frm']} to {res['to']}")
+        else:
+            click.echo(f"anoncrypted {res['msg']} to {res['to']}")
+    click.echo()
+
+
+def _pack_file(content_file: str, content_file_out: str, to: str, frm: Optional[str], sign_frm: Optional[str],
+               protect_sender_id: bool, profile: bool):
+    # executed in this process, as the content is read and written here
+    from didcomm.pack_encrypted import PackEncryptedConfig
+    from didcomm_demo.didcomm_demo import PACK_ERRORS
+    demo = _create_demo(profile)
     click.echo()
-    demo = DIDCommDemo(secrets_resolver)
     try:
-        res = demo.pack(
-            msg=msg,
-            to=to,
-            frm=frm,
-            sign_frm=sign_from,
-            config=PackEncryptedConfig(protect_sender_id=protect_sender_id)
-        )
+        with open(content_file, "rb") as src, open(content_file_out, "wb") as dst:
+            res = demo.pack_file(src, dst, to=to, frm=frm, sign_frm=sign_frm,
+                                 config=PackEncryptedConfig(protect_sender_id=protect_sender_id),
+                                 link=content_file_out, filename=os.path.basename(content_file))
         click.echo(f"{res.packed_msg}")
-    except DIDCommError as e:
+    except PACK_ERRORS as e:
         click.echo(f"{e}")
+    finally:
+        _echo_profile(demo)
     click.echo()
 
 
-@cli.command()
-@click.argument('msg')
-def unpack(msg):
+def _unpack_file(msg: str, content_file: Optional[str], content_dir: Optional[str], content_out: str, profile: bool):
+    from didcomm.errors import DIDCommError
+    from didcomm_demo.streaming import read_content_envelope
+    demo = _create_demo(profile)
     click.echo()
     try:
-        demo = DIDCommDemo(secrets_resolver)
-        initial_msg, frm, to, _ = demo.unpack(msg)
+        with open(content_out, "wb") as dst:
+            if content_file is not None:
+                with open(content_file, "rb") as src:
+                    _, frm, to, res = demo.unpack_file(msg, src, dst)
+            else:
+                _, frm, to, res = demo.unpack_file(msg, None, dst, content_dir=content_dir)
+        size = read_content_envelope(res.message)[0].size
         click.echo()
         if frm:
-            click.echo(f"authcrypted {initial_msg} from {frm} to {to}")
+            click.echo(f"authcrypted {size} bytes from {frm} to {to} written to {content_out}")
         else:
-            click.echo(f"anoncrypted {initial_msg} to {to}")
-    except DIDCommError as e:
+            click.echo(f"anoncrypted {size} bytes to {to} written to {content_out}")
+    except (DIDCommError, OSError) as e:
+        # no partially decrypted content is left behind
+        if os.path.exists(content_out):
+            os.remove(content_out)
         click.echo(f"{e}")
+    finally:
+        _echo_profile(demo)
     click.echo()
 
 
+def _process_jsonl(input_file, output, jobs: int, parse_line, command: str):
+    # The input is read in batches of lines which are packed/unpacked by a single demo instance
+    # (or by `jobs` processes); the results of a batch are written (in the input order) as soon as it's done,
+    # so the input is never read as a whole. Each result has the number of its input line.
+    parallel = None
+    if jobs > 1:
+        from didcomm_demo.parallel import ParallelDIDComm
+        parallel = ParallelDIDComm(_secrets_resolver_factory(), max_workers=jobs)
+        runner = parallel
+    else:
+        runner = _create_demo()
+    process_batch = runner.pack_many if command == "pack" else runner.unpack_many
+
+    def flush(batch):
+        requests = [request for _, request in batch if not isinstance(request, Exception)]
+        results = iter(process_batch(requests) if requests else [])
+        for line_number, request in batch:
+            res = request if isinstance(request, Exception) else next(results)
+            output.write(json.dumps({"line": line_number, **_result_json(res)}) + "\n")
+        output.flush()
+
+    try:
+        batch = []
+        for line_number, line in enumerate(input_file, 1):
+            if not line.strip():
+                continue
+            try:
+                batch.append((line_number, parse_line(line)))
+            except (ValueError, KeyError, TypeError) as e:
+                batch.append((line_number, ValueError(f"Malformed input line: {e}")))
+            if len(batch) >= _LINES_PER_JOB * jobs:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        if parallel is not None:
+            parallel.close()
+
+
+def _parse_pack_line(line: str, defaults: dict):
+    from didcomm.pack_encrypted import PackEncryptedConfig
+    from didcomm_demo.didcomm_demo import PackRequest
+    from didcomm_demo.message_template import DEFAULT_MESSAGE_TYPE
+    item = json.loads(line)
+    if isinstance(item, str):
+        item = {"msg": item}
+    item = {**defaults, **item}
+    if not item["to"]:
+        raise ValueError('no receiver: set "to" or --to')
+    if "body" in item and not isinstance(item["body"], dict):
+        raise ValueError('"body" must be an object')
+    if "msg" not in item and "body" not in item:
+        raise ValueError('no message: set "msg" or "body"')
+    return PackRequest(
+        msg=item.get("msg"),
+        to=item["to"],
+        frm=item["frm"],
+        sign_frm=item["sign_frm"],
+        config=PackEncryptedConfig(protect_sender_id=item["protect_sender_id"]),
+        body=item.get("body"),
+        type=item.get("type", DEFAULT_MESSAGE_TYPE)
+    )
+
+
+def _parse_unpack_line(line: str) -> str:
+    item = json.loads(line)
+    if isinstance(item, dict) and "packed_msg" in item:
+        return item["packed_msg"]
+    return line.strip()
+
+
+def _result_json(res) -> dict:
+    if isinstance(res, Exception):
+        return {"error": f"{res}"}
+    if isinstance(res, tuple):
+        msg, frm, to, _ = res
+        return {"msg": msg, "frm": frm, "to": to}
+    return {"packed_msg": res.packed_msg}
+
+
+def _secrets_resolver_factory():
+    # worker processes open their own instance of the secrets store
+    import functools
+    secrets_resolver = get_secrets_resolver()
+    if not hasattr(secrets_resolver, "file_path"):
+        raise click.UsageError("--jobs requires a file-based secrets resolver")
+    return functools.partial(type(secrets_resolver), secrets_resolver.file_path)
+
+
+@cli.command()
+@click.pass_context
+def serve(ctx):
+    """
+    Serve line-delimited JSON requests with a warm demo instance:
+    on the Unix socket given by --socket (or DIDCOMM_CLI_SOCKET), or on stdin/stdout if not set.
+    """
+    from didcomm_demo.didcomm_demo import _run
+    from didcomm_demo.server import DIDCommServer
+    server = DIDCommServer(_create_demo())
+    socket_path = ctx.find_root().params.get("socket_path")
+    if socket_path is None:
+        server.serve_stdio()
+        return
+    click.echo(f"Listening on {socket_path}", err=True)
+    try:
+        _run(server.serve_unix(socket_path))
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command()
+@click.option('--iterations', default=100, help='Number of measured iterations per benchmark')
+@click.option('--size', 'sizes', type=int, multiple=True,
+              help='Message size in bytes for pack/unpack benchmarks (64, 4096 and 65536 by default). '
+                   'Can be repeated.')
+@click.option('--filter', 'name_filter', default=None,
+              help='Run only benchmarks with the given name or matching the given glob '
+                   '(for example, "pack" or "resolve_*")')
+@click.option('--json', 'as_json', is_flag=True, help='Print results as JSON')
+@click.option('--out', type=click.File('w'), default=None, help='Also write results as JSON to the given file')
+def bench(iterations, sizes, name_filter, as_json, out):
+    from didcomm_demo.bench import run_benchmarks, format_results, DEFAULT_MESSAGE_SIZES
+    results = run_benchmarks(iterations=iterations, message_sizes=sizes or DEFAULT_MESSAGE_SIZES,
+                             name_filter=name_filter)
+    results_json = json.dumps([r.as_dict() for r in results], indent=2)
+    click.echo(results_json if as_json else format_results(results))
+    if out is not None:
+        out.write(results_json)
+
+
 if __name__ == '__main__':
     cli()
@@ -1,12 +1,24 @@
 import asyncio
 import json
-from typing import Optional, List
+from dataclasses import dataclass, replace
+from concurrent.futures import Executor
+from typing import Optional, List, Union, Iterable, AsyncIterable, AsyncIterator, Tuple, Iterator, BinaryIO
 
 from didcomm.common.resolvers import ResolversConfig
 from didcomm.common.types import DID, JSON
-from didcomm.core.utils import id_generator_default, get_did
-from didcomm.message import Message
-from didcomm.pack_encrypted import pack_encrypted, PackEncryptedResult, PackEncryptedConfig
+from didcomm.core.anoncrypt import anoncrypt, find_keys_and_anoncrypt
+from didcomm.core.authcrypt import find_keys_and_authcrypt
+from didcomm.core.serialization import dict_to_json
+from didcomm.core.utils import get_did, parse_base64url_encoded_json
+from didcomm.errors import DIDCommError, DIDCommValueError, MalformedMessageError, MalformedMessageCode
+from didcomm.message import Attachment, Message
+from didcomm.pack_encrypted import pack_encrypted, PackEncryptedResult, PackEncryptedConfig, ServiceMetadata
+# the checks of the arguments of `pack_encrypted` against the message
+from didcomm.pack_encrypted import __validate as _validate_pack_encrypted
+from didcomm.pack_plaintext import pack_plaintext, PackPlaintextResult
+from didcomm.pack_signed import pack_signed, PackSignedResult
+from didcomm.protocols.routing.forward import resolve_did_services_chain
+from didcomm.secrets.secrets_resolver import Secret
 from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
 from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
 from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, generate_ed25519_keys_as_jwk_dict, \
@@ -14,21 +26,108 @@ from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, gener
 from didcomm.unpack import unpack, UnpackResult
 from peerdid import peer_did
 from peerdid.core.did_doc_types import DIDCommServicePeerDID
-from peerdid.did_doc import DIDDocPeerDID
+from peerdid.core.peer_did_helper import Numalgo2Prefix
+from peerdid.errors import PeerDIDError
 from peerdid.types import VerificationMaterialFormatPeerDID, VerificationMaterialAgreement, \
     VerificationMethodTypeAgreement, VerificationMaterialAuthentication, VerificationMethodTypeAuthentication
 
+from didcomm_demo.did_doc_cache import DIDDocCache
+from didcomm_demo.did_doc_index_sqlite import DIDDocIndexSqlite
 from didcomm_demo.did_resolver_peer_did import DIDResolverPeerDID
+from didcomm_demo.instrumentation import Instrumentation, NO_INSTRUMENTATION, InstrumentedDIDResolver, \
+    InstrumentedSecretsResolver
+from didcomm_demo.key_pool import KeyPool
+from didcomm_demo.lru_cache import LRUCache
+from didcomm_demo.message_template import make_message, MessageBody, DEFAULT_MESSAGE_TYPE
+from didcomm_demo.peer_did_doc import resolve_peer_dids, ResolvePeerDIDResult
+from didcomm_demo.routing import RoutingChain, resolve_routing_chain, wrap_in_forward
+from didcomm_demo.secrets_resolver_batch import SecretsResolverBatch
+from didcomm_demo.secrets_resolver_indexed import SecretsResolverIndexed
+from didcomm_demo.streaming import encrypt_stream, decrypt_stream, content_envelope, read_content_envelope, \
+    content_link_path, ENCRYPTED_CONTENT_TYPE, DEFAULT_CHUNK_SIZE
+
+
+# errors reported per item by the batch API instead of failing the whole batch
+PACK_ERRORS = (DIDCommError, PeerDIDError)
+
+
+@dataclass
+class PackRequest:
+    # the body is {"msg": msg} unless given
+    msg: Optional[str]
+    to: str
+    frm: Optional[str] = None
+    sign_frm: Optional[str] = None
+    config: Optional[PackEncryptedConfig] = None
+    body: Optional[MessageBody] = None
+    type: str = DEFAULT_MESSAGE_TYPE
+    attachments: Optional[List[Attachment]] = None
+    # a message signed by `pack_signed` to be encrypted as is (instead of msg/body, which are not used then)
+    signed: Optional[PackSignedResult] = None
+
+
+class UnpackedMessage(tuple):
+    """
+    (msg, frm, to, UnpackResult) returned by `unpack`, where `to` is the DID of the first owned recipient key.
+    `recipients` lists all owned kids the message is encrypted to.
+    For a message that is only signed (or plaintext), `frm` is the signer (or the `from` of the message),
+    `to` is the first DID of its `to` (if any), and there are no `recipients`.
+    """
+
+    def __new__(cls, msg: str, frm: Optional[str], to: Optional[str], res: UnpackResult, recipients: List[str]):
+        self = super().__new__(cls, (msg, frm, to, res))
+        self.recipients = recipients
+        return self
+
+    def __getnewargs__(self):
+        return (*self, self.recipients)
+
+
+# the secrets store of a demo (and of the workers of ParallelDIDComm) unless given
+DEFAULT_SECRETS_RESOLVER = SecretsResolverDemo
+
+PackManyResult = Union[PackEncryptedResult, DIDCommError, PeerDIDError]
+UnpackStreamResult = Union[UnpackedMessage, Exception]
 
 
 class DIDCommDemo:
 
-    def __init__(self, secrets_resolver: Optional[SecretsResolverEditable] = None) -> None:
-        self.secrets_resolver = secrets_resolver or SecretsResolverDemo()
+    def __init__(self,
+                 secrets_resolver: Optional[SecretsResolverEditable] = None,
+                 did_doc_cache: Optional[DIDDocCache] = None,
+                 did_doc_index: Optional[DIDDocIndexSqlite] = None,
+                 key_pool: Optional[KeyPool] = None,
+                 instrumentation: Optional[Instrumentation] = None,
+                 forward: bool = False,
+                 routing_chain_cache_size: int = 1024) -> None:
+        secrets_resolver = secrets_resolver or DEFAULT_SECRETS_RESOLVER()
+        # owned kids are looked up in an index, which is kept current for stores shared with others
+        if not isinstance(secrets_resolver, SecretsResolverIndexed):
+            secrets_resolver = SecretsResolverIndexed(secrets_resolver)
+        self.secrets_resolver = secrets_resolver
+        # optional pool of pre-generated keys taking key generation off the `create_peer_did` path
+        self.key_pool = key_pool
+        # pass the same cache to several instances to share resolved DID Docs between them
+        self.did_doc_cache = did_doc_cache if did_doc_cache is not None else DIDDocCache()
+        # optional persistent index of resolved DID Docs surviving restarts
+        self.did_doc_index = did_doc_index
+        # stages of create_peer_did/pack/unpack are timed only if instrumentation is given;
+        # otherwise the resolvers are used as is and the stages are no-ops
+        self.instrumentation = instrumentation or NO_INSTRUMENTATION
+        did_resolver = DIDResolverPeerDID(cache=self.did_doc_cache, instrumentation=self.instrumentation,
+                                          index=self.did_doc_index)
+        secrets_resolver = self.secrets_resolver
+        if self.instrumentation.enabled:
+            did_resolver = InstrumentedDIDResolver(did_resolver, self.instrumentation)
+            secrets_resolver = InstrumentedSecretsResolver(secrets_resolver, self.instrumentation)
         self.resolvers_config = ResolversConfig(
-            secrets_resolver=self.secrets_resolver,
-            did_resolver=DIDResolverPeerDID()
+            secrets_resolver=secrets_resolver,
+            did_resolver=did_resolver
         )
+        # Forward wrapping for recipients with routing keys is off by default until it's supported in all languages;
+        # the wrapping chain (mediators and their keys) is resolved once per recipient and kept in a bounded LRU
+        self.forward = forward
+        self._routing_chains: LRUCache[str, RoutingChain] = LRUCache(max_size=routing_chain_cache_size)
 
     def create_peer_did(self,
                         auth_keys_count: int = 1,
@@ -36,106 +135,579 @@ class DIDCommDemo:
                         service_endpoint: Optional[str] = None,
                         service_routing_keys: Optional[List[str]] = None
                         ) -> str:
-        # 1. generate keys in JWK format
-        agreem_keys = [generate_x25519_keys_as_jwk_dict() for _ in range(agreement_keys_count)]
-        auth_keys = [generate_ed25519_keys_as_jwk_dict() for _ in range(auth_keys_count)]
-
-        # 2. prepare the keys for peer DID lib
-        agreem_keys_peer_did = [
-            VerificationMaterialAgreement(
-                type=VerificationMethodTypeAgreement.JSON_WEB_KEY_2020,
-                format=VerificationMaterialFormatPeerDID.JWK,
-                value=k[1],
-            )
-            for k in agreem_keys
-        ]
-        auth_keys_peer_did = [
-            VerificationMaterialAuthentication(
-                type=VerificationMethodTypeAuthentication.JSON_WEB_KEY_2020,
-                format=VerificationMaterialFormatPeerDID.JWK,
-                value=k[1],
-            )
-            for k in auth_keys
-        ]
-
-        # 3. generate service
-        service = None
-        if service_endpoint:
-            service = json.dumps(
-                DIDCommServicePeerDID(
-                    id="new-id",
-                    service_endpoint=service_endpoint, routing_keys=service_routing_keys,
-                    accept=["didcomm/v2"]
-                ).to_dict()
+        return _run(
+            self.create_peer_did_async(
+                auth_keys_count=auth_keys_count,
+                agreement_keys_count=agreement_keys_count,
+                service_endpoint=service_endpoint,
+                service_routing_keys=service_routing_keys
             )
+        )
 
-        # 4. call peer DID lib
-        # if we have just one key (auth), then use numalg0 algorithm
-        # otherwise use numalg2 algorithm
-        if len(auth_keys_peer_did) == 1 and not agreem_keys_peer_did and not service:
-            did = peer_did.create_peer_did_numalgo_0(auth_keys_peer_did[0])
-        else:
-            did = peer_did.create_peer_did_numalgo_2(
-                encryption_keys=agreem_keys_peer_did,
-                signing_keys=auth_keys_peer_did,
-                service=service,
-            )
-
-        # 5. set KIDs as in DID DOC for secrets and store the secret in the secrets resolver
-        did_doc = DIDDocPeerDID.from_json(peer_did.resolve_peer_did(did))
-        for auth_key, kid in zip(auth_keys, did_doc.auth_kids):
-            private_key = auth_key[0]
-            private_key["kid"] = kid
-            asyncio.get_event_loop().run_until_complete(
-                self.secrets_resolver.add_key(jwk_to_secret(private_key))
-            )
-        for agreem_key, kid in zip(agreem_keys, did_doc.agreement_kids):
-            private_key = agreem_key[0]
-            private_key["kid"] = kid
-            asyncio.get_event_loop().run_until_complete(
-                self.secrets_resolver.add_key(jwk_to_secret(private_key))
+    async def create_peer_did_async(self,
+                                    auth_keys_count: int = 1,
+                                    agreement_keys_count: int = 1,
+                                    service_endpoint: Optional[str] = None,
+                                    service_routing_keys: Optional[List[str]] = None
+                                    ) -> str:
+        with self.instrumentation.stage("create_peer_did"):
+            did, secrets = generate_peer_did(
+                auth_keys_count=auth_keys_count,
+                agreement_keys_count=agreement_keys_count,
+                service_endpoint=service_endpoint,
+                service_routing_keys=service_routing_keys,
+                key_pool=self.key_pool,
+                instrumentation=self.instrumentation
             )
+            with self.instrumentation.stage("create_peer_did.store_secrets"):
+                await add_secrets(self.secrets_resolver, secrets)
 
         return did
 
+    def create_peer_dids(self,
+                         count: int,
+                         auth_keys_count: int = 1,
+                         agreement_keys_count: int = 1,
+                         service_endpoint: Optional[str] = None,
+                         service_routing_keys: Optional[List[str]] = None,
+                         batch_size: int = 1000,
+                         executor: Optional[Executor] = None
+                         ) -> Iterator[str]:
+        # DIDs are generated lazily in batches of `batch_size`: keys of a batch are generated in the executor
+        # (if given), all secrets of the batch are stored with a single write, and then the batch's DIDs are yielded
+        args = (auth_keys_count, agreement_keys_count, service_endpoint, service_routing_keys)
+        for start in range(0, count, batch_size):
+            batch = [args] * min(batch_size, count - start)
+            if executor is not None:
+                generated = list(executor.map(_generate_peer_did, batch))
+            else:
+                generated = [_generate_peer_did(a) for a in batch]
+            _run(add_secrets(self.secrets_resolver, [secret for _, secrets in generated for secret in secrets]))
+            for did, _ in generated:
+                yield did
+
     @staticmethod
     def resolve_peer_did(did: DID, format: VerificationMaterialFormatPeerDID.JWK) -> JSON:
         return peer_did.resolve_peer_did(did, format=format)
 
+    def resolve_peer_dids(self,
+                          dids: Iterable[DID],
+                          format: VerificationMaterialFormatPeerDID = VerificationMaterialFormatPeerDID.JWK,
+                          workers: Optional[int] = None,
+                          populate_cache: bool = False) -> Iterator[Tuple[DID, ResolvePeerDIDResult]]:
+        # see `resolve_peer_dids`; with `populate_cache` the DID Docs are put into the cache (and index) of this demo
+        return resolve_peer_dids(
+            dids,
+            format=format,
+            workers=workers,
+            did_doc_cache=self.did_doc_cache if populate_cache else None,
+            did_doc_index=self.did_doc_index if populate_cache else None
+        )
+
     def pack(self,
-             msg: str,
+             msg: Optional[str],
              to: str,
              frm: Optional[str] = None,
              sign_frm: Optional[str] = None,
-             config: Optional[PackEncryptedConfig] = None) -> PackEncryptedResult:
-        message = Message(
-            body={"msg": msg},
-            id=id_generator_default(),
-            type="my-protocol/1.0",
-            frm=frm,
-            to=[to],
+             config: Optional[PackEncryptedConfig] = None,
+             body: Optional[MessageBody] = None,
+             type: str = DEFAULT_MESSAGE_TYPE,
+             attachments: Optional[List[Attachment]] = None) -> PackEncryptedResult:
+        return _run(self.pack_async(msg=msg, to=to, frm=frm, sign_frm=sign_frm, config=config,
+                                    body=body, type=type, attachments=attachments))
+
+    async def pack_async(self,
+                         msg: Optional[str],
+                         to: str,
+                         frm: Optional[str] = None,
+                         sign_frm: Optional[str] = None,
+                         config: Optional[PackEncryptedConfig] = None,
+                         body: Optional[MessageBody] = None,
+                         type: str = DEFAULT_MESSAGE_TYPE,
+                         attachments: Optional[List[Attachment]] = None) -> PackEncryptedResult:
+        return await self.pack_request_async(PackRequest(msg, to, frm, sign_frm, config, body, type, attachments))
+
+    def pack_request(self, request: PackRequest) -> PackEncryptedResult:
+        return _run(self.pack_request_async(request))
+
+    async def pack_request_async(self, request: PackRequest) -> PackEncryptedResult:
+        # packs a request of `pack_many` on its own, raising its errors
+        return await self._pack(self.resolvers_config, request)
+
+    def pack_signed(self,
+                    msg: Optional[str],
+                    sign_frm: str,
+                    frm: Optional[str] = None,
+                    to: Optional[List[str]] = None,
+                    body: Optional[MessageBody] = None,
+                    type: str = DEFAULT_MESSAGE_TYPE,
+                    attachments: Optional[List[Attachment]] = None) -> PackSignedResult:
+        return _run(self.pack_signed_async(msg, sign_frm, frm=frm, to=to, body=body, type=type,
+                                           attachments=attachments))
+
+    async def pack_signed_async(self,
+                                msg: Optional[str],
+                                sign_frm: str,
+                                frm: Optional[str] = None,
+                                to: Optional[List[str]] = None,
+                                body: Optional[MessageBody] = None,
+                                type: str = DEFAULT_MESSAGE_TYPE,
+                                attachments: Optional[List[Attachment]] = None) -> PackSignedResult:
+        # signed but not encrypted; the message is from the DID of `sign_frm` unless `frm` is given.
+        # The result can be encrypted to any number of recipients with `encrypt_signed` without signing it again.
+        message = make_message(body if body is not None else {"msg": msg}, type=type,
+                               frm=frm or get_did(sign_frm), to=to, attachments=attachments)
+        return await self._pack_signed(message, sign_frm)
+
+    def pack_plaintext(self,
+                       msg: Optional[str],
+                       frm: Optional[str] = None,
+                       to: Optional[List[str]] = None,
+                       body: Optional[MessageBody] = None,
+                       type: str = DEFAULT_MESSAGE_TYPE,
+                       attachments: Optional[List[Attachment]] = None) -> PackPlaintextResult:
+        return _run(self.pack_plaintext_async(msg, frm=frm, to=to, body=body, type=type, attachments=attachments))
+
+    async def pack_plaintext_async(self,
+                                   msg: Optional[str],
+                                   frm: Optional[str] = None,
+                                   to: Optional[List[str]] = None,
+                                   body: Optional[MessageBody] = None,
+                                   type: str = DEFAULT_MESSAGE_TYPE,
+                                   attachments: Optional[List[Attachment]] = None) -> PackPlaintextResult:
+        message = make_message(body if body is not None else {"msg": msg}, type=type, frm=frm, to=to,
+                               attachments=attachments)
+        with self.instrumentation.stage("pack_plaintext"):
+            return await pack_plaintext(self.resolvers_config, message)
+
+    def encrypt_signed(self,
+                       signed: PackSignedResult,
+                       to: List[str],
+                       frm: Optional[str] = None,
+                       config: Optional[PackEncryptedConfig] = None) -> List[PackManyResult]:
+        return _run(self.encrypt_signed_async(signed, to, frm=frm, config=config))
+
+    async def encrypt_signed_async(self,
+                                   signed: PackSignedResult,
+                                   to: List[str],
+                                   frm: Optional[str] = None,
+                                   config: Optional[PackEncryptedConfig] = None) -> List[PackManyResult]:
+        # the same JWS is the payload of the message encrypted to each recipient
+        return await self.pack_many_async([PackRequest(None, t, frm, config=config, signed=signed) for t in to])
+
+    def pack_many(self, requests: List[PackRequest]) -> List[PackManyResult]:
+        return _run(self.pack_many_async(requests))
+
+    async def pack_many_async(self, requests: List[PackRequest]) -> List[PackManyResult]:
+        resolvers_config = self._batch_resolvers_config()
+        return list(await asyncio.gather(*[self._pack_or_error(resolvers_config, r) for r in requests]))
+
+    def pack_multicast(self,
+                       msg: str,
+                       to: List[str],
+                       frm: Optional[str] = None,
+                       sign_frm: Optional[str] = None,
+                       config: Optional[PackEncryptedConfig] = None,
+                       sign_once: bool = False) -> List[PackManyResult]:
+        return _run(self.pack_multicast_async(msg=msg, to=to, frm=frm, sign_frm=sign_frm, config=config,
+                                              sign_once=sign_once))
+
+    async def pack_multicast_async(self,
+                                   msg: str,
+                                   to: List[str],
+                                   frm: Optional[str] = None,
+                                   sign_frm: Optional[str] = None,
+                                   config: Optional[PackEncryptedConfig] = None,
+                                   sign_once: bool = False) -> List[PackManyResult]:
+        # With `sign_once`, a signed message is signed once and then encrypted to each recipient,
+        # instead of being signed for each of them. Its `to` lists all recipients then,
+        # so every recipient can see who else received it.
+        if not sign_once or sign_frm is None:
+            return await self.pack_many_async([PackRequest(msg, t, frm, sign_frm, config) for t in to])
+        try:
+            signed = await self._pack_signed(make_message({"msg": msg}, frm=frm, to=list(to)), sign_frm)
+        except PACK_ERRORS as e:
+            return [e] * len(to)
+        return await self.encrypt_signed_async(signed, to, frm=frm, config=config)
+
+    def pack_file(self,
+                  src: BinaryIO,
+                  dst: BinaryIO,
+                  to: str,
+                  frm: Optional[str] = None,
+                  sign_frm: Optional[str] = None,
+                  config: Optional[PackEncryptedConfig] = None,
+                  link: Optional[str] = None,
+                  filename: Optional[str] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> PackEncryptedResult:
+        return _run(self.pack_file_async(src, dst, to=to, frm=frm, sign_frm=sign_frm, config=config, link=link,
+                                         filename=filename, chunk_size=chunk_size))
+
+    async def pack_file_async(self,
+                              src: BinaryIO,
+                              dst: BinaryIO,
+                              to: str,
+                              frm: Optional[str] = None,
+                              sign_frm: Optional[str] = None,
+                              config: Optional[PackEncryptedConfig] = None,
+                              link: Optional[str] = None,
+                              filename: Optional[str] = None,
+                              chunk_size: int = DEFAULT_CHUNK_SIZE) -> PackEncryptedResult:
+        # Large content (read from a file-like object or an mmap) is encrypted chunk by chunk into `dst`,
+        # and the returned message only carries the content key and a reference (`link`) to the encrypted content,
+        # so memory use doesn't depend on the content size. See `unpack_file`.
+        with self.instrumentation.stage("pack.encrypt_content"):
+            stream_key = encrypt_stream(src, dst, chunk_size)
+        body, attachments = content_envelope(stream_key, link=link, filename=filename)
+        return await self._pack(self.resolvers_config, PackRequest(
+            None, to, frm, sign_frm, config, body=body, type=ENCRYPTED_CONTENT_TYPE, attachments=attachments
+        ))
+
+    async def _pack_or_error(self, resolvers_config: ResolversConfig, request: PackRequest) -> PackManyResult:
+        try:
+            return await self._pack(resolvers_config, request)
+        except PACK_ERRORS as e:
+            return e
+
+    async def _pack(self, resolvers_config: ResolversConfig, request: PackRequest) -> PackEncryptedResult:
+        with self.instrumentation.stage("pack"):
+            config = replace(request.config) if request.config else PackEncryptedConfig(protect_sender_id=True)
+            # a config with forward=False opts out even if forwarding is on
+            forward = self.forward and config.forward
+            config.forward = False  # wrapped below with the cached routing chain
+            # DID resolution and secrets lookup are timed as nested stages,
+            # so the self time of this stage is signing and encryption
+            with self.instrumentation.stage("pack.crypto"):
+                if request.signed is not None:
+                    res = await _encrypt_signed(resolvers_config, request.signed, request.to, request.frm, config)
+                else:
+                    message = make_message(
+                        request.body if request.body is not None else {"msg": request.msg},
+                        type=request.type,
+                        frm=request.frm,
+                        to=[request.to],
+                        attachments=request.attachments
+                    )
+                    res = await pack_encrypted(
+                        resolvers_config=resolvers_config,
+                        message=message,
+                        frm=request.frm,
+                        to=request.to,
+                        sign_frm=request.sign_frm,
+                        pack_config=config
+                    )
+            if forward:
+                with self.instrumentation.stage("pack.forward"):
+                    res = await self._wrap_in_forward(resolvers_config, request.to, res, config)
+            return res
+
+    async def _pack_signed(self, message: Message, sign_frm: str) -> PackSignedResult:
+        with self.instrumentation.stage("pack_signed"):
+            return await pack_signed(self.resolvers_config, message, sign_frm)
+
+    async def _wrap_in_forward(self,
+                               resolvers_config: ResolversConfig,
+                               to: str,
+                               res: PackEncryptedResult,
+                               config: PackEncryptedConfig) -> PackEncryptedResult:
+        chain = self._routing_chains.get(to)
+        if chain is None:
+            chain = await resolve_routing_chain(resolvers_config, to)
+            self._routing_chains.put(to, chain)
+        if not chain.hops:
+            return res
+        packed_msg = wrap_in_forward(chain, json.loads(res.packed_msg), config.enc_alg_anon)
+        return replace(res, packed_msg=dict_to_json(packed_msg))
+
+    def clear_routing_chains(self):
+        # to be called when the DID Docs of recipients or their mediators change
+        self._routing_chains.clear()
+
+    def unpack(self, packed_msg: str) -> UnpackedMessage:
+        return _run(self.unpack_async(packed_msg))
+
+    async def unpack_async(self, packed_msg: str) -> UnpackedMessage:
+        return await self._unpack(self.resolvers_config, packed_msg)
+
+    def unpack_many(self, packed_msgs: List[str]) -> List[UnpackStreamResult]:
+        return _run(self.unpack_many_async(packed_msgs))
+
+    async def unpack_many_async(self, packed_msgs: List[str]) -> List[UnpackStreamResult]:
+        resolvers_config = self._batch_resolvers_config()
+        return list(await asyncio.gather(*[self._unpack_or_error(resolvers_config, m) for m in packed_msgs]))
+
+    def unpack_file(self,
+                    packed_msg: str,
+                    src: Optional[BinaryIO],
+                    dst: BinaryIO,
+                    content_dir: Optional[str] = None) -> UnpackedMessage:
+        return _run(self.unpack_file_async(packed_msg, src, dst, content_dir=content_dir))
+
+    async def unpack_file_async(self,
+                                packed_msg: str,
+                                src: Optional[BinaryIO],
+                                dst: BinaryIO,
+                                content_dir: Optional[str] = None) -> UnpackedMessage:
+        # unpacks a message packed by `pack_file` and decrypts its content from `src` into `dst`;
+        # if `src` is not given, the encrypted content is read from the file the message links to,
+        # which must be inside `content_dir`
+        if src is None and content_dir is None:
+            raise ValueError("Either src or content_dir must be given")
+        res = await self._unpack(self.resolvers_config, packed_msg)
+        stream_key, attachment = read_content_envelope(res[3].message)
+        with self.instrumentation.stage("unpack.decrypt_content"):
+            if src is not None:
+                decrypt_stream(src, dst, stream_key)
+            else:
+                with open(content_link_path(attachment, content_dir), "rb") as f:
+                    decrypt_stream(f, dst, stream_key)
+        return res
+
+    async def _unpack_or_error(self, resolvers_config: ResolversConfig, packed_msg: str) -> UnpackStreamResult:
+        try:
+            return await self._unpack(resolvers_config, packed_msg)
+        except PACK_ERRORS as e:
+            return e
+
+    async def unpack_stream(self,
+                            packed_msgs: Union[Iterable[str], AsyncIterable[str]],
+                            concurrency: int = 16,
+                            ordered: bool = True,
+                            max_pending: Optional[int] = None
+                            ) -> AsyncIterator[Tuple[int, UnpackStreamResult]]:
+        # Yields (index, result) pairs where result is either what `unpack` returns or the error for the item.
+        # At most `max_pending` messages are read from the source ahead of the consumer,
+        # so a slow consumer (or a slow item in ordered mode) stops reading of the source.
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be positive: {concurrency}")
+        max_pending = max_pending or 2 * concurrency
+        resolvers_config = self._batch_resolvers_config()
+        window = asyncio.Semaphore(max_pending)
+        in_queue = asyncio.Queue(maxsize=concurrency)
+        out_queue = asyncio.Queue()
+        feeder_error = []
+
+        async def feed():
+            try:
+                i = 0
+                async for packed_msg in _aiter(packed_msgs):
+                    await window.acquire()
+                    await in_queue.put((i, packed_msg))
+                    i += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                feeder_error.append(e)
+            for _ in range(concurrency):
+                await in_queue.put(None)
+
+        async def work():
+            while True:
+                item = await in_queue.get()
+                if item is None:
+                    await out_queue.put(None)
+                    return
+                i, packed_msg = item
+                try:
+                    res = await self._unpack(resolvers_config, packed_msg)
+                except Exception as e:
+                    # any error must be reported for the item, otherwise the stream never finishes
+                    res = e
+                await out_queue.put((i, res))
+
+        tasks = [asyncio.ensure_future(feed())] + [asyncio.ensure_future(work()) for _ in range(concurrency)]
+        try:
+            finished_workers = 0
+            next_index = 0
+            done = {}
+            while finished_workers < concurrency:
+                item = await out_queue.get()
+                if item is None:
+                    finished_workers += 1
+                    continue
+                if not ordered:
+                    yield item
+                    window.release()
+                    continue
+                done[item[0]] = item[1]
+                while next_index in done:
+                    yield next_index, done.pop(next_index)
+                    window.release()
+                    next_index += 1
+            if feeder_error:
+                raise feeder_error[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _batch_resolvers_config(self) -> ResolversConfig:
+        # each distinct DID is resolved once thanks to the DID Doc cache,
+        # and each secret is looked up once per batch
+        return ResolversConfig(
+            secrets_resolver=SecretsResolverBatch(self.resolvers_config.secrets_resolver),
+            did_resolver=self.resolvers_config.did_resolver
         )
-        config = config or PackEncryptedConfig(protect_sender_id=True)
-        config.forward = False  # until it's support in all languages
-        return asyncio.get_event_loop().run_until_complete(
-            pack_encrypted(
-                resolvers_config=self.resolvers_config,
-                message=message,
-                frm=frm,
-                to=to,
-                sign_frm=sign_frm,
-                pack_config=config
-            )
+
+    async def _unpack(self, resolvers_config: ResolversConfig, packed_msg: str) -> UnpackedMessage:
+        with self.instrumentation.stage("unpack"):
+            with self.instrumentation.stage("unpack.crypto"):
+                res = await unpack(
+                    resolvers_config=resolvers_config,
+                    packed_msg=packed_msg
+                )
+            # None for messages with other bodies (see `UnpackResult.message`)
+            msg = res.message.body.get("msg") if isinstance(res.message.body, dict) else None
+            if not res.metadata.encrypted:
+                # signed (`frm` is the signer then) or plaintext messages are not addressed to any of our keys
+                frm = get_did(res.metadata.sign_from) if res.metadata.sign_from else res.message.frm
+                to = res.message.to[0] if res.message.to else None
+                return UnpackedMessage(msg, frm, to, res, [])
+            frm = get_did(res.metadata.encrypted_from) if res.metadata.encrypted_from else None
+            # the message may be encrypted to other parties' keys as well
+            recipients = await resolvers_config.secrets_resolver.get_keys(res.metadata.encrypted_to)
+            to = get_did(recipients[0] if recipients else res.metadata.encrypted_to[0])
+            return UnpackedMessage(msg, frm, to, res, recipients)
+
+
+def generate_peer_did(auth_keys_count: int = 1,
+                      agreement_keys_count: int = 1,
+                      service_endpoint: Optional[str] = None,
+                      service_routing_keys: Optional[List[str]] = None,
+                      key_pool: Optional[KeyPool] = None,
+                      instrumentation: Instrumentation = NO_INSTRUMENTATION
+                      ) -> Tuple[str, List[Secret]]:
+    # 1. generate keys in JWK format (or take pre-generated ones from the pool)
+    with instrumentation.stage("create_peer_did.generate_keys"):
+        if key_pool is not None:
+            agreem_keys = [key_pool.get_x25519() for _ in range(agreement_keys_count)]
+            auth_keys = [key_pool.get_ed25519() for _ in range(auth_keys_count)]
+        else:
+            agreem_keys = [generate_x25519_keys_as_jwk_dict() for _ in range(agreement_keys_count)]
+            auth_keys = [generate_ed25519_keys_as_jwk_dict() for _ in range(auth_keys_count)]
+
+    # 2. prepare the keys for peer DID lib
+    agreem_keys_peer_did = [
+        VerificationMaterialAgreement(
+            type=VerificationMethodTypeAgreement.JSON_WEB_KEY_2020,
+            format=VerificationMaterialFormatPeerDID.JWK,
+            value=k[1],
+        )
+        for k in agreem_keys
+    ]
+    auth_keys_peer_did = [
+        VerificationMaterialAuthentication(
+            type=VerificationMethodTypeAuthentication.JSON_WEB_KEY_2020,
+            format=VerificationMaterialFormatPeerDID.JWK,
+            value=k[1],
         )
+        for k in auth_keys
+    ]
 
-    def unpack(self, packed_msg: str) -> (str, str, UnpackResult):
-        res = asyncio.get_event_loop().run_until_complete(
-            unpack(
-                resolvers_config=self.resolvers_config,
-                packed_msg=packed_msg
-            )
+    # 3. generate service
+    service = None
+    if service_endpoint:
+        service = json.dumps(
+            DIDCommServicePeerDID(
+                id="new-id",
+                service_endpoint=service_endpoint, routing_keys=service_routing_keys,
+                accept=["didcomm/v2"]
+            ).to_dict()
         )
-        msg = res.message.body["msg"]
-        frm = get_did(res.metadata.encrypted_from) if res.metadata.encrypted_from else None
-        to = get_did(res.metadata.encrypted_to[0])
-        return msg, frm, to, res
+
+    # 4. call peer DID lib
+    # if we have just one key (auth), then use numalg0 algorithm
+    # otherwise use numalg2 algorithm
+    with instrumentation.stage("create_peer_did.encode_did"):
+        if len(auth_keys_peer_did) == 1 and not agreem_keys_peer_did and not service:
+            did = peer_did.create_peer_did_numalgo_0(auth_keys_peer_did[0])
+        else:
+            did = peer_did.create_peer_did_numalgo_2(
+                encryption_keys=agreem_keys_peer_did,
+                signing_keys=auth_keys_peer_did,
+                service=service,
+            )
+
+    # 5. set KIDs as in DID DOC for secrets
+    auth_kids, agreement_kids = peer_did_kids(did)
+    secrets = []
+    for auth_key, kid in zip(auth_keys, auth_kids):
+        private_key = auth_key[0]
+        private_key["kid"] = kid
+        secrets.append(jwk_to_secret(private_key))
+    for agreem_key, kid in zip(agreem_keys, agreement_kids):
+        private_key = agreem_key[0]
+        private_key["kid"] = kid
+        secrets.append(jwk_to_secret(private_key))
+
+    return did, secrets
+
+
+def peer_did_kids(did: str) -> Tuple[List[str], List[str]]:
+    # KIDs of the authentication and agreement keys as in the resolved DID Doc,
+    # derived from the DID itself without resolving it
+    if did.startswith("did:peer:0"):
+        return [did + "#" + did[11:]], []
+    auth_kids = []
+    agreement_kids = []
+    for element in did[11:].split("."):
+        if element[0] == Numalgo2Prefix.AUTHENTICATION.value:
+            auth_kids.append(did + "#" + element[2:])
+        elif element[0] == Numalgo2Prefix.KEY_AGREEMENT.value:
+            agreement_kids.append(did + "#" + element[2:])
+    return auth_kids, agreement_kids
+
+
+def _generate_peer_did(args: tuple) -> Tuple[str, List[Secret]]:
+    return generate_peer_did(*args)
+
+
+async def add_secrets(secrets_resolver: SecretsResolverEditable, secrets: List[Secret]):
+    # stores all secrets at once if the resolver supports it (`add_keys` of SecretsResolverFile,
+    # SecretsResolverSqlite and SecretsResolverIndexed); a plain SecretsResolverDemo rewrites its file for every key
+    if hasattr(secrets_resolver, "add_keys"):
+        await secrets_resolver.add_keys(secrets)
+    else:
+        for secret in secrets:
+            await secrets_resolver.add_key(secret)
+
+
+async def _encrypt_signed(resolvers_config: ResolversConfig,
+                          signed: PackSignedResult,
+                          to: str,
+                          frm: Optional[str],
+                          config: PackEncryptedConfig) -> PackEncryptedResult:
+    # what `pack_encrypted` does after signing (except forwarding), with the given JWS as the payload;
+    # `to` must be a recipient of the signed message and `frm` its sender, as `pack_encrypted` checks
+    jws = json.loads(signed.packed_msg)
+    _validate_pack_encrypted(Message.from_dict(parse_base64url_encoded_json(jws["payload"])), to, frm)
+    if frm is not None:
+        encrypted = await find_keys_and_authcrypt(jws, to, frm, config.enc_alg_auth, resolvers_config)
+    else:
+        encrypted = await find_keys_and_anoncrypt(jws, to, config.enc_alg_anon, resolvers_config)
+    packed_msg = encrypted.msg
+    if encrypted.from_kid is not None and config.protect_sender_id:
+        packed_msg = anoncrypt(packed_msg, encrypted.to_keys, config.enc_alg_anon).msg
+    services = await resolve_did_services_chain(resolvers_config, to)
+    return PackEncryptedResult(
+        packed_msg=dict_to_json(packed_msg),
+        to_kids=encrypted.to_kids,
+        from_kid=encrypted.from_kid,
+        sign_from_kid=signed.sign_from_kid,
+        from_prior_issuer_kid=signed.from_prior_issuer_kid,
+        service_metadata=ServiceMetadata(services[-1].id, services[0].service_endpoint) if services else None
+    )
+
+
+def _run(coro):
+    # the sync API is a thin wrapper over the async one; use the `*_async` methods from a running event loop
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+async def _aiter(items: Union[Iterable, AsyncIterable]) -> AsyncIterator:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
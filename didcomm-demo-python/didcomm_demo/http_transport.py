@@ -0,0 +1,385 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Dict, Tuple, List, Union, Callable, Awaitable
+from urllib.parse import urlsplit
+
+from didcomm.common.types import DID
+from didcomm.pack_encrypted import PackEncryptedConfig
+from didcomm.protocols.routing.forward import resolve_did_services_chain
+
+from didcomm_demo.didcomm_demo import DIDCommDemo, PackRequest, PACK_ERRORS
+
+MEDIA_TYPE_ENCRYPTED = "application/didcomm-encrypted+json"
+
+# responses worth retrying: the request may succeed on another attempt
+RETRY_STATUSES = (502, 503, 504)
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 405: "Method Not Allowed", 413: "Payload Too Large",
+            415: "Unsupported Media Type", 500: "Internal Server Error"}
+
+
+class HTTPTransportError(Exception):
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(frozen=True)
+class HTTPResponse:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+class _NotSent(Exception):
+    # a failure before the request was written (so it can't have been delivered)
+    pass
+
+
+class _HostPool:
+
+    def __init__(self, limit: int) -> None:
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle = deque()
+
+
+class HTTPClient:
+    """
+    Minimal asyncio HTTP/1.1 client for delivering DIDComm messages.
+
+    Connections are kept alive and reused per host; at most `max_connections_per_host` requests
+    to the same host are in flight at once (the others wait for a free connection).
+    Failures to connect (including connect timeouts) and 502/503/504 responses are retried up to `retries` times
+    with exponential backoff starting at `backoff` seconds. A failure after the request was written
+    (a lost connection, a response timeout) is not retried, as the server may have accepted the message already:
+    it's reported as an `HTTPTransportError`, and it's up to the caller to send the message again.
+    Delivery is therefore at least once when the caller retries such errors, and at most once otherwise.
+    """
+
+    def __init__(self,
+                 max_connections_per_host: int = 8,
+                 retries: int = 2,
+                 backoff: float = 0.1,
+                 timeout: float = 30.0) -> None:
+        if max_connections_per_host < 1:
+            raise ValueError(f"max_connections_per_host must be positive: {max_connections_per_host}")
+        self.max_connections_per_host = max_connections_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._pools: Dict[Tuple[str, str, int], _HostPool] = {}
+
+    async def post(self, url: str, body: bytes, content_type: str = MEDIA_TYPE_ENCRYPTED) -> HTTPResponse:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise HTTPTransportError(f"Unsupported URL: {url}")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _HostPool(self.max_connections_per_host)
+
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"\r\n"
+        ).encode("latin-1") + body
+
+        attempt = 0
+        while True:
+            try:
+                async with pool.semaphore:
+                    response = await self._send(key, pool, request)
+                if response.status not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+            except _NotSent as e:
+                if attempt >= self.retries:
+                    raise HTTPTransportError(f"POST {url} failed: {e.__cause__!r}") from e.__cause__
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                raise HTTPTransportError(f"POST {url} failed (the message may have been delivered): {e!r}") from e
+            attempt += 1
+            await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+    async def _send(self, key: Tuple[str, str, int], pool: _HostPool, request: bytes) -> HTTPResponse:
+        while pool.idle:
+            reader, writer = pool.idle.popleft()
+            # idle connections closed by the server are dropped before anything is written to them
+            if reader.at_eof() or writer.is_closing():
+                writer.close()
+                continue
+            return await self._exchange(pool, reader, writer, request)
+
+        scheme, host, port = key
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, ssl=True if scheme == "https" else None), self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise _NotSent() from e
+        self.connections_opened += 1
+        return await self._exchange(pool, reader, writer, request)
+
+    async def _exchange(self,
+                        pool: _HostPool,
+                        reader: asyncio.StreamReader,
+                        writer: asyncio.StreamWriter,
+                        request: bytes) -> HTTPResponse:
+        try:
+            writer.write(request)
+            await writer.drain()
+            status_line, headers, body = await asyncio.wait_for(read_http_message(reader, response=True),
+                                                                self.timeout)
+            status = int(status_line.split(" ", 2)[1])
+        except BaseException:
+            writer.close()
+            raise
+        # a body delimited by the end of the connection leaves nothing to reuse
+        if headers.get("connection", "").lower() == "close" or _close_delimited(status_line, headers):
+            writer.close()
+        else:
+            pool.idle.append((reader, writer))
+        return HTTPResponse(status, headers, body)
+
+    async def close(self):
+        for pool in self._pools.values():
+            while pool.idle:
+                _, writer = pool.idle.popleft()
+                writer.close()
+        self._pools.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+async def read_http_message(reader: asyncio.StreamReader,
+                            max_body_size: Optional[int] = None,
+                            response: bool = False) -> Tuple[str, Dict[str, str], bytes]:
+    # reads an HTTP/1.1 request or response: (start line, headers with lower-case names, body);
+    # a response with neither Content-Length nor chunked encoding is read until the connection is closed
+    start_line = await reader.readline()
+    if not start_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(line, None)
+        if line in (b"\r\n", b"\n"):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        size = 0
+        while True:
+            chunk_size = int((await reader.readline()).split(b";")[0], 16)
+            if chunk_size == 0:
+                # skip trailers
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            size += chunk_size
+            if max_body_size is not None and size > max_body_size:
+                raise _BodyTooLarge()
+            chunks.append(await reader.readexactly(chunk_size))
+            await reader.readexactly(2)
+        body = b"".join(chunks)
+    elif response and _close_delimited(start_line.decode("latin-1"), headers):
+        body = await reader.read(-1 if max_body_size is None else max_body_size + 1)
+        if max_body_size is not None and len(body) > max_body_size:
+            raise _BodyTooLarge()
+    else:
+        length = int(headers.get("content-length", 0))
+        if max_body_size is not None and length > max_body_size:
+            raise _BodyTooLarge()
+        body = await reader.readexactly(length)
+
+    return start_line.decode("latin-1").strip(), headers, body
+
+
+def _close_delimited(status_line: str, headers: Dict[str, str]) -> bool:
+    if "content-length" in headers or headers.get("transfer-encoding", "").lower() == "chunked":
+        return False
+    # responses which never have a body
+    status = int(status_line.split(" ", 2)[1])
+    return not (100 <= status < 200 or status in (204, 304))
+
+
+class DIDCommHTTPSender:
+    """
+    Packs messages and POSTs them to the HTTP(S) endpoint of the recipient's DIDComm service
+    (found in the recipient's DID Doc).
+    """
+
+    def __init__(self, demo: DIDCommDemo, client: Optional[HTTPClient] = None) -> None:
+        self.demo = demo
+        self.client = client or HTTPClient()
+
+    async def find_endpoint(self, to: DID) -> str:
+        # the endpoint of the recipient's DIDComm service or, if it's the DID of a mediator, of the mediator's one
+        # (as in the service metadata of packed messages)
+        services = await resolve_did_services_chain(self.demo.resolvers_config, to)
+        return _http_endpoint(services[0].service_endpoint if services else None, to)
+
+    async def send(self,
+                   msg: str,
+                   to: str,
+                   frm: Optional[str] = None,
+                   sign_frm: Optional[str] = None,
+                   config: Optional[PackEncryptedConfig] = None) -> HTTPResponse:
+        return await self.send_request(PackRequest(msg, to, frm, sign_frm, config))
+
+    async def send_request(self, request: PackRequest) -> HTTPResponse:
+        res = await self.demo.pack_request_async(request)
+        endpoint = res.service_metadata.service_endpoint if res.service_metadata else None
+        return await self.send_packed(res.packed_msg, request.to, _http_endpoint(endpoint, request.to))
+
+    async def send_packed(self, packed_msg: str, to: str, endpoint: Optional[str] = None) -> HTTPResponse:
+        # the endpoint is found in the DID Doc of `to` unless given (see `find_endpoint`)
+        endpoint = endpoint or await self.find_endpoint(to)
+        response = await self.client.post(endpoint, packed_msg.encode())
+        if response.status >= 300:
+            raise HTTPTransportError(f"{endpoint} responded with {response.status}", response.status)
+        return response
+
+    async def send_many(self, requests: List[PackRequest]) -> List[Union[HTTPResponse, Exception]]:
+        # messages are sent concurrently (bounded per host by the client); errors are returned per message
+        async def send_or_error(r: PackRequest):
+            try:
+                return await self.send_request(r)
+            except PACK_ERRORS + (HTTPTransportError,) as e:
+                return e
+
+        return list(await asyncio.gather(*[send_or_error(r) for r in requests]))
+
+    async def close(self):
+        await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+def _http_endpoint(endpoint: Optional[str], to: DID) -> str:
+    if endpoint is None or not endpoint.startswith(("http://", "https://")):
+        raise HTTPTransportError(f"DID Doc of {to} has no DIDComm service with an HTTP endpoint")
+    return endpoint
+
+
+class DIDCommHTTPReceiver:
+    """
+    Lightweight asyncio HTTP server receiving DIDComm messages.
+
+    Each POSTed `application/didcomm-encrypted+json` message is unpacked with `demo` and passed to `on_message`
+    (or put into the `messages` queue if it's not set) as returned by `DIDCommDemo.unpack`.
+    Responds with 202 once the message is unpacked, and with 400 if it can't be unpacked.
+    Connections are kept alive unless the client asks to close them.
+    """
+
+    def __init__(self,
+                 demo: DIDCommDemo,
+                 on_message: Optional[Callable[[tuple], Awaitable[None]]] = None,
+                 max_body_size: int = 10 * 1024 * 1024) -> None:
+        self.demo = demo
+        self.on_message = on_message
+        self.max_body_size = max_body_size
+        self.messages = asyncio.Queue() if on_message is None else None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._connections = set()
+        self.host: Optional[str] = None
+        self.port: Optional[int] = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        # port 0 binds a free port; returns the endpoint to use as the service endpoint of peer DIDs
+        self.server = await asyncio.start_server(self._serve_connection, host, port)
+        self.host, self.port = self.server.sockets[0].getsockname()[:2]
+        return self.endpoint
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            # the server doesn't close open (kept alive) connections itself
+            for task in self._connections:
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    start_line, headers, body = await read_http_message(reader, self.max_body_size)
+                except asyncio.IncompleteReadError:
+                    break
+                except _BodyTooLarge:
+                    await self._respond(writer, 413, keep_alive=False)
+                    break
+                except ValueError:
+                    await self._respond(writer, 400, keep_alive=False)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status = await self._handle(start_line.split(" ")[0], headers, body)
+                await self._respond(writer, status, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _handle(self, method: str, headers: Dict[str, str], body: bytes) -> int:
+        if method != "POST":
+            return 405
+        if headers.get("content-type", "").split(";")[0].strip() != MEDIA_TYPE_ENCRYPTED:
+            return 415
+        try:
+            res = await self.demo.unpack_async(body.decode())
+        except PACK_ERRORS + (UnicodeDecodeError,):
+            return 400
+        if self.on_message is None:
+            await self.messages.put(res)
+            return 202
+        try:
+            await self.on_message(res)
+        except Exception:
+            return 500
+        return 202
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, keep_alive: bool = True):
+        writer.write((
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Length: 0\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n"
+        ).encode("latin-1"))
+        await writer.drain()
@@ -0,0 +1,182 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, List, Dict
+
+from didcomm.common.types import DID, DID_URL
+from didcomm.did_doc.did_doc import DIDDoc
+from didcomm.did_doc.did_resolver import DIDResolver
+from didcomm.secrets.secrets_resolver import SecretsResolver, Secret
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Instrumentation:
+    """
+    Instrumentation interface: times named stages and counts events.
+
+    This base class does nothing and is used when instrumentation is disabled.
+    """
+
+    enabled = False
+
+    def stage(self, name: str):
+        return _NULL_STAGE
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+
+NO_INSTRUMENTATION = Instrumentation()
+
+
+class StageTimer(Instrumentation):
+    """
+    Collects timings of stages in memory.
+
+    Stages can be nested: besides the total time, the self time of a stage (its time minus the time of the nested
+    stages) is collected, so that, for example, the crypto time of `pack` does not include DID resolution.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._totals: Dict[str, List[float]] = {}
+        self._selfs: Dict[str, List[float]] = {}
+        self._counters: Dict[str, int] = {}
+        self._children = contextvars.ContextVar(f"stage_timer_{id(self)}", default=None)
+
+    @contextmanager
+    def stage(self, name: str):
+        parent_children = self._children.get()
+        children = [0.0]
+        token = self._children.set(children)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._children.reset(token)
+            if parent_children is not None:
+                parent_children[0] += elapsed
+            with self._lock:
+                self._totals.setdefault(name, []).append(elapsed)
+                self._selfs.setdefault(name, []).append(elapsed - children[0])
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+            self._selfs.clear()
+            self._counters.clear()
+
+    def report(self) -> dict:
+        with self._lock:
+            stages = {}
+            for name, totals in self._totals.items():
+                selfs = sorted(self._selfs[name])
+                stages[name] = {
+                    "count": len(totals),
+                    "total_ms": sum(totals) * 1000,
+                    "self_ms": sum(selfs) * 1000,
+                    "self_p50_ms": selfs[len(selfs) // 2] * 1000,
+                    "self_max_ms": selfs[-1] * 1000,
+                }
+            return {"stages": stages, "counters": dict(self._counters)}
+
+    def format(self) -> str:
+        report = self.report()
+        lines = [f"{'stage':<40} {'count':>7} {'total ms':>10} {'self ms':>10}"]
+        for name, s in report["stages"].items():
+            lines.append(f"{name:<40} {s['count']:>7} {s['total_ms']:>10.3f} {s['self_ms']:>10.3f}")
+        for name, value in report["counters"].items():
+            lines.append(f"{name:<40} {value:>7}")
+        return "\n".join(lines)
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    Reports stages as OpenTelemetry spans and duration histograms, and counts as counters.
+
+    Accepts any objects compatible with OpenTelemetry `Tracer` and `Meter`
+    (for example, `opentelemetry.trace.get_tracer(...)` and `opentelemetry.metrics.get_meter(...)`).
+    """
+
+    enabled = True
+
+    def __init__(self, tracer=None, meter=None, prefix: str = "didcomm") -> None:
+        self.tracer = tracer
+        self.meter = meter
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def _instrument(self, instruments: dict, name: str, create):
+        with self._lock:
+            if name not in instruments:
+                instruments[name] = create(name)
+            return instruments[name]
+
+    @contextmanager
+    def stage(self, name: str):
+        span = self.tracer.start_as_current_span(f"{self.prefix}.{name}") if self.tracer is not None else _NULL_STAGE
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            with span:
+                yield
+            outcome = "success"
+        finally:
+            # failed stages are recorded as well, tagged by the outcome
+            if self.meter is not None:
+                histogram = self._instrument(
+                    self._histograms, f"{self.prefix}.{name}.duration",
+                    lambda n: self.meter.create_histogram(n, unit="ms")
+                )
+                histogram.record((time.perf_counter() - started) * 1000, attributes={"outcome": outcome})
+
+    def count(self, name: str, value: int = 1):
+        if self.meter is not None:
+            counter = self._instrument(self._counters, f"{self.prefix}.{name}", self.meter.create_counter)
+            counter.add(value)
+
+
+class InstrumentedDIDResolver(DIDResolver):
+
+    def __init__(self, did_resolver: DIDResolver, instrumentation: Instrumentation) -> None:
+        self.did_resolver = did_resolver
+        self.instrumentation = instrumentation
+
+    async def resolve(self, did: DID) -> Optional[DIDDoc]:
+        with self.instrumentation.stage("resolve_did"):
+            return await self.did_resolver.resolve(did)
+
+
+class InstrumentedSecretsResolver(SecretsResolver):
+
+    def __init__(self, secrets_resolver: SecretsResolver, instrumentation: Instrumentation) -> None:
+        self.secrets_resolver = secrets_resolver
+        self.instrumentation = instrumentation
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        with self.instrumentation.stage("get_secret"):
+            return await self.secrets_resolver.get_key(kid)
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        with self.instrumentation.stage("find_secrets"):
+            return await self.secrets_resolver.get_keys(kids)
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, generate_ed25519_keys_as_jwk_dict
+
+KeyPair = Tuple[dict, dict]
+
+
+@dataclass(frozen=True)
+class KeyPoolStats:
+    x25519_depth: int
+    ed25519_depth: int
+    size: int
+    low_water_mark: int
+    generated: int
+    served: int
+    misses: int
+    refill_rate: float
+
+
+class KeyPool:
+    """
+    Pool of pre-generated X25519 and Ed25519 key pairs (as JWK dicts).
+
+    A background thread fills both pools up to `size` as soon as any of them falls below `low_water_mark`.
+    If a pool is empty, the key pair is generated inline (and counted as a miss).
+    `refill_rate` is the number of key pairs per second generated during the last refill.
+    """
+
+    def __init__(self, size: int = 64, low_water_mark: Optional[int] = None, start: bool = True) -> None:
+        if size < 1:
+            raise ValueError(f"size must be positive: {size}")
+        self.size = size
+        self.low_water_mark = low_water_mark if low_water_mark is not None else max(1, size // 4)
+        self._x25519 = deque()
+        self._ed25519 = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._generated = 0
+        self._served = 0
+        self._misses = 0
+        self._refill_rate = 0.0
+        self._thread = threading.Thread(target=self._refill_loop, name="key-pool-refill", daemon=True)
+        if start:
+            self._thread.start()
+
+    def get_x25519(self) -> KeyPair:
+        return self._get(self._x25519, generate_x25519_keys_as_jwk_dict)
+
+    def get_ed25519(self) -> KeyPair:
+        return self._get(self._ed25519, generate_ed25519_keys_as_jwk_dict)
+
+    def _get(self, pool: deque, generate) -> KeyPair:
+        with self._cond:
+            self._served += 1
+            key_pair = pool.popleft() if pool else None
+            if key_pair is None:
+                self._misses += 1
+            if len(pool) < self.low_water_mark:
+                self._cond.notify()
+        return key_pair or generate()
+
+    def fill(self):
+        # fills both pools up to `size` in the calling thread
+        started = time.perf_counter()
+        generated = 0
+        for pool, generate in ((self._x25519, generate_x25519_keys_as_jwk_dict),
+                               (self._ed25519, generate_ed25519_keys_as_jwk_dict)):
+            while not self._closed and len(pool) < self.size:
+                key_pair = generate()
+                with self._cond:
+                    pool.append(key_pair)
+                    self._generated += 1
+                generated += 1
+        elapsed = time.perf_counter() - started
+        if generated and elapsed > 0:
+            with self._cond:
+                self._refill_rate = generated / elapsed
+
+    def _needs_refill(self) -> bool:
+        return len(self._x25519) < self.low_water_mark or len(self._ed25519) < self.low_water_mark
+
+    def _refill_loop(self):
+        self.fill()
+        while True:
+            with self._cond:
+                while not self._closed and not self._needs_refill():
+                    self._cond.wait()
+                if self._closed:
+                    return
+            self.fill()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def stats(self) -> KeyPoolStats:
+        with self._cond:
+            return KeyPoolStats(
+                x25519_depth=len(self._x25519),
+                ed25519_depth=len(self._ed25519),
+                size=self.size,
+                low_water_mark=self.low_water_mark,
+                generated=self._generated,
+                served=self._served,
+                misses=self._misses,
+                refill_rate=self._refill_rate
+            )
@@ -0,0 +1,70 @@
+import asyncio
+import json
+from collections import defaultdict
+from typing import List, Optional, Union, Dict
+
+from didcomm.common.resolvers import ResolversConfig
+from didcomm.common.types import DID
+from didcomm.core.utils import get_did
+
+from didcomm_demo.didcomm_demo import DIDCommDemo, PACK_ERRORS, peer_did_kids
+from didcomm_demo.routing import unwrap_forward
+from didcomm_demo.secrets_resolver_batch import SecretsResolverBatch
+
+
+class LocalMediator:
+    """
+    In-process mediator: unwraps Forward messages anonymously encrypted to its key and passes
+    the forwarded message on to `next`: to another mediator registered by `add_route`,
+    or else into the mailbox of `next` to be picked up by its owner.
+
+    Recipients use `routing_key` as a routing key of their DIDComm service.
+    """
+
+    def __init__(self, demo: DIDCommDemo, did: DID) -> None:
+        self.demo = demo
+        self.did = did
+        self._routes: Dict[DID, "LocalMediator"] = {}
+        self._mailboxes = defaultdict(list)
+
+    @classmethod
+    async def create(cls, demo: Optional[DIDCommDemo] = None) -> "LocalMediator":
+        demo = demo or DIDCommDemo()
+        return cls(demo, await demo.create_peer_did_async(auth_keys_count=1, agreement_keys_count=1))
+
+    @property
+    def routing_key(self) -> str:
+        return peer_did_kids(self.did)[1][0]
+
+    def add_route(self, mediator: "LocalMediator"):
+        self._routes[mediator.did] = mediator
+
+    async def relay(self, packed_msg: Union[str, dict]):
+        await self._relay(self.demo.resolvers_config, packed_msg)
+
+    async def relay_many(self, packed_msgs: List[Union[str, dict]]) -> List[Optional[Exception]]:
+        # secrets are looked up once for the whole batch; returns the error (or None) for each message
+        resolvers_config = ResolversConfig(
+            secrets_resolver=SecretsResolverBatch(self.demo.resolvers_config.secrets_resolver),
+            did_resolver=self.demo.resolvers_config.did_resolver
+        )
+
+        async def relay_or_error(packed_msg):
+            try:
+                await self._relay(resolvers_config, packed_msg)
+            except PACK_ERRORS as e:
+                return e
+
+        return list(await asyncio.gather(*[relay_or_error(m) for m in packed_msgs]))
+
+    async def _relay(self, resolvers_config: ResolversConfig, packed_msg: Union[str, dict]):
+        _next, forwarded_msg = await unwrap_forward(resolvers_config, packed_msg)
+        mediator = self._routes.get(get_did(_next))
+        if mediator is not None:
+            await mediator.relay(forwarded_msg)
+        else:
+            self._mailboxes[get_did(_next)].append(forwarded_msg)
+
+    def pickup(self, did: DID) -> List[str]:
+        # returns (and removes) the messages forwarded to `did` as JSON strings
+        return [json.dumps(msg) for msg in self._mailboxes.pop(did, [])]
@@ -0,0 +1,77 @@
+import json
+from typing import Optional, List, Union
+
+from didcomm.common.types import DID, DIDCommMessageTypes
+from didcomm.core.utils import id_generator_default
+from didcomm.message import Message, Attachment
+
+DEFAULT_MESSAGE_TYPE = "my-protocol/1.0"
+
+# a body dict, or its JSON as is
+MessageBody = Union[dict, bytes, memoryview]
+# an attachment, or its JSON as is
+MessageAttachment = Union[Attachment, bytes, memoryview]
+
+
+class MessageTemplate:
+    """
+    Plaintext messages of one type from `frm` to `to`.
+
+    Everything but the id, body and attachments is serialized once, when the template is created.
+    A body (or attachment) given as JSON `bytes` or `memoryview` is spliced into the message as is,
+    so the only copy of a large payload made on the way to encryption is the message itself.
+    """
+
+    def __init__(self, type: str = DEFAULT_MESSAGE_TYPE, frm: Optional[DID] = None, to: Optional[List[DID]] = None):
+        self.type = type
+        self.frm = frm
+        self.to = to
+        header = {"typ": DIDCommMessageTypes.PLAINTEXT.value, "type": type}
+        if frm is not None:
+            header["from"] = frm
+        if to is not None:
+            header["to"] = to
+        # '{"typ": ..., "to": [...], "id": ' to be followed by the id, the body and the attachments
+        self._header = json.dumps(header)[:-1].encode() + b', "id": '
+
+    def serialize(self,
+                  body: MessageBody,
+                  attachments: Optional[List[MessageAttachment]] = None,
+                  id: Optional[str] = None) -> bytes:
+        parts = [self._header, json.dumps(id or id_generator_default()).encode(), b', "body": ', _to_json(body)]
+        if attachments:
+            parts.append(b', "attachments": [')
+            for i, attachment in enumerate(attachments):
+                if i:
+                    parts.append(b", ")
+                parts.append(_to_json(attachment.as_dict() if isinstance(attachment, Attachment) else attachment))
+            parts.append(b"]")
+        parts.append(b"}")
+        return b"".join(parts)
+
+    def message(self,
+                body: MessageBody,
+                attachments: Optional[List[Attachment]] = None,
+                id: Optional[str] = None) -> Message:
+        return make_message(body, self.type, self.frm, self.to, attachments, id)
+
+
+def make_message(body: MessageBody,
+                 type: str = DEFAULT_MESSAGE_TYPE,
+                 frm: Optional[DID] = None,
+                 to: Optional[List[DID]] = None,
+                 attachments: Optional[List[Attachment]] = None,
+                 id: Optional[str] = None) -> Message:
+    # for the pack API of the DIDComm lib, which serializes the message itself (so a JSON body is parsed here)
+    return Message(
+        id=id or id_generator_default(),
+        type=type,
+        body=body if isinstance(body, dict) else json.loads(bytes(body)),
+        frm=frm,
+        to=to,
+        attachments=attachments or None
+    )
+
+
+def _to_json(value: Union[dict, bytes, memoryview]) -> Union[bytes, memoryview]:
+    return value if isinstance(value, (bytes, memoryview)) else json.dumps(value).encode()
@@ -0,0 +1,120 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Callable, Iterable, Union
+
+from didcomm.pack_encrypted import PackEncryptedResult, PackEncryptedConfig
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+
+from didcomm_demo.did_doc_cache import DIDDocCache
+from didcomm_demo.didcomm_demo import DIDCommDemo, DEFAULT_SECRETS_RESOLVER, PackRequest, PackManyResult, \
+    PACK_ERRORS, UnpackStreamResult, UnpackedMessage
+from didcomm_demo.worker_error import WorkerError, restore_error
+
+# the demo instance of a worker process, created once by the pool initializer
+_worker_demo: Optional[DIDCommDemo] = None
+
+
+class ParallelDIDComm:
+    """
+    Distributes pack/unpack jobs across worker processes, so that CPU-bound crypto scales with cores.
+
+    Every worker builds its own `DIDCommDemo` once on start-up: the secrets resolver is created by
+    `secrets_resolver_factory` (it must be picklable, for example a module-level function or a `functools.partial`),
+    and each worker keeps its own DID Doc cache.
+    Secrets added after the pool is started are not visible to the workers until `restart` is called.
+    """
+
+    def __init__(self,
+                 secrets_resolver_factory: Callable[[], SecretsResolverEditable] = DEFAULT_SECRETS_RESOLVER,
+                 max_workers: Optional[int] = None,
+                 did_doc_cache_size: int = 1024) -> None:
+        self.secrets_resolver_factory = secrets_resolver_factory
+        self.max_workers = max_workers
+        self.did_doc_cache_size = did_doc_cache_size
+        self.executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.secrets_resolver_factory, self.did_doc_cache_size)
+        )
+
+    def restart(self):
+        self.executor.shutdown(wait=True)
+        self.executor = self._create_executor()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def pack(self,
+             msg: str,
+             to: str,
+             frm: Optional[str] = None,
+             sign_frm: Optional[str] = None,
+             config: Optional[PackEncryptedConfig] = None) -> PackEncryptedResult:
+        return _raise_error(self.executor.submit(_pack_or_error, PackRequest(msg, to, frm, sign_frm, config)).result())
+
+    async def pack_async(self,
+                         msg: str,
+                         to: str,
+                         frm: Optional[str] = None,
+                         sign_frm: Optional[str] = None,
+                         config: Optional[PackEncryptedConfig] = None) -> PackEncryptedResult:
+        return _raise_error(await asyncio.get_event_loop().run_in_executor(
+            self.executor, _pack_or_error, PackRequest(msg, to, frm, sign_frm, config)
+        ))
+
+    def pack_many(self, requests: Iterable[PackRequest], chunksize: int = 16) -> List[PackManyResult]:
+        return [restore_error(res) for res in self.executor.map(_pack_or_error, requests, chunksize=chunksize)]
+
+    def unpack(self, packed_msg: str):
+        return _raise_error(self.executor.submit(_unpack_or_error, packed_msg).result())
+
+    async def unpack_async(self, packed_msg: str):
+        return _raise_error(await asyncio.get_event_loop().run_in_executor(self.executor, _unpack_or_error, packed_msg))
+
+    def unpack_many(self, packed_msgs: Iterable[str], chunksize: int = 16) -> List[UnpackStreamResult]:
+        return [restore_error(res) for res in self.executor.map(_unpack_or_error, packed_msgs, chunksize=chunksize)]
+
+
+def _init_worker(secrets_resolver_factory: Callable[[], SecretsResolverEditable], did_doc_cache_size: int):
+    global _worker_demo
+    # a forked worker inherits the state of the parent's loop (which may be running), so always start a new one
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    _worker_demo = DIDCommDemo(secrets_resolver_factory(), did_doc_cache=DIDDocCache(max_size=did_doc_cache_size))
+
+
+def _pack(request: PackRequest) -> PackEncryptedResult:
+    return _worker_demo.pack_request(request)
+
+
+def _pack_or_error(request: PackRequest) -> Union[PackEncryptedResult, WorkerError]:
+    try:
+        return _pack(request)
+    except PACK_ERRORS as e:
+        return WorkerError(e)
+
+
+def _unpack(packed_msg: str):
+    return _worker_demo.unpack(packed_msg)
+
+
+def _unpack_or_error(packed_msg: str) -> Union[UnpackedMessage, WorkerError]:
+    try:
+        return _unpack(packed_msg)
+    except PACK_ERRORS as e:
+        return WorkerError(e)
+
+
+def _raise_error(result):
+    # errors are sent back from the workers as `WorkerError`s, see `WorkerError`
+    if isinstance(result, WorkerError):
+        raise result.restore()
+    return result
@@ -0,0 +1,253 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Optional, Tuple, Iterable, Iterator, List, Union
+
+from didcomm.common.types import DID, JSON
+from didcomm.did_doc.did_doc import DIDCommService
+from peerdid import peer_did
+from peerdid.core.did_doc_types import DIDCommServicePeerDID, SERVICE_DIDCOMM_MESSAGING, SERVICE_TYPE, \
+    SERVICE_ENDPOINT, SERVICE_ROUTING_KEYS, SERVICE_ACCEPT
+from peerdid.core.multibase import from_base58_multibase, from_base58
+from peerdid.core.multicodec import from_multicodec, Codec
+from peerdid.core.peer_did_helper import Numalgo2Prefix, ServicePrefix
+from peerdid.core.utils import urlsafe_b64encode, urlsafe_b64decode
+from peerdid.core.validation import validate_raw_key_length
+from peerdid.did_doc import DIDDocPeerDID
+from peerdid.errors import MalformedPeerDIDError, PeerDIDError
+from peerdid.types import VerificationMaterialFormatPeerDID
+
+from didcomm_demo.compact_did_doc import CompactDIDDoc, CompactVerificationMethod
+from didcomm_demo.did_doc_cache import DIDDocCache
+from didcomm_demo.did_doc_index_sqlite import DIDDocIndexSqlite
+from didcomm_demo.worker_error import WorkerError, restore_error
+
+# decoded key and service segments are kept by their encoded form, so segments shared by many DIDs
+# (for example the service block of a common mediator) are decoded only once
+SEGMENT_CACHE_SIZE = 4096
+
+# the DID Doc JSON of a peer DID, or why it can't be resolved
+ResolvePeerDIDResult = Union[JSON, PeerDIDError]
+
+# (id fragment, service endpoint, routing keys, accept) of a DIDComm service
+_DecodedService = Tuple[str, Optional[str], Tuple[str, ...], Tuple[str, ...]]
+
+
+def resolve_peer_did_doc(did: DID) -> CompactDIDDoc:
+    """
+    Resolves a numalgo 0 or 2 peer DID straight into a `CompactDIDDoc` with JWK verification methods.
+
+    Gives the same DID Doc as `resolve_peer_did_doc_json` (and raises the same `MalformedPeerDIDError`s),
+    but without building, serializing and parsing the JSON DID Doc of the peer DID lib.
+    """
+    if not peer_did.is_peer_did(did):
+        raise MalformedPeerDIDError("Does not match peer DID regexp")
+
+    if did[9] == "0":
+        method = CompactVerificationMethod(id=did + "#" + did[11:], controller=did, jwk=_decode_key(did[10:], False))
+        return CompactDIDDoc(
+            did=did,
+            key_agreement_kids=[],
+            authentication_kids=[method.id],
+            verification_methods=[method],
+            didcomm_services=[]
+        )
+
+    authentication = []
+    key_agreement = []
+    service = ""
+    for element in did[11:].split("."):
+        prefix = element[0]
+        if prefix == Numalgo2Prefix.SERVICE.value:
+            service = element[1:]
+        elif prefix == Numalgo2Prefix.AUTHENTICATION.value:
+            jwk = _decode_key(element[1:], False)
+            authentication.append(CompactVerificationMethod(id=did + "#" + element[2:], controller=did, jwk=jwk))
+        elif prefix == Numalgo2Prefix.KEY_AGREEMENT.value:
+            jwk = _decode_key(element[1:], True)
+            key_agreement.append(CompactVerificationMethod(id=did + "#" + element[2:], controller=did, jwk=jwk))
+        else:
+            raise MalformedPeerDIDError("Unknown prefix: {}.".format(prefix))
+
+    return CompactDIDDoc(
+        did=did,
+        key_agreement_kids=[m.id for m in key_agreement],
+        authentication_kids=[m.id for m in authentication],
+        verification_methods=authentication + key_agreement,
+        didcomm_services=[
+            DIDCommService(
+                id=did + fragment,
+                service_endpoint=service_endpoint,
+                routing_keys=list(routing_keys),
+                accept=list(accept)
+            )
+            for fragment, service_endpoint, routing_keys, accept in _decode_service(service)
+        ] if service else []
+    )
+
+
+def resolve_peer_did_doc_json(did: DID) -> CompactDIDDoc:
+    # the reference path through the JSON DID Doc of the peer DID lib
+    return _did_doc_from_json(peer_did.resolve_peer_did(did, format=VerificationMaterialFormatPeerDID.JWK))
+
+
+def _did_doc_from_json(did_doc_json: JSON) -> CompactDIDDoc:
+    # a `CompactDIDDoc` from the JSON DID Doc of the peer DID lib in any verification material format
+    did_doc = DIDDocPeerDID.from_json(did_doc_json)
+
+    return CompactDIDDoc(
+        did=did_doc.did,
+        key_agreement_kids=did_doc.agreement_kids,
+        authentication_kids=did_doc.auth_kids,
+        verification_methods=[
+            CompactVerificationMethod(
+                id=m.id,
+                controller=did_doc.did,
+                jwk=_jwk(m.ver_material.format, m.ver_material.value, agreement)
+            )
+            for methods, agreement in ((did_doc.authentication, False), (did_doc.key_agreement, True))
+            for m in methods
+        ],
+        didcomm_services=[
+            DIDCommService(
+                id=s.id,
+                service_endpoint=s.service_endpoint,
+                routing_keys=s.routing_keys or [],
+                accept=s.accept or []
+            )
+            for s in did_doc.service
+            if isinstance(s, DIDCommServicePeerDID)
+        ] if did_doc.service else []
+    )
+
+
+def _jwk(format: VerificationMaterialFormatPeerDID, value: Union[str, dict], agreement: bool) -> str:
+    # the verification material of a method -> JWK (as a JSON string)
+    if format == VerificationMaterialFormatPeerDID.JWK:
+        return json.dumps(value)
+    key = from_base58(value) if format == VerificationMaterialFormatPeerDID.BASE58 else from_base58_multibase(value)[1]
+    return json.dumps({
+        "kty": "OKP",
+        "crv": "X25519" if agreement else "Ed25519",
+        "x": urlsafe_b64encode(key).decode("utf-8"),
+    })
+
+
+def resolve_peer_dids(dids: Iterable[DID],
+                      format: VerificationMaterialFormatPeerDID = VerificationMaterialFormatPeerDID.JWK,
+                      workers: Optional[int] = None,
+                      batch_size: int = 1024,
+                      did_doc_cache: Optional[DIDDocCache] = None,
+                      did_doc_index: Optional[DIDDocIndexSqlite] = None) -> Iterator[Tuple[DID, ResolvePeerDIDResult]]:
+    """
+    Validates and resolves any number of peer DIDs, yielding (DID, DID Doc JSON or error) pairs in the input order.
+
+    A malformed DID is reported by its `MalformedPeerDIDError` and doesn't stop the others.
+    The input is consumed lazily in batches of `batch_size` DIDs, and a batch is split between `workers` processes
+    (if more than one). The DID Docs of the resolved DIDs are also put into `did_doc_cache` and `did_doc_index`
+    (if given), so they are warm for pack/unpack.
+    """
+    with_did_docs = did_doc_cache is not None or did_doc_index is not None
+    executor = ProcessPoolExecutor(max_workers=workers) if workers is not None and workers > 1 else None
+    try:
+        dids = iter(dids)
+        while True:
+            batch = list(islice(dids, batch_size))
+            if not batch:
+                break
+            if executor is not None:
+                chunk_size = -(-len(batch) // workers)
+                chunks = [batch[i:i + chunk_size] for i in range(0, len(batch), chunk_size)]
+                results = [(restore_error(res), did_doc)
+                           for chunk in executor.map(_resolve_chunk_in_worker, chunks, [format] * len(chunks),
+                                                     [with_did_docs] * len(chunks))
+                           for res, did_doc in chunk]
+            else:
+                results = _resolve_chunk(batch, format, with_did_docs)
+
+            did_docs = [(did, did_doc) for did, (_, did_doc) in zip(batch, results) if did_doc is not None]
+            if did_doc_cache is not None:
+                for did, did_doc in did_docs:
+                    did_doc_cache.put(did, did_doc)
+            if did_doc_index is not None and did_docs:
+                did_doc_index.put_many(did_docs)
+            for did, (res, _) in zip(batch, results):
+                yield did, res
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _resolve_chunk(dids: List[DID],
+                   format: VerificationMaterialFormatPeerDID,
+                   with_did_docs: bool) -> List[Tuple[ResolvePeerDIDResult, Optional[CompactDIDDoc]]]:
+    # errors are returned, not raised; the DID Doc is built from the resolved JSON, so every DID is resolved once
+    results = []
+    for did in dids:
+        try:
+            did_doc_json = peer_did.resolve_peer_did(did, format=format)
+            results.append((did_doc_json, _did_doc_from_json(did_doc_json) if with_did_docs else None))
+        except PeerDIDError as e:
+            results.append((e, None))
+    return results
+
+
+def _resolve_chunk_in_worker(dids: List[DID],
+                             format: VerificationMaterialFormatPeerDID,
+                             with_did_docs: bool) -> List[Tuple[Union[JSON, WorkerError], Optional[CompactDIDDoc]]]:
+    return [
+        (WorkerError(res) if isinstance(res, PeerDIDError) else res, did_doc)
+        for res, did_doc in _resolve_chunk(dids, format, with_did_docs)
+    ]
+
+
+def clear_segment_caches():
+    _decode_key.cache_clear()
+    _decode_service.cache_clear()
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def _decode_key(multibase: str, agreement: bool) -> str:
+    # multibase encoded multicodec key -> JWK (as a JSON string)
+    try:
+        key, codec = from_multicodec(from_base58_multibase(multibase)[1])
+        validate_raw_key_length(key)
+    except (ValueError, TypeError) as e:
+        raise MalformedPeerDIDError("Invalid key {}".format(multibase)) from e
+    if codec != (Codec.X25519 if agreement else Codec.ED25519):
+        raise MalformedPeerDIDError("Invalid key {}".format(multibase))
+    return json.dumps({
+        "kty": "OKP",
+        "crv": "X25519" if agreement else "Ed25519",
+        "x": urlsafe_b64encode(key).decode("utf-8"),
+    })
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def _decode_service(service: str) -> Tuple[_DecodedService, ...]:
+    # the DIDComm services of an encoded service block; ids are relative to the DID (e.g. "#didcommmessaging-0"),
+    # and lists are kept as tuples, so that the cached value can't be changed through a DID Doc
+    try:
+        services = json.loads(urlsafe_b64decode(service.encode()).decode("utf-8"))
+        if not isinstance(services, list):
+            services = [services]
+
+        decoded = []
+        for i, s in enumerate(services):
+            if ServicePrefix[SERVICE_TYPE] not in s:
+                raise ValueError("service doesn't contain a type")
+            service_type = s[ServicePrefix[SERVICE_TYPE]].replace(
+                ServicePrefix[SERVICE_DIDCOMM_MESSAGING], SERVICE_DIDCOMM_MESSAGING
+            )
+            if service_type != SERVICE_DIDCOMM_MESSAGING:
+                continue
+            decoded.append((
+                "#" + service_type.lower() + "-" + str(i),
+                s.get(ServicePrefix[SERVICE_ENDPOINT]),
+                tuple(s.get(ServicePrefix[SERVICE_ROUTING_KEYS]) or ()),
+                tuple(s.get(ServicePrefix[SERVICE_ACCEPT]) or ()),
+            ))
+        return tuple(decoded)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise MalformedPeerDIDError("Invalid service") from e
@@ -0,0 +1,80 @@
+import json
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+from didcomm.common.algorithms import AnonCryptAlg
+from didcomm.common.resolvers import ResolversConfig
+from didcomm.common.types import DID_OR_DID_URL, DIDCommMessageTypes, DIDCommMessageProtocolTypes
+from didcomm.core.anoncrypt import anoncrypt, unpack_anoncrypt
+from didcomm.core.defaults import DEF_ENC_ALG_ANON
+from didcomm.core.keys.anoncrypt_keys_selector import find_anoncrypt_pack_recipient_public_keys
+from didcomm.core.types import Key
+from didcomm.core.utils import id_generator_default
+from didcomm.errors import MalformedMessageError, MalformedMessageCode
+from didcomm.protocols.routing.forward import resolve_did_services_chain
+
+from didcomm_demo.compact_did_doc import extract_public_key
+
+
+@dataclass(frozen=True)
+class ForwardHop:
+    # the Forward message to `next` is anonymously encrypted to the mediator's `keys`
+    next: DID_OR_DID_URL
+    keys: List[Key]
+
+
+@dataclass(frozen=True)
+class RoutingChain:
+    """
+    Precomputed Forward wrapping for a recipient: the hops from the innermost (the last mediator)
+    to the outermost one (the first mediator, listening on `service_endpoint`), with the mediators' keys resolved.
+    """
+    service_endpoint: Optional[str]
+    hops: List[ForwardHop]
+
+
+async def resolve_routing_chain(resolvers_config: ResolversConfig, to: DID_OR_DID_URL) -> RoutingChain:
+    # the same routing as Forward wrapping of `pack_encrypted` (see didcomm.pack_encrypted.__forward_if_needed)
+    services = await resolve_did_services_chain(resolvers_config, to)
+    if not services:
+        return RoutingChain(None, [])
+
+    routing_keys = services[-1].routing_keys
+    if routing_keys and len(services) > 1:
+        # alternative endpoints
+        routing_keys = [s.service_endpoint for s in services[1:]] + routing_keys
+
+    hops = []
+    for _to, _next in zip(routing_keys[::-1], (routing_keys[1:] + [to])[::-1]):
+        verification_methods = await find_anoncrypt_pack_recipient_public_keys(_to, resolvers_config)
+        hops.append(ForwardHop(_next, [Key(kid=vm.id, key=extract_public_key(vm)) for vm in verification_methods]))
+    return RoutingChain(services[0].service_endpoint, hops)
+
+
+def wrap_in_forward(chain: RoutingChain, packed_msg: dict, enc_alg_anon: AnonCryptAlg = DEF_ENC_ALG_ANON) -> dict:
+    for hop in chain.hops:
+        # the same plaintext as `ForwardMessage.as_dict()`, built without the message validation
+        forward_msg = {
+            "id": id_generator_default(),
+            "typ": DIDCommMessageTypes.PLAINTEXT.value,
+            "type": DIDCommMessageProtocolTypes.FORWARD.value,
+            "body": {"next": hop.next},
+            "attachments": [{"id": id_generator_default(), "data": {"json": packed_msg}}]
+        }
+        packed_msg = anoncrypt(forward_msg, hop.keys, enc_alg_anon).msg
+    return packed_msg
+
+
+async def unwrap_forward(resolvers_config: ResolversConfig, packed_msg: Union[str, dict]) -> Tuple[str, dict]:
+    # Decrypts a Forward message and returns (next, forwarded message).
+    # Only the fields needed for relaying are checked, and the forwarded message is kept as a dict,
+    # so it can be relayed further without being serialized and parsed again.
+    msg = json.loads(packed_msg) if isinstance(packed_msg, str) else packed_msg
+    res = await unpack_anoncrypt(msg, resolvers_config, decrypt_by_all_keys=False)
+    try:
+        plaintext = json.loads(res.msg)
+        if plaintext["type"] != DIDCommMessageProtocolTypes.FORWARD.value:
+            raise ValueError(f"not a Forward message: {plaintext['type']}")
+        return plaintext["body"]["next"], plaintext["attachments"][0]["data"]["json"]
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise MalformedMessageError(MalformedMessageCode.INVALID_PLAINTEXT) from e
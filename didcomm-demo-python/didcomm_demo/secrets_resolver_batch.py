@@ -0,0 +1,27 @@
+from typing import List, Optional
+
+from didcomm.common.types import DID_URL
+from didcomm.secrets.secrets_resolver import SecretsResolver, Secret
+
+
+class SecretsResolverBatch(SecretsResolver):
+    """
+    Memoizes lookups of the wrapped secrets resolver for the lifetime of one batch,
+    so that every secret is looked up once per batch and not once per message.
+    """
+
+    def __init__(self, secrets_resolver: SecretsResolver) -> None:
+        self.secrets_resolver = secrets_resolver
+        self._keys = {}
+        self._kids = {}
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        if kid not in self._keys:
+            self._keys[kid] = await self.secrets_resolver.get_key(kid)
+        return self._keys[kid]
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        key = tuple(kids)
+        if key not in self._kids:
+            self._kids[key] = await self.secrets_resolver.get_keys(kids)
+        return self._kids[key]
@@ -0,0 +1,112 @@
+import json
+import os
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Tuple
+
+from didcomm.common.types import DID_URL
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from didcomm.secrets.secrets_util import jwk_to_secret, secret_to_jwk_dict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class SecretsResolverFile(SecretsResolverDemo):
+    """
+    Secrets resolver keeping secrets in a JSON file (the format of `SecretsResolverDemo`)
+    which can be shared by several processes, such as a running `serve` and the CLI commands executed locally.
+
+    Every write re-reads the file and merges it with the secrets in memory under an exclusive lock,
+    and the file is replaced atomically, so secrets written by others are never lost.
+    The file is re-read if it changed before a kid is reported as missing.
+    """
+
+    def __init__(self, file_path="secrets.json"):
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self._generation = 0
+        super().__init__(file_path)
+        self._stat = self._file_stat()
+
+    def generation(self) -> int:
+        # changes whenever secrets written by others are loaded (see SecretsResolverIndexed)
+        self._reload_if_changed()
+        return self._generation
+
+    async def add_key(self, secret: Secret):
+        await self.add_keys([secret])
+
+    async def add_keys(self, secrets: List[Secret]):
+        # a single write for all secrets
+        self._secrets.update((secret.kid, secret) for secret in secrets)
+        self._save()
+
+    async def get_kids(self) -> List[str]:
+        self._reload_if_changed()
+        return await super().get_kids()
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        secret = self._secrets.get(kid)
+        if secret is None and self._reload_if_changed():
+            secret = self._secrets.get(kid)
+        return secret
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        self._reload_if_changed()
+        return await super().get_keys(kids)
+
+    def _save(self):
+        with self._locked():
+            if self._file_stat() != self._stat:
+                self._generation += 1
+            self._secrets = {**self._read(), **self._secrets}
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump([secret_to_jwk_dict(s) for s in self._secrets.values()], f)
+            os.replace(tmp_path, self.file_path)
+            self._stat = self._file_stat()
+
+    def _reload_if_changed(self) -> bool:
+        if self._file_stat() == self._stat:
+            return False
+        with self._locked():
+            self._secrets = {**self._secrets, **self._read()}
+            self._stat = self._file_stat()
+            self._generation += 1
+        return True
+
+    def _read(self) -> Dict[DID_URL, Secret]:
+        try:
+            with open(self.file_path) as f:
+                return {jwk["kid"]: jwk_to_secret(jwk) for jwk in json.load(f)}
+        except FileNotFoundError:
+            return {}
+
+    def _file_stat(self) -> Optional[Tuple[int, int, int]]:
+        # the file is replaced on write, so a new inode means a new version
+        try:
+            st = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    @contextmanager
+    def _locked(self):
+        with open(f"{self.file_path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                # the first byte of the file is locked (it doesn't need to exist)
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
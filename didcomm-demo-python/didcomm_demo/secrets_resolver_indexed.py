@@ -0,0 +1,119 @@
+import hashlib
+from typing import List, Optional, Set
+from weakref import WeakKeyDictionary, WeakSet
+
+from didcomm.common.types import DID_URL
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+
+
+class BloomFilter:
+
+    def __init__(self, size: int, hashes: int = 7) -> None:
+        if size < 1 or hashes < 1:
+            raise ValueError(f"size and hashes must be positive: {size}, {hashes}")
+        self.size = size
+        self.hashes = hashes
+        self._bits = bytearray((size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        # double hashing: the i-th position is h1 + i * h2
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for p in self._positions(item):
+            self._bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class SecretsResolverIndexed(SecretsResolverEditable):
+    """
+    Keeps an in-memory index of the kids of the wrapped secrets resolver, so that
+    "which of these kids do I own" (`get_keys`) costs a hash lookup per requested kid
+    instead of a scan of the store, and unknown kids are answered without touching the store.
+
+    By default the index is a set of all kids. With `bloom_filter_size` (in bits) only a Bloom filter is kept:
+    kids it rejects are not owned for sure, and the (rare) others are confirmed by the wrapped resolver,
+    which suits large stores with their own index (see `SecretsResolverSqlite`).
+
+    The index is loaded on first use and is the source of truth afterwards. Secrets added through any
+    `SecretsResolverIndexed` wrapping the same store instance are indexed by all of them as they are added.
+    Secrets added to the store by others (for example other processes) are picked up if the store has
+    a `generation()` that changes on such writes (see `SecretsResolverFile` and `SecretsResolverSqlite`):
+    the index is reloaded when it does.
+    """
+
+    # the indexes of every store instance, so that secrets added through one of them are indexed by all
+    _indexes: "WeakKeyDictionary[SecretsResolverEditable, WeakSet[SecretsResolverIndexed]]" = WeakKeyDictionary()
+
+    def __init__(self,
+                 secrets_resolver: SecretsResolverEditable,
+                 bloom_filter_size: Optional[int] = None) -> None:
+        self.secrets_resolver = secrets_resolver
+        self.bloom_filter_size = bloom_filter_size
+        self._kids: Optional[Set[DID_URL]] = None
+        self._bloom_filter: Optional[BloomFilter] = None
+        self._generation = None
+        self._indexes.setdefault(secrets_resolver, WeakSet()).add(self)
+
+    def _store_generation(self):
+        generation = getattr(self.secrets_resolver, "generation", None)
+        return generation() if generation is not None else None
+
+    async def _load(self):
+        self._generation = self._store_generation()
+        kids = await self.secrets_resolver.get_kids()
+        if self.bloom_filter_size is None:
+            self._kids = set(kids)
+            self._bloom_filter = None
+        else:
+            self._kids = None
+            self._bloom_filter = BloomFilter(self.bloom_filter_size)
+            for kid in kids:
+                self._bloom_filter.add(kid)
+
+    def _index(self, kids: List[DID_URL]):
+        if self._kids is not None:
+            self._kids.update(kids)
+        elif self._bloom_filter is not None:
+            for kid in kids:
+                self._bloom_filter.add(kid)
+
+    async def _candidates(self, kids: List[DID_URL]) -> List[DID_URL]:
+        if self._kids is None and self._bloom_filter is None or self._store_generation() != self._generation:
+            await self._load()
+        index = self._kids if self._kids is not None else self._bloom_filter
+        return [kid for kid in kids if kid in index]
+
+    def _index_everywhere(self, kids: List[DID_URL]):
+        for indexed in self._indexes.get(self.secrets_resolver, ()):
+            indexed._index(kids)
+
+    async def add_key(self, secret: Secret):
+        await self.secrets_resolver.add_key(secret)
+        self._index_everywhere([secret.kid])
+
+    async def add_keys(self, secrets: List[Secret]):
+        # avoid a circular import
+        from didcomm_demo.didcomm_demo import add_secrets
+        await add_secrets(self.secrets_resolver, secrets)
+        self._index_everywhere([s.kid for s in secrets])
+
+    async def get_kids(self) -> List[str]:
+        return await self.secrets_resolver.get_kids()
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        if not await self._candidates([kid]):
+            return None
+        return await self.secrets_resolver.get_key(kid)
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        candidates = await self._candidates(kids)
+        if self._kids is not None or not candidates:
+            return candidates
+        return await self.secrets_resolver.get_keys(candidates)
@@ -0,0 +1,64 @@
+import json
+import sqlite3
+import threading
+from typing import List, Optional
+
+from didcomm.common.types import DID_URL
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+from didcomm.secrets.secrets_util import jwk_to_secret, secret_to_jwk_dict
+
+# SQLite limits the number of host parameters in a single statement
+_MAX_PARAMS = 500
+
+
+class SecretsResolverSqlite(SecretsResolverEditable):
+    """
+    Secrets resolver backed by a SQLite database.
+
+    Secrets are looked up by the primary key index on kid, and new secrets are appended
+    (`add_keys` stores any number of them in a single transaction) instead of rewriting the whole store.
+    """
+
+    def __init__(self, file_path="secrets.db"):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(file_path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS secrets (kid TEXT PRIMARY KEY, jwk TEXT NOT NULL)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def generation(self) -> int:
+        # changes whenever the database is written by another connection (see SecretsResolverIndexed)
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    async def add_key(self, secret: Secret):
+        await self.add_keys([secret])
+
+    async def add_keys(self, secrets: List[Secret]):
+        rows = [(s.kid, json.dumps(secret_to_jwk_dict(s))) for s in secrets]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO secrets (kid, jwk) VALUES (?, ?)", rows)
+
+    async def get_kids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT kid FROM secrets ORDER BY rowid")]
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        with self._lock:
+            row = self._conn.execute("SELECT jwk FROM secrets WHERE kid = ?", (kid,)).fetchone()
+        return jwk_to_secret(json.loads(row[0])) if row else None
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        found = set()
+        with self._lock:
+            for i in range(0, len(kids), _MAX_PARAMS):
+                chunk = kids[i:i + _MAX_PARAMS]
+                query = f"SELECT kid FROM secrets WHERE kid IN ({','.join('?' * len(chunk))})"
+                found.update(row[0] for row in self._conn.execute(query, chunk))
+        # keep the order of the requested kids
+        return [kid for kid in kids if kid in found]
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import sys
+from typing import Optional, TextIO
+
+from didcomm.errors import DIDCommError
+from didcomm.pack_encrypted import PackEncryptedConfig
+from peerdid.errors import MalformedPeerDIDError
+from peerdid.types import VerificationMaterialFormatPeerDID
+
+from didcomm_demo.client import DIDCommClient
+from didcomm_demo.didcomm_demo import DIDCommDemo, PACK_ERRORS
+
+
+# Requests and responses are JSON objects, one per line:
+#   {"id": 1, "command": "pack", "args": {"msg": "hello", "to": "did:peer:..."}}
+#   {"id": 1, "packed_msg": "..."}
+# A failed command is answered with {"id": 1, "error": "..."}.
+
+# requests carry whole (packed) messages, so lines are much longer than the default limit of asyncio streams
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+
+async def execute(demo: DIDCommDemo, command: str, args: dict) -> dict:
+    # executes a command of the CLI with the given (JSON) arguments;
+    # the errors reported by the corresponding CLI command are returned as {"error": ...}
+    if command == "create-peer-did":
+        try:
+            return {"did": await demo.create_peer_did_async(**args)}
+        except (ValueError, TypeError) as e:
+            return {"error": f"{e}"}
+
+    if command == "resolve-peer-did":
+        format = VerificationMaterialFormatPeerDID.MULTIBASE if args.get("format") == "multibase" \
+            else VerificationMaterialFormatPeerDID.JWK
+        try:
+            return {"did_doc": DIDCommDemo.resolve_peer_did(args["did"], format)}
+        except MalformedPeerDIDError as e:
+            return {"error": f"{e}"}
+
+    if command == "pack":
+        to = args.get("to")
+        mode = args.get("mode", "encrypted")
+        if mode != "encrypted":
+            # a single message (addressed to all of `to`) which is not encrypted
+            to = to if isinstance(to, list) or to is None else [to]
+            try:
+                if mode == "signed":
+                    res = await demo.pack_signed_async(args["msg"], args["sign_frm"], frm=args.get("frm"), to=to)
+                elif mode == "plaintext":
+                    res = await demo.pack_plaintext_async(args["msg"], frm=args.get("frm"), to=to)
+                else:
+                    raise ValueError(f"Unknown pack mode: {mode}")
+            except PACK_ERRORS as e:
+                return {"error": f"{e}"}
+            return {"packed_msg": res.packed_msg}
+        kwargs = dict(
+            msg=args["msg"],
+            frm=args.get("frm"),
+            sign_frm=args.get("sign_frm"),
+            config=PackEncryptedConfig(protect_sender_id=args.get("protect_sender_id", True))
+        )
+        if isinstance(to, list):
+            results = await demo.pack_multicast_async(to=to, sign_once=args.get("sign_once", False), **kwargs)
+            return {"results": [
+                {"error": f"{res}"} if isinstance(res, PACK_ERRORS) else {"packed_msg": res.packed_msg}
+                for res in results
+            ]}
+        try:
+            return {"packed_msg": (await demo.pack_async(to=to, **kwargs)).packed_msg}
+        except DIDCommError as e:
+            return {"error": f"{e}"}
+
+    if command == "unpack":
+        try:
+            msg, frm, to, res = await demo.unpack_async(args["packed_msg"])
+            response = {"msg": msg, "frm": frm, "to": to}
+            if not res.metadata.encrypted:
+                # tells signed messages from plaintext ones (there's no "signed" for encrypted messages)
+                response["signed"] = res.metadata.non_repudiation
+            return response
+        except DIDCommError as e:
+            return {"error": f"{e}"}
+
+    if command == "ping":
+        return {}
+
+    raise ValueError(f"Unknown command: {command}")
+
+
+class DIDCommServer:
+    """
+    Serves line-delimited JSON requests (see `execute`) with a single long-living `DIDCommDemo`,
+    so that imports, secrets, and caches are loaded once instead of on every CLI invocation.
+
+    Requests of a connection are executed one by one; connections are served concurrently.
+    """
+
+    def __init__(self, demo: DIDCommDemo, max_request_size: int = MAX_REQUEST_SIZE) -> None:
+        self.demo = demo
+        self.max_request_size = max_request_size
+
+    async def handle(self, request: dict) -> dict:
+        try:
+            response = await execute(self.demo, request["command"], request.get("args", {}))
+        except Exception as e:
+            # a bad request must not stop the server
+            response = {"error": f"{e}"}
+        if "id" in request:
+            response = {"id": request["id"], **response}
+        return response
+
+    async def handle_line(self, line: str) -> str:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return json.dumps({"error": f"Malformed request: {e}"})
+        if not isinstance(request, dict):
+            return json.dumps({"error": "Malformed request: a JSON object is expected"})
+        return json.dumps(await self.handle(request))
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        if os.path.exists(path):
+            client = DIDCommClient.connect(path)
+            if client is not None:
+                client.close()
+                raise RuntimeError(f"A server is already listening on {path}")
+            # left by a server that was not stopped gracefully
+            os.remove(path)
+        return await asyncio.start_unix_server(self._serve_connection, path, limit=self.max_request_size)
+
+    async def serve_unix(self, path: str):
+        server = await self.start_unix(path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the rest of the line can't be told from the next request, so the connection is closed
+                    writer.write(json.dumps(
+                        {"error": f"Request is longer than {self.max_request_size} bytes"}
+                    ).encode() + b"\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write((await self.handle_line(line.decode())).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def serve_stdio(self, input: Optional[TextIO] = None, output: Optional[TextIO] = None):
+        input = input or sys.stdin
+        output = output or sys.stdout
+        loop = asyncio.get_event_loop()
+        for line in input:
+            if not line.strip():
+                continue
+            output.write(loop.run_until_complete(self.handle_line(line)) + "\n")
+            output.flush()
@@ -0,0 +1,184 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, List, Tuple
+
+from authlib.common.encoding import urlsafe_b64encode, urlsafe_b64decode, to_bytes, to_unicode
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from didcomm.errors import MalformedMessageError, MalformedMessageCode
+from didcomm.message import Message, Attachment, AttachmentDataLinks
+
+# Large content is not put into the DIDComm message: it's encrypted chunk by chunk into a separate file
+# (or any other binary stream), and a small message carrying the content key is packed as usual.
+#
+# Each chunk of `chunk_size` bytes is encrypted with AES-256-GCM on its own. The 12-byte nonce of a chunk is
+# a random 7-byte prefix, the 4-byte chunk index and a byte marking the last chunk, so chunks can't be reordered,
+# and the content can't be truncated unnoticed. The last chunk is shorter than `chunk_size` (it may be empty).
+
+ENCRYPTED_CONTENT_TYPE = "my-protocol/1.0/encrypted-content"
+STREAM_ENC = "A256GCM-STREAM"
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# a chunk is read into memory as a whole, so the chunk size of received content is limited
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+_NONCE_PREFIX_SIZE = 7
+_TAG_SIZE = 16
+_MAX_CHUNKS = 1 << 32
+
+
+@dataclass(frozen=True)
+class StreamKey:
+    """
+    Content key and parameters of content encrypted by `encrypt_stream`.
+    `size` is the size of the content, and `hash` is the multihash (SHA-256, hex) of the encrypted content.
+    """
+    key: bytes
+    nonce_prefix: bytes
+    chunk_size: int
+    size: int
+    hash: str
+
+    def as_dict(self) -> dict:
+        # the hash is not included: it's a part of the attachment data
+        return {
+            "enc": STREAM_ENC,
+            "key": to_unicode(urlsafe_b64encode(self.key)),
+            "nonce": to_unicode(urlsafe_b64encode(self.nonce_prefix)),
+            "chunk_size": self.chunk_size,
+            "size": self.size,
+        }
+
+    @staticmethod
+    def from_dict(d: dict, hash: str) -> "StreamKey":
+        try:
+            if d["enc"] != STREAM_ENC:
+                raise ValueError(f"Unsupported content encryption: {d['enc']}")
+            stream_key = StreamKey(
+                key=urlsafe_b64decode(to_bytes(d["key"])),
+                nonce_prefix=urlsafe_b64decode(to_bytes(d["nonce"])),
+                chunk_size=d["chunk_size"],
+                size=d["size"],
+                hash=hash
+            )
+            if len(stream_key.key) != 32 or len(stream_key.nonce_prefix) != _NONCE_PREFIX_SIZE \
+                    or not isinstance(stream_key.chunk_size, int) or not 1 <= stream_key.chunk_size <= MAX_CHUNK_SIZE \
+                    or not isinstance(stream_key.size, int) or stream_key.size < 0:
+                raise ValueError(f"Invalid content key: {d}")
+        except (KeyError, TypeError, ValueError) as e:
+            raise MalformedMessageError(MalformedMessageCode.INVALID_PLAINTEXT, f"{e}") from e
+        return stream_key
+
+
+def encrypt_stream(src: BinaryIO, dst: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> StreamKey:
+    # reads `src` (a file-like object or an mmap) and writes the encrypted content to `dst`, a chunk at a time
+    if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"chunk_size must be between 1 and {MAX_CHUNK_SIZE}: {chunk_size}")
+    key = AESGCM.generate_key(bit_length=256)
+    nonce_prefix = os.urandom(_NONCE_PREFIX_SIZE)
+    aesgcm = AESGCM(key)
+    digest = hashlib.sha256()
+    size = 0
+    index = 0
+    while True:
+        chunk = _read(src, chunk_size)
+        last = len(chunk) < chunk_size
+        encrypted = aesgcm.encrypt(_nonce(nonce_prefix, index, last), chunk, None)
+        dst.write(encrypted)
+        digest.update(encrypted)
+        size += len(chunk)
+        index += 1
+        if last:
+            break
+    return StreamKey(key=key, nonce_prefix=nonce_prefix, chunk_size=chunk_size, size=size,
+                     hash=_multihash(digest))
+
+
+def decrypt_stream(src: BinaryIO, dst: BinaryIO, stream_key: StreamKey) -> int:
+    # reads the encrypted content from `src` and writes the content to `dst`, a chunk at a time;
+    # returns the content size
+    aesgcm = AESGCM(stream_key.key)
+    digest = hashlib.sha256()
+    chunks = stream_key.size // stream_key.chunk_size + 1
+    for index in range(chunks):
+        last = index == chunks - 1
+        chunk_size = stream_key.size - index * stream_key.chunk_size if last else stream_key.chunk_size
+        encrypted = _read(src, chunk_size + _TAG_SIZE)
+        if len(encrypted) != chunk_size + _TAG_SIZE:
+            raise MalformedMessageError(MalformedMessageCode.CAN_NOT_DECRYPT, "Encrypted content is truncated")
+        digest.update(encrypted)
+        try:
+            dst.write(aesgcm.decrypt(_nonce(stream_key.nonce_prefix, index, last), encrypted, None))
+        except InvalidTag as e:
+            raise MalformedMessageError(MalformedMessageCode.CAN_NOT_DECRYPT) from e
+    if src.read(1):
+        raise MalformedMessageError(MalformedMessageCode.CAN_NOT_DECRYPT, "Unexpected data after encrypted content")
+    if _multihash(digest) != stream_key.hash:
+        raise MalformedMessageError(MalformedMessageCode.CAN_NOT_DECRYPT, "Encrypted content hash mismatch")
+    return stream_key.size
+
+
+def content_envelope(stream_key: StreamKey,
+                     link: Optional[str] = None,
+                     filename: Optional[str] = None,
+                     media_type: str = "application/octet-stream") -> Tuple[dict, List[Attachment]]:
+    # body and attachments of the message carrying the content key;
+    # the attachment refers to the encrypted content (by the link, if given)
+    attachment = Attachment(
+        id="content",
+        data=AttachmentDataLinks(links=[link] if link else [], hash=stream_key.hash),
+        filename=filename,
+        media_type=media_type,
+        byte_count=stream_key.size
+    )
+    return {"content": stream_key.as_dict()}, [attachment]
+
+
+def read_content_envelope(message: Message) -> Tuple[StreamKey, Attachment]:
+    if message.type != ENCRYPTED_CONTENT_TYPE or not isinstance(message.body, dict) \
+            or "content" not in message.body:
+        raise MalformedMessageError(MalformedMessageCode.INVALID_PLAINTEXT, "Not an encrypted content message")
+    attachment = next((a for a in message.attachments or [] if a.id == "content"), None)
+    if attachment is None or not isinstance(attachment.data, AttachmentDataLinks):
+        raise MalformedMessageError(MalformedMessageCode.INVALID_PLAINTEXT, "No encrypted content attachment")
+    return StreamKey.from_dict(message.body["content"], attachment.data.hash), attachment
+
+
+def content_link_path(attachment: Attachment, content_dir: str) -> str:
+    # the local path of the encrypted content the attachment links to; the link is chosen by the sender,
+    # so only files inside `content_dir` are accepted
+    if not attachment.data.links:
+        raise MalformedMessageError(MalformedMessageCode.INVALID_PLAINTEXT, "No link to the encrypted content")
+    content_dir = os.path.realpath(content_dir)
+    path = os.path.realpath(os.path.join(content_dir, attachment.data.links[0]))
+    if os.path.commonpath([content_dir, path]) != content_dir:
+        raise MalformedMessageError(MalformedMessageCode.INVALID_PLAINTEXT,
+                                    f"The encrypted content is linked outside of {content_dir}")
+    return path
+
+
+def _nonce(nonce_prefix: bytes, index: int, last: bool) -> bytes:
+    if index >= _MAX_CHUNKS:
+        raise ValueError("Too many chunks: use a larger chunk size")
+    return nonce_prefix + index.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+
+def _read(src: BinaryIO, size: int) -> bytes:
+    # file-like objects may return less than asked for before the end (pipes, sockets)
+    data = src.read(size)
+    if len(data) == size or not data:
+        return data
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        data = src.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b"".join(parts)
+
+
+def _multihash(digest) -> str:
+    # sha2-256 multihash: the function code, the digest length and the digest
+    return "1220" + digest.hexdigest()
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from time import monotonic
+from typing import Callable, Optional, List
+
+from didcomm.pack_encrypted import PackEncryptedConfig, PackEncryptedResult
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+
+from didcomm_demo.did_doc_cache import DIDDocCache
+from didcomm_demo.did_doc_index_sqlite import DIDDocIndexSqlite
+from didcomm_demo.didcomm_demo import DIDCommDemo, UnpackedMessage, UnpackStreamResult, _run
+from didcomm_demo.instrumentation import Instrumentation
+
+
+class MultiTenantDIDComm:
+    """
+    Hosts many tenants (each with its own secrets store) in one process.
+
+    A tenant's `DIDCommDemo` is created on first use with the secrets resolver returned by
+    `secrets_resolver_factory(tenant_id)`; all tenants share one DID Doc cache (and index, if given)
+    and pack/unpack in one executor (if given, for example a `ThreadPoolExecutor` keeping crypto off the event loop).
+
+    At most `max_tenants` tenants are kept loaded: the least recently used ones are evicted (together with
+    their secrets) beyond that, and so are tenants idle for more than `idle_timeout` seconds.
+    An evicted tenant is loaded again from its store on the next use.
+    """
+
+    def __init__(self,
+                 secrets_resolver_factory: Callable[[str], SecretsResolverEditable],
+                 max_tenants: int = 1024,
+                 idle_timeout: Optional[float] = None,
+                 did_doc_cache: Optional[DIDDocCache] = None,
+                 did_doc_index: Optional[DIDDocIndexSqlite] = None,
+                 executor: Optional[Executor] = None,
+                 instrumentation: Optional[Instrumentation] = None) -> None:
+        if max_tenants < 1:
+            raise ValueError(f"max_tenants must be positive: {max_tenants}")
+        self.secrets_resolver_factory = secrets_resolver_factory
+        self.max_tenants = max_tenants
+        self.idle_timeout = idle_timeout
+        self.did_doc_cache = did_doc_cache if did_doc_cache is not None else DIDDocCache()
+        self.did_doc_index = did_doc_index
+        self.executor = executor
+        self.instrumentation = instrumentation
+        self._tenants = OrderedDict()
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def tenant(self, tenant_id: str) -> DIDCommDemo:
+        with self._lock:
+            demo = self._tenants.get(tenant_id)
+            if demo is not None:
+                return self._touch(tenant_id, demo)
+        # the store is opened outside the lock, so loading a tenant doesn't block the others; if the same tenant
+        # is loaded twice at once, the first demo is kept (and both share the store, see SecretsResolverIndexed)
+        demo = DIDCommDemo(
+            self.secrets_resolver_factory(tenant_id),
+            did_doc_cache=self.did_doc_cache,
+            did_doc_index=self.did_doc_index,
+            instrumentation=self.instrumentation
+        )
+        with self._lock:
+            return self._touch(tenant_id, self._tenants.setdefault(tenant_id, demo))
+
+    def _touch(self, tenant_id: str, demo: DIDCommDemo) -> DIDCommDemo:
+        # must be called with the lock held
+        now = monotonic()
+        self._tenants.move_to_end(tenant_id)
+        self._last_used[tenant_id] = now
+        self._evict(now)
+        return demo
+
+    def _evict(self, now: float):
+        # must be called with the lock held; the least recently used tenants come first
+        while self._tenants:
+            tenant_id = next(iter(self._tenants))
+            idle = self.idle_timeout is not None and now - self._last_used[tenant_id] > self.idle_timeout
+            if len(self._tenants) <= self.max_tenants and not idle:
+                break
+            self._remove(tenant_id)
+
+    def _remove(self, tenant_id: str):
+        # in-flight operations of the tenant keep using its demo; the secrets are released once they finish
+        del self._tenants[tenant_id]
+        del self._last_used[tenant_id]
+        self.evictions += 1
+
+    def evict(self, tenant_id: str):
+        with self._lock:
+            if tenant_id in self._tenants:
+                self._remove(tenant_id)
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict(monotonic())
+
+    def __contains__(self, tenant_id: str) -> bool:
+        with self._lock:
+            return tenant_id in self._tenants
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tenants)
+
+    async def _call(self, coro):
+        if self.executor is None:
+            return await coro
+        return await asyncio.get_event_loop().run_in_executor(self.executor, asyncio.run, coro)
+
+    def create_peer_did(self, tenant_id: str, **kwargs) -> str:
+        return _run(self.create_peer_did_async(tenant_id, **kwargs))
+
+    async def create_peer_did_async(self, tenant_id: str, **kwargs) -> str:
+        return await self._call(self.tenant(tenant_id).create_peer_did_async(**kwargs))
+
+    def pack(self,
+             tenant_id: str,
+             msg: str,
+             to: str,
+             frm: Optional[str] = None,
+             sign_frm: Optional[str] = None,
+             config: Optional[PackEncryptedConfig] = None) -> PackEncryptedResult:
+        return _run(self.pack_async(tenant_id, msg=msg, to=to, frm=frm, sign_frm=sign_frm, config=config))
+
+    async def pack_async(self,
+                         tenant_id: str,
+                         msg: str,
+                         to: str,
+                         frm: Optional[str] = None,
+                         sign_frm: Optional[str] = None,
+                         config: Optional[PackEncryptedConfig] = None) -> PackEncryptedResult:
+        demo = self.tenant(tenant_id)
+        return await self._call(demo.pack_async(msg=msg, to=to, frm=frm, sign_frm=sign_frm, config=config))
+
+    def unpack(self, tenant_id: str, packed_msg: str) -> UnpackedMessage:
+        return _run(self.unpack_async(tenant_id, packed_msg))
+
+    async def unpack_async(self, tenant_id: str, packed_msg: str) -> UnpackedMessage:
+        return await self._call(self.tenant(tenant_id).unpack_async(packed_msg))
+
+    def unpack_many(self, tenant_id: str, packed_msgs: List[str]) -> List[UnpackStreamResult]:
+        return _run(self.unpack_many_async(tenant_id, packed_msgs))
+
+    async def unpack_many_async(self, tenant_id: str, packed_msgs: List[str]) -> List[UnpackStreamResult]:
+        return await self._call(self.tenant(tenant_id).unpack_many_async(packed_msgs))
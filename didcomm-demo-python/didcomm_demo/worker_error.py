@@ -0,0 +1,27 @@
+from typing import Any, Dict, Tuple, Type
+
+
+class WorkerError:
+    """
+    An error returned by a worker process, which is restored as is in the parent.
+
+    Errors can't be sent between processes directly: unpickling calls the constructor again with the stored args,
+    so errors which format their message in `__init__` (such as `MalformedPeerDIDError`) get it formatted twice.
+    """
+
+    def __init__(self, error: BaseException):
+        self.type: Type[BaseException] = type(error)
+        self.args: Tuple[Any, ...] = error.args
+        self.state: Dict[str, Any] = dict(vars(error))
+
+    def restore(self) -> BaseException:
+        # the constructor is bypassed, so the message is not formatted again
+        error = self.type.__new__(self.type, *self.args)
+        error.args = self.args
+        error.__dict__.update(self.state)
+        return error
+
+
+def restore_error(result):
+    # the result of a worker process with `WorkerError`s restored
+    return result.restore() if isinstance(result, WorkerError) else result
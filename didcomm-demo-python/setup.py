@@ -31,6 +31,9 @@ setup(
         "tests": [
             "pytest==6.2.5",
             "pytest-asyncio==0.15.1",
+        ],
+        "bench": [
+            "pytest-benchmark",
         ]
     },
     entry_points={
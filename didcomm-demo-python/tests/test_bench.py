@@ -0,0 +1,47 @@
+import json
+
+from click.testing import CliRunner
+
+from didcomm_demo.bench import run_benchmarks, format_results
+from didcomm_demo.didcomm_cli import cli
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(iterations=2, message_sizes=(16,))
+    names = {r.name for r in results}
+    assert names == {"create_peer_did", "resolve_peer_did", "resolve_did_doc", "pack", "unpack", "connection_send",
+                     "pack_multicast"}
+    paths = {r.params["path"] for r in results if r.name == "resolve_did_doc"}
+    assert paths == {"json", "direct", "direct-cold"}
+    variants = {r.params["variant"] for r in results if r.name == "pack"}
+    assert variants == {"anoncrypt", "authcrypt", "authcrypt-protect-sender-id", "authcrypt-signed"}
+    for r in results:
+        assert r.iterations == 2
+        assert r.ops_per_sec > 0
+        assert 0 < r.p50_ms <= r.p99_ms
+    assert "unpack variant=authcrypt-signed message_size=16" in format_results(results)
+
+
+def test_run_benchmarks_filter():
+    results = run_benchmarks(iterations=1, message_sizes=(16, 32), name_filter="unpack")
+    assert {r.name for r in results} == {"unpack"}
+    assert len(results) == 8
+
+
+def test_run_benchmarks_filter_glob():
+    assert {r.name for r in run_benchmarks(iterations=1, message_sizes=(16,), name_filter="pack")} == {"pack"}
+    results = run_benchmarks(iterations=1, message_sizes=(16,), name_filter="resolve_*")
+    assert {r.name for r in results} == {"resolve_peer_did", "resolve_did_doc"}
+
+
+def test_cli_bench_json(tmp_path):
+    out = tmp_path / "bench.json"
+    runner = CliRunner()
+    result = runner.invoke(cli, ['bench', '--iterations=1', '--size=16', '--filter=resolve_peer_did', '--json',
+                                 f'--out={out}'])
+    assert result.exit_code == 0
+    results = json.loads(result.output)
+    assert results == json.loads(out.read_text())
+    assert {(r["params"]["numalgo"], r["params"]["format"]) for r in results} == {
+        (0, "jwk"), (0, "multibase"), (2, "jwk"), (2, "multibase")
+    }
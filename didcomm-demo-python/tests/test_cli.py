@@ -1,4 +1,5 @@
 import json
+import os
 
 import pytest
 from click.testing import CliRunner
@@ -101,6 +102,31 @@ def test_resolve_peer_did(secrets_resolver):
     assert did_doc["id"] == did
 
 
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_resolve_peer_dids(secrets_resolver, tmp_path, jobs):
+    dids = [DIDCommDemo(secrets_resolver).create_peer_did() for _ in range(3)]
+    input_file = tmp_path / "dids.txt"
+    input_file.write_text("\n".join([
+        dids[0], json.dumps({"did": dids[1]}), "", "did:peer:2.Ez6LSbad", "{malformed", dids[2]
+    ]) + "\n")
+    runner = CliRunner()
+    result = runner.invoke(cli, ['resolve-peer-dids', f'--input={input_file}', f'--jobs={jobs}',
+                                 f'--index={tmp_path / "did_docs.db"}'])
+    assert result.exit_code == 0
+    results = [json.loads(line) for line in result.output.splitlines()]
+    assert [r["line"] for r in results] == [1, 2, 4, 5, 6]
+    assert [r.get("did") for r in results] == [dids[0], dids[1], "did:peer:2.Ez6LSbad", None, dids[2]]
+    assert "Does not match peer DID regexp" in results[2]["error"]
+    assert results[3]["error"].startswith("Malformed input line")
+    for r in (results[0], results[1], results[4]):
+        assert json.loads(r["did_doc"])["id"] == r["did"]
+
+    from didcomm_demo.did_doc_index_sqlite import DIDDocIndexSqlite
+    index = DIDDocIndexSqlite(tmp_path / "did_docs.db")
+    assert len(index) == 3 and all(did in index for did in dids)
+    index.close()
+
+
 MESSAGES = ["hello", "111", '{"aaa": "bbb"}']
 
 
@@ -144,3 +170,171 @@ def test_pack_unpack_anoncrypt(input_msg, secrets_resolver, did_to):
     res = result.output.strip()
     assert input_msg in res
     assert did_to in res
+
+
+def test_pack_multiple_to(secrets_resolver, did_frm):
+    dids_to = [DIDCommDemo(secrets_resolver).create_peer_did() for _ in range(2)]
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack', 'hello',
+                                 f'--from={did_frm}',
+                                 f'--to={dids_to[0]}',
+                                 f'--to={dids_to[1]}'])
+    assert result.exit_code == 0
+    packed_msgs = result.output.strip().splitlines()
+    assert len(packed_msgs) == 2
+
+    for did_to, packed_msg in zip(dids_to, packed_msgs):
+        result = runner.invoke(cli, ['unpack', packed_msg])
+        assert result.exit_code == 0
+        res = result.output.strip()
+        assert "hello" in res
+        assert did_frm in res
+        assert did_to in res
+
+
+def test_pack_multiple_to_sign_once(secrets_resolver, did_frm):
+    dids_to = [DIDCommDemo(secrets_resolver).create_peer_did() for _ in range(2)]
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack', 'hello', f'--from={did_frm}', f'--sign-from={did_frm}', '--sign-once',
+                                 f'--to={dids_to[0]}', f'--to={dids_to[1]}'])
+    assert result.exit_code == 0
+    packed_msgs = result.output.strip().splitlines()
+    assert len(packed_msgs) == 2
+
+    demo = DIDCommDemo(secrets_resolver)
+    unpacked = [demo.unpack(packed_msg) for packed_msg in packed_msgs]
+    assert [(msg, frm, to) for msg, frm, to, _ in unpacked] == [("hello", did_frm, did_to) for did_to in dids_to]
+    assert unpacked[0][3].metadata.signed_message == unpacked[1][3].metadata.signed_message
+
+
+def test_pack_unpack_signed_plaintext(secrets_resolver, did_frm, did_to):
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack', 'hello', '--mode=signed', f'--sign-from={did_frm}', f'--to={did_to}'])
+    assert result.exit_code == 0
+    result = runner.invoke(cli, ['unpack', result.output.strip()])
+    assert result.exit_code == 0
+    assert result.output.strip() == f"signed hello from {did_frm} to {did_to}"
+
+    result = runner.invoke(cli, ['pack', 'hello', '--mode=plaintext'])
+    assert result.exit_code == 0
+    result = runner.invoke(cli, ['unpack', result.output.strip()])
+    assert result.exit_code == 0
+    assert result.output.strip() == "plaintext hello"
+
+    result = runner.invoke(cli, ['pack', 'hello', '--mode=signed'])
+    assert result.exit_code != 0
+    result = runner.invoke(cli, ['pack', '--mode=plaintext', '--input=-'], input="hello\n")
+    assert result.exit_code != 0
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_create_peer_dids(secrets_resolver, tmp_path, jobs):
+    out = tmp_path / "dids.jsonl"
+    runner = CliRunner()
+    result = runner.invoke(cli, ['create-peer-dids', '--count=5', '--agreement-keys-count=2', '--batch-size=2',
+                                 f'--jobs={jobs}', f'--out={out}'])
+    assert result.exit_code == 0
+    dids = [json.loads(line)["did"] for line in out.read_text().splitlines()]
+    assert len(set(dids)) == 5
+    assert len(get_secret_resolver_kids(secrets_resolver)) == 15
+    for did in dids:
+        assert is_peer_did(did)
+        check_expected_did_doc(did, auth_keys_count=1, agreement_keys_count=2, service_endpoint=None)
+
+
+def test_profile(secrets_resolver, did_frm):
+    runner = CliRunner()
+    result = runner.invoke(cli, ['create-peer-did', '--profile'])
+    assert result.exit_code == 0
+    did_to = result.stdout.strip()
+    assert is_peer_did(did_to)
+    assert "create_peer_did.generate_keys" in result.stderr
+
+    result = runner.invoke(cli, ['pack', 'hello', f'--from={did_frm}', f'--to={did_to}', '--profile'])
+    assert result.exit_code == 0
+    assert "pack.crypto" in result.stderr
+    assert "did_doc_cache.miss" in result.stderr
+
+    result = runner.invoke(cli, ['unpack', result.stdout.strip(), '--profile'])
+    assert result.exit_code == 0
+    assert "hello" in result.stdout
+    assert "unpack.crypto" in result.stderr
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_pack_unpack_input(secrets_resolver, did_frm, did_to, tmp_path, jobs):
+    input_file = tmp_path / "msgs.jsonl"
+    input_file.write_text(
+        json.dumps("hello") + "\n"
+        + "\n"
+        + json.dumps({"msg": "from", "frm": did_frm}) + "\n"
+        + "not json\n"
+        + json.dumps({"msg": "to nobody", "to": "did:peer:0invalid"}) + "\n"
+    )
+    packed_file = tmp_path / "packed.jsonl"
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack', f'--to={did_to}', f'--input={input_file}', f'--output={packed_file}',
+                                 f'--jobs={jobs}'])
+    assert result.exit_code == 0
+    packed = [json.loads(line) for line in packed_file.read_text().splitlines()]
+    assert [p["line"] for p in packed] == [1, 3, 4, 5]
+    assert "packed_msg" in packed[0] and "packed_msg" in packed[1]
+    assert "error" in packed[2] and "error" in packed[3]
+
+    result = runner.invoke(cli, ['unpack', '--input=-', f'--jobs={jobs}'],
+                           input="\n".join(json.dumps(p) for p in packed[:2]) + "\n"
+                                 + packed[0]["packed_msg"] + "\n")
+    assert result.exit_code == 0
+    unpacked = [json.loads(line) for line in result.output.splitlines()]
+    assert unpacked == [
+        {"line": 1, "msg": "hello", "frm": None, "to": did_to},
+        {"line": 2, "msg": "from", "frm": did_frm, "to": did_to},
+        {"line": 3, "msg": "hello", "frm": None, "to": did_to},
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_pack_input_body(secrets_resolver, did_to, jobs):
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack', f'--to={did_to}', '--input=-', f'--jobs={jobs}'],
+                           input=json.dumps({"body": {"x": 1}, "type": "example/1.0/x"}) + "\n"
+                                 + json.dumps({"body": "x"}) + "\n" + json.dumps({"to": did_to}) + "\n")
+    assert result.exit_code == 0
+    packed, *errors = [json.loads(line) for line in result.output.splitlines()]
+    assert [e["error"].startswith("Malformed input line") for e in errors] == [True, True]
+    message = DIDCommDemo(secrets_resolver).unpack(packed["packed_msg"])[3].message
+    assert (message.type, message.body) == ("example/1.0/x", {"x": 1})
+
+
+def test_pack_unpack_file(secrets_resolver, did_frm, did_to, tmp_path):
+    content = os.urandom(3 * 1024 * 1024 + 1)
+    (tmp_path / "content").write_bytes(content)
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack', f'--file={tmp_path / "content"}', f'--from={did_frm}', f'--to={did_to}'])
+    assert result.exit_code == 0
+    packed_msg = result.output.strip()
+    assert (tmp_path / "content.enc").exists()
+
+    result = runner.invoke(cli, ['unpack', packed_msg, f'--out={tmp_path / "out"}'])
+    assert result.exit_code != 0
+    result = runner.invoke(cli, ['unpack', packed_msg, f'--out={tmp_path / "out"}', f'--content-dir={tmp_path}'])
+    assert result.exit_code == 0
+    assert f"authcrypted {len(content)} bytes from {did_frm} to {did_to}" in result.output
+    assert (tmp_path / "out").read_bytes() == content
+
+    (tmp_path / "other").write_bytes(b"x")
+    result = runner.invoke(cli, ['unpack', packed_msg, f'--file={tmp_path / "other"}', f'--out={tmp_path / "out2"}'])
+    assert result.exit_code == 0
+    assert "truncated" in result.output
+    assert not (tmp_path / "out2").exists()
+
+    result = runner.invoke(cli, ['pack', 'hello', f'--file={tmp_path / "content"}', f'--to={did_to}'])
+    assert result.exit_code != 0
+
+
+def test_pack_missing_args(secrets_resolver):
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack', 'hello'])
+    assert result.exit_code != 0
+    result = runner.invoke(cli, ['unpack'])
+    assert result.exit_code != 0
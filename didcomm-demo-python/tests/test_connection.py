@@ -0,0 +1,111 @@
+import json
+
+import pytest
+from didcomm.errors import DIDCommError
+from didcomm.message import Attachment, AttachmentDataJson
+from didcomm.pack_encrypted import PackEncryptedConfig
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.connection import Connection
+from didcomm_demo.didcomm_demo import DIDCommDemo, generate_peer_did, add_secrets
+from didcomm_demo.instrumentation import StageTimer
+
+
+@pytest.fixture()
+def timer():
+    return StageTimer()
+
+
+@pytest.fixture()
+def demo(tmp_path, timer):
+    return DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"), instrumentation=timer)
+
+
+@pytest.fixture()
+async def connections(demo):
+    did_alice = await demo.create_peer_did_async()
+    did_bob = await demo.create_peer_did_async()
+    return Connection(demo, did_alice, did_bob), Connection(demo, did_bob, did_alice)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("protect_sender_id", [True, False])
+async def test_send_receive(demo, protect_sender_id):
+    did_alice = await demo.create_peer_did_async()
+    did_bob = await demo.create_peer_did_async()
+    config = PackEncryptedConfig(protect_sender_id=protect_sender_id)
+    alice, bob = Connection(demo, did_alice, did_bob, config), Connection(demo, did_bob, did_alice, config)
+
+    res = await alice.send_async("hello")
+    assert await bob.receive_async(res.packed_msg) == "hello"
+    assert await alice.receive_async((await bob.send_async("hi")).packed_msg) == "hi"
+    # interoperable with pack/unpack
+    assert (await demo.unpack_async(res.packed_msg))[:3] == ("hello", did_alice, did_bob)
+    packed = await demo.pack_async(msg="hello again", to=did_bob, frm=did_alice, config=config)
+    assert await bob.receive_async(packed.packed_msg) == "hello again"
+
+
+@pytest.mark.asyncio
+async def test_send_body(demo, connections):
+    alice, bob = connections
+    body = json.dumps({"data": "x" * 100000}).encode()
+    attachment = Attachment(id="1", data=AttachmentDataJson(json={"a": 1}))
+    res = await alice.send_async(body=memoryview(body), type="example/1.0/data", attachments=[attachment])
+    message = await bob.receive_message_async(res.packed_msg)
+    assert message.type == "example/1.0/data"
+    assert message.body == {"data": "x" * 100000}
+    assert message.attachments == [attachment]
+    assert (message.frm, message.to) == (alice.my_did, [bob.my_did])
+    assert await bob.receive_async(res.packed_msg) is None
+
+    unpacked = await demo.unpack_async((await alice.send_async(body={"data": 1})).packed_msg)
+    assert unpacked[0] is None
+    assert unpacked[3].message.body == {"data": 1}
+
+
+@pytest.mark.asyncio
+async def test_keys_loaded_once(connections, timer):
+    alice, bob = connections
+    assert await bob.receive_async((await alice.send_async("hello")).packed_msg) == "hello"
+    secrets_looked_up = timer.report()["stages"]["get_secret"]["count"]
+
+    for i in range(3):
+        assert await bob.receive_async((await alice.send_async(f"hello {i}")).packed_msg) == f"hello {i}"
+    report = timer.report()
+    assert report["stages"]["connection.load_keys"]["count"] == 2
+    assert report["stages"]["connection.send"]["count"] == 4
+    assert report["stages"]["get_secret"]["count"] == secrets_looked_up
+
+
+@pytest.mark.asyncio
+async def test_invalidate(demo, connections, timer):
+    alice, bob = connections
+    await alice.send_async("hello")
+    alice.invalidate()
+    await alice.send_async("hello")
+    assert timer.report()["stages"]["connection.load_keys"]["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_receive_from_other(demo, connections):
+    alice, bob = connections
+    did_eve = await demo.create_peer_did_async()
+    packed = await demo.pack_async(msg="hello", to=alice.their_did, frm=did_eve)
+    with pytest.raises(DIDCommError):
+        await bob.receive_async(packed.packed_msg)
+
+    # anoncrypted only
+    packed = await demo.pack_async(msg="hello", to=alice.their_did)
+    with pytest.raises(DIDCommError):
+        await bob.receive_async(packed.packed_msg)
+
+
+@pytest.mark.asyncio
+async def test_receive_not_mine(tmp_path, connections):
+    alice, _ = connections
+    other = DIDCommDemo(SecretsResolverDemo(tmp_path / "other.json"))
+    did, secrets = generate_peer_did()
+    await add_secrets(other.secrets_resolver, secrets)
+    res = await alice.send_async("hello")
+    with pytest.raises(DIDCommError):
+        await Connection(other, did, alice.my_did).receive_async(res.packed_msg)
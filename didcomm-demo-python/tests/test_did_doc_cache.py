@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+from didcomm.did_doc.did_doc import DIDDoc
+
+from didcomm_demo.did_doc_cache import DIDDocCache
+
+
+def did_doc(did):
+    return DIDDoc(did=did, key_agreement_kids=[], authentication_kids=[], verification_methods=[],
+                  didcomm_services=[])
+
+
+def test_get_put():
+    cache = DIDDocCache(max_size=2)
+    assert cache.get("did:1") is None
+    cache.put("did:1", did_doc("did:1"))
+    assert cache.get("did:1") == did_doc("did:1")
+    assert "did:1" in cache
+    assert len(cache) == 1
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.evictions == 0
+    assert stats.size == 1
+    assert stats.max_size == 2
+
+
+def test_lru_eviction():
+    cache = DIDDocCache(max_size=2)
+    cache.put("did:1", did_doc("did:1"))
+    cache.put("did:2", did_doc("did:2"))
+    # touch did:1 so that did:2 becomes the least recently used
+    cache.get("did:1")
+    cache.put("did:3", did_doc("did:3"))
+    assert "did:1" in cache
+    assert "did:2" not in cache
+    assert "did:3" in cache
+    assert cache.stats().evictions == 1
+
+
+def test_clear():
+    cache = DIDDocCache()
+    cache.put("did:1", did_doc("did:1"))
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get("did:1") is None
+
+
+def test_invalid_max_size():
+    with pytest.raises(ValueError):
+        DIDDocCache(max_size=0)
+
+
+def test_thread_safe():
+    cache = DIDDocCache(max_size=10)
+
+    def work(n):
+        for i in range(200):
+            did = f"did:{(n + i) % 20}"
+            if cache.get(did) is None:
+                cache.put(did, did_doc(did))
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = cache.stats()
+    assert stats.size == 10
+    assert stats.hits + stats.misses == 8 * 200
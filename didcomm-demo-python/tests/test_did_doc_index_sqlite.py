@@ -0,0 +1,80 @@
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.compact_did_doc import CompactDIDDoc
+from didcomm_demo.did_doc_cache import DIDDocCache
+from didcomm_demo.did_doc_index_sqlite import DIDDocIndexSqlite
+from didcomm_demo.did_resolver_peer_did import DIDResolverPeerDID
+from didcomm_demo.didcomm_demo import DIDCommDemo, generate_peer_did
+from didcomm_demo.instrumentation import StageTimer
+
+
+@pytest.fixture()
+def index(tmp_path):
+    index = DIDDocIndexSqlite(tmp_path / "did_docs.db")
+    yield index
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_put_get(index):
+    did, _ = generate_peer_did(auth_keys_count=2, agreement_keys_count=1, service_endpoint="http://localhost:8000/",
+                               service_routing_keys=["did:example:mediator#key-1"])
+    did_doc = await DIDResolverPeerDID().resolve(did)
+    assert did not in index
+    assert index.get(did) is None
+
+    index.put(did, did_doc)
+    assert did in index
+    assert len(index) == 1
+    loaded = index.get(did)
+    assert isinstance(loaded, CompactDIDDoc)
+    assert loaded == did_doc
+    assert loaded.didcomm_services[0].routing_keys == ["did:example:mediator#key-1"]
+
+    kid = did_doc.key_agreement_kids[0]
+    assert index.find_did(kid) == did
+    assert index.get_by_kid(kid) == did_doc
+    assert index.find_did(did + "#unknown") is None
+    assert index.get_by_kid(did + "#unknown") is None
+
+
+def test_lazy_open(tmp_path):
+    index = DIDDocIndexSqlite(tmp_path / "did_docs.db")
+    assert not (tmp_path / "did_docs.db").exists()
+    assert len(index) == 0
+    assert (tmp_path / "did_docs.db").exists()
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_resolver_persistent(tmp_path):
+    dids = [generate_peer_did()[0] for _ in range(3)]
+    index = DIDDocIndexSqlite(tmp_path / "did_docs.db")
+    did_docs = [await DIDResolverPeerDID(index=index).resolve(did) for did in dids]
+    assert len(index) == 3
+    index.close()
+
+    # after a restart the DID Docs are read from the index instead of being resolved
+    timer = StageTimer()
+    index = DIDDocIndexSqlite(tmp_path / "did_docs.db")
+    resolver = DIDResolverPeerDID(cache=DIDDocCache(), instrumentation=timer, index=index)
+    assert [await resolver.resolve(did) for did in dids] == did_docs
+    await resolver.resolve(generate_peer_did()[0])
+    await resolver.resolve(dids[0])
+    report = timer.report()
+    assert report["counters"] == {"did_doc_cache.miss": 4, "did_doc_cache.hit": 1,
+                                  "did_doc_index.hit": 3, "did_doc_index.miss": 1}
+    assert report["stages"]["resolve_peer_did"]["count"] == 1
+    assert len(index) == 4
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_demo_with_index(tmp_path, index):
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"), did_doc_index=index)
+    did_frm = await demo.create_peer_did_async()
+    did_to = await demo.create_peer_did_async()
+    packed = await demo.pack_async(msg="hello", to=did_to, frm=did_frm)
+    assert did_frm in index and did_to in index
+    assert (await demo.unpack_async(packed.packed_msg))[:3] == ("hello", did_frm, did_to)
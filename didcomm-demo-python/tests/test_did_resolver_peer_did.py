@@ -2,9 +2,14 @@ import json
 
 import pytest
 from didcomm.common.types import VerificationMethodType, VerificationMaterial, VerificationMaterialFormat
-from didcomm.did_doc.did_doc import VerificationMethod, DIDCommService
+from didcomm.core.utils import extract_key
+from didcomm.did_doc.did_doc import VerificationMethod, DIDCommService, DIDDoc
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
 
+from didcomm_demo.compact_did_doc import CompactDIDDoc, extract_public_key
+from didcomm_demo.did_doc_cache import DIDDocCache
 from didcomm_demo.did_resolver_peer_did import DIDResolverPeerDID
+from didcomm_demo.didcomm_demo import DIDCommDemo
 
 
 @pytest.fixture()
@@ -111,3 +116,82 @@ async def test_numalgo_2(resolver):
             ]
         )
     ]
+
+
+@pytest.mark.asyncio
+async def test_cache():
+    cache = DIDDocCache(max_size=1)
+    resolver = DIDResolverPeerDID(cache=cache)
+    did = "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V"
+
+    did_doc = await resolver.resolve(did)
+    assert await resolver.resolve(did) is did_doc
+    assert cache.stats().hits == 1
+    assert cache.stats().misses == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_shared_between_demos(tmp_path):
+    cache = DIDDocCache()
+    did = "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V"
+    demo1 = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets1.json"), did_doc_cache=cache)
+    demo2 = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets2.json"), did_doc_cache=cache)
+
+    did_doc = await demo1.resolvers_config.did_resolver.resolve(did)
+    assert await demo2.resolvers_config.did_resolver.resolve(did) is did_doc
+    assert cache.stats().hits == 1
+
+
+@pytest.mark.asyncio
+async def test_service_without_routing_keys(resolver, tmp_path):
+    did = await DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json")).create_peer_did_async(
+        service_endpoint="http://localhost:8000/"
+    )
+    did_doc = await resolver.resolve(did)
+    assert did_doc.didcomm_services[0].service_endpoint == "http://localhost:8000/"
+    assert did_doc.didcomm_services[0].routing_keys == []
+
+
+@pytest.mark.asyncio
+async def test_compact_did_doc(resolver):
+    did = "did:peer:2.Ez6LSbysY2xFMRpGMhb7tFTLMpeuPRaqaWM1yECx2AtzE3KCc.Vz6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V.Vz6MkgoLTnTypo3tDRwCkZXSccTPHRLhF4ZnjhueYAFpEX6vg"
+    did_doc = await resolver.resolve(did)
+    assert isinstance(did_doc, CompactDIDDoc)
+
+    kid = did_doc.key_agreement_kids[0]
+    method = did_doc.get_verification_method(kid)
+    assert method is did_doc.verification_methods[2]
+    assert did_doc.get_verification_method(did + "#unknown") is None
+
+    # parsed once and kept
+    key = did_doc.get_key(kid)
+    assert key.as_dict()["x"] == "BIiFcQEn3dfvB2pjlhOQQour6jXy9d5s2FKEJNTOJik"
+    assert did_doc.get_key(kid) is key
+    assert extract_public_key(method) is key
+    assert extract_key(method).as_dict() == key.as_dict()
+    assert did_doc.get_key(did + "#unknown") is None
+
+    assert did_doc == DIDDoc(
+        did=did_doc.did,
+        key_agreement_kids=did_doc.key_agreement_kids,
+        authentication_kids=did_doc.authentication_kids,
+        verification_methods=[
+            VerificationMethod(id=m.id, type=m.type, controller=m.controller,
+                               verification_material=m.verification_material)
+            for m in did_doc.verification_methods
+        ],
+        didcomm_services=[]
+    )
+    # all in slots
+    assert not hasattr(did_doc, "__dict__")
+
+
+@pytest.mark.asyncio
+async def test_compact_did_doc_service(resolver, tmp_path):
+    did = await DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json")).create_peer_did_async(
+        service_endpoint="http://localhost:8000/"
+    )
+    did_doc = await resolver.resolve(did)
+    service = did_doc.didcomm_services[0]
+    assert did_doc.get_didcomm_service(service.id) is service
+    assert did_doc.get_didcomm_service(did + "#unknown") is None
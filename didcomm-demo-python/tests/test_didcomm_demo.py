@@ -1,12 +1,23 @@
+import asyncio
 import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
+from didcomm.core.anoncrypt import anoncrypt
+from didcomm.core.defaults import DEF_ENC_ALG_ANON
+from didcomm.core.types import Key
+from didcomm.errors import DIDCommValueError, MalformedMessageError
+from didcomm.message import Message, Attachment, AttachmentDataJson
 from didcomm.pack_encrypted import PackEncryptedConfig
 from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from peerdid import peer_did
+from peerdid.did_doc import DIDDocPeerDID
+from peerdid.errors import MalformedPeerDIDError
 from peerdid.peer_did import is_peer_did
 from peerdid.types import VerificationMaterialFormatPeerDID
 
-from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.didcomm_demo import DIDCommDemo, PackRequest, generate_peer_did, peer_did_kids, _run
 from tests.common import get_secret_resolver_kids, check_expected_did_doc
 
 
@@ -178,3 +189,252 @@ def test_pack_authcrypt_not_hidden_sender(input_msg, demo, did_frm, did_to):
     assert unpack_res.metadata.encrypted is True
     assert unpack_res.metadata.anonymous_sender is False
     assert unpack_res.metadata.non_repudiation is False
+
+
+@pytest.mark.asyncio
+async def test_create_peer_did_async(demo):
+    did = await demo.create_peer_did_async(auth_keys_count=1, agreement_keys_count=1)
+    assert is_peer_did(did)
+    assert did.startswith("did:peer:2")
+    assert len(await demo.secrets_resolver.get_kids()) == 2
+
+
+@pytest.mark.asyncio
+async def test_pack_unpack_async_concurrent(demo, did_frm, did_to):
+    packed = await asyncio.gather(*[
+        demo.pack_async(msg=input_msg, frm=did_frm, to=did_to) for input_msg in MESSAGES
+    ])
+    unpacked = await asyncio.gather(*[demo.unpack_async(p.packed_msg) for p in packed])
+    for input_msg, (unpacked_msg, frm, to, _) in zip(MESSAGES, unpacked):
+        assert input_msg == unpacked_msg
+        assert frm == did_frm
+        assert to == did_to
+
+
+def test_pack_many(demo, did_frm, did_to):
+    requests = [PackRequest(msg=input_msg, to=did_to, frm=did_frm) for input_msg in MESSAGES]
+    requests.insert(1, PackRequest(msg="bad", to="did:peer:2.Ezbad", frm=did_frm))
+
+    results = demo.pack_many(requests)
+
+    assert len(results) == len(MESSAGES) + 1
+    assert isinstance(results[1], MalformedPeerDIDError)
+    packed = [r for i, r in enumerate(results) if i != 1]
+    for input_msg, packed_res in zip(MESSAGES, packed):
+        unpacked_msg, frm, to, _ = demo.unpack(packed_res.packed_msg)
+        assert input_msg == unpacked_msg
+        assert frm == did_frm
+        assert to == did_to
+
+
+def test_pack_body(demo, did_frm, did_to):
+    attachment = Attachment(id="1", data=AttachmentDataJson(json={"a": 1}))
+    requests = [
+        PackRequest(msg=None, to=did_to, frm=did_frm, body={"x": 1}, type="example/1.0/x", attachments=[attachment]),
+        PackRequest(msg=None, to=did_to, body=json.dumps({"y": 2}).encode()),
+    ]
+    first, second = [demo.unpack(r.packed_msg) for r in demo.pack_many(requests)]
+
+    msg, frm, to, res = first
+    assert (msg, frm, to) == (None, did_frm, did_to)
+    assert res.message.type == "example/1.0/x"
+    assert res.message.body == {"x": 1}
+    assert res.message.attachments == [attachment]
+    assert second[3].message.body == {"y": 2}
+
+
+def test_pack_multicast(demo, did_frm):
+    dids_to = [demo.create_peer_did() for _ in range(3)]
+
+    results = demo.pack_multicast(msg="hello", to=dids_to + ["not-a-did"], frm=did_frm, sign_frm=did_frm)
+
+    assert len(results) == 4
+    assert isinstance(results[3], DIDCommValueError)
+    for did_to, packed_res in zip(dids_to, results):
+        unpacked_msg, frm, to, unpack_res = demo.unpack(packed_res.packed_msg)
+        assert unpacked_msg == "hello"
+        assert frm == did_frm
+        assert to == did_to
+        assert unpack_res.metadata.non_repudiation is True
+
+
+
+@pytest.mark.parametrize("protect_sender_id", [True, False])
+def test_pack_multicast_sign_once(demo, did_frm, protect_sender_id):
+    dids_to = [demo.create_peer_did() for _ in range(3)]
+
+    results = demo.pack_multicast(msg="hello", to=dids_to + ["not-a-did"], frm=did_frm, sign_frm=did_frm,
+                                  config=PackEncryptedConfig(protect_sender_id=protect_sender_id), sign_once=True)
+
+    assert isinstance(results[3], DIDCommValueError)
+    signed_msgs = set()
+    for did_to, packed_res in zip(dids_to, results):
+        assert packed_res.sign_from_kid.startswith(did_frm)
+        unpacked_msg, frm, to, unpack_res = demo.unpack(packed_res.packed_msg)
+        assert (unpacked_msg, frm, to) == ("hello", did_frm, did_to)
+        assert unpack_res.metadata.non_repudiation is True
+        assert unpack_res.metadata.authenticated is True
+        assert unpack_res.message.to == dids_to + ["not-a-did"]
+        signed_msgs.add(unpack_res.metadata.signed_message)
+    # the same JWS is encrypted to each recipient
+    assert len(signed_msgs) == 1
+
+    # a signing error is the error for each recipient
+    results = demo.pack_multicast(msg="hello", to=dids_to, sign_frm=dids_to[0] + "#unknown", sign_once=True)
+    assert len(results) == 3 and all(isinstance(r, Exception) for r in results)
+
+
+def test_pack_signed(demo, did_frm, did_to):
+    signed = demo.pack_signed("hello", sign_frm=did_frm, to=[did_to])
+    assert signed.sign_from_kid.startswith(did_frm)
+
+    unpacked_msg, frm, to, unpack_res = demo.unpack(signed.packed_msg)
+    assert (unpacked_msg, frm, to) == ("hello", did_frm, did_to)
+    assert unpack_res.metadata.non_repudiation is True
+    assert unpack_res.metadata.encrypted is False
+    assert unpack_res.message.frm == did_frm
+
+    # and encrypted as is (anoncrypted)
+    [packed_res] = demo.encrypt_signed(signed, [did_to])
+    unpacked_msg, frm, to, unpack_res = demo.unpack(packed_res.packed_msg)
+    assert (unpacked_msg, frm, to) == ("hello", None, did_to)
+    assert unpack_res.metadata.signed_message == signed.packed_msg
+
+
+def test_encrypt_signed_checks_to_and_frm(demo, did_frm, did_to):
+    other = demo.create_peer_did()
+    signed = demo.pack_signed("hello", sign_frm=did_frm, to=[did_to])
+
+    # not a recipient of the signed message, or not its sender
+    [res] = demo.encrypt_signed(signed, [other])
+    assert isinstance(res, DIDCommValueError)
+    [res] = demo.encrypt_signed(signed, [did_to], frm=other)
+    assert isinstance(res, DIDCommValueError)
+
+    [packed_res] = demo.encrypt_signed(signed, [did_to], frm=did_frm)
+    assert demo.unpack(packed_res.packed_msg)[:3] == ("hello", did_frm, did_to)
+
+
+def test_pack_plaintext(demo, did_frm):
+    packed_res = demo.pack_plaintext(None, body={"a": 1}, type="my-protocol/1.0/other")
+    unpacked_msg, frm, to, unpack_res = demo.unpack(packed_res.packed_msg)
+    assert (unpacked_msg, frm, to) == (None, None, None)
+    assert unpack_res.message.body == {"a": 1}
+    assert unpack_res.metadata.encrypted is False and unpack_res.metadata.non_repudiation is False
+
+    packed_res = demo.pack_plaintext("hello", frm=did_frm)
+    assert demo.unpack(packed_res.packed_msg)[:2] == ("hello", did_frm)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered", [True, False])
+async def test_unpack_stream(demo, did_frm, did_to, ordered):
+    input_msgs = [f"msg-{i}" for i in range(20)]
+    packed_msgs = [(await demo.pack_async(msg=m, frm=did_frm, to=did_to)).packed_msg for m in input_msgs]
+    packed_msgs.insert(5, "not a packed message")
+
+    results = [item async for item in demo.unpack_stream(packed_msgs, concurrency=4, ordered=ordered)]
+
+    assert len(results) == len(packed_msgs)
+    if ordered:
+        assert [i for i, _ in results] == list(range(len(packed_msgs)))
+    results = dict(results)
+    assert isinstance(results.pop(5), MalformedMessageError)
+    for i, (unpacked_msg, frm, to, _) in results.items():
+        assert unpacked_msg == input_msgs[i if i < 5 else i - 1]
+        assert frm == did_frm
+        assert to == did_to
+
+
+@pytest.mark.asyncio
+async def test_unpack_stream_async_source_backpressure(demo, did_to):
+    packed_msg = (await demo.pack_async(msg="hello", to=did_to)).packed_msg
+    read = 0
+
+    async def source():
+        nonlocal read
+        for _ in range(100):
+            read += 1
+            yield packed_msg
+
+    stream = demo.unpack_stream(source(), concurrency=2, max_pending=4)
+    i, (unpacked_msg, _, to, _) = await stream.__anext__()
+    assert (i, unpacked_msg, to) == (0, "hello", did_to)
+    # the source is not drained ahead of the consumer
+    assert read <= 6
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unpack_stream_source_error(demo, did_to):
+    packed_msg = (await demo.pack_async(msg="hello", to=did_to)).packed_msg
+
+    def source():
+        yield packed_msg
+        raise IOError("source failed")
+
+    results = []
+    with pytest.raises(IOError):
+        async for item in demo.unpack_stream(source()):
+            results.append(item)
+    assert len(results) == 1
+
+
+@pytest.mark.parametrize(
+    "auth_keys_count,agreement_keys_count,service_endpoint",
+    [
+        pytest.param(1, 0, None, id="numalgo0"),
+        pytest.param(2, 3, None, id="numalgo2"),
+        pytest.param(1, 1, "https://my-endpoint", id="numalgo2-service")
+    ]
+)
+def test_peer_did_kids(auth_keys_count, agreement_keys_count, service_endpoint):
+    did, secrets = generate_peer_did(auth_keys_count=auth_keys_count, agreement_keys_count=agreement_keys_count,
+                                     service_endpoint=service_endpoint)
+    did_doc = DIDDocPeerDID.from_json(peer_did.resolve_peer_did(did))
+    assert peer_did_kids(did) == (did_doc.auth_kids, did_doc.agreement_kids)
+    assert [s.kid for s in secrets] == did_doc.auth_kids + did_doc.agreement_kids
+
+
+@pytest.mark.parametrize("use_executor", [False, True])
+def test_create_peer_dids(demo, use_executor):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        dids = list(demo.create_peer_dids(count=5, auth_keys_count=1, agreement_keys_count=2, batch_size=2,
+                                          executor=executor if use_executor else None))
+    assert len(set(dids)) == 5
+    kids = get_secret_resolver_kids(demo.secrets_resolver)
+    assert len(kids) == 15
+    for did in dids:
+        assert is_peer_did(did)
+        check_expected_did_doc(did, auth_keys_count=1, agreement_keys_count=2)
+        assert len([kid for kid in kids if kid.startswith(did)]) == 3
+
+    packed = demo.pack(msg="hello", frm=dids[0], to=dids[-1])
+    assert demo.unpack(packed.packed_msg)[0] == "hello"
+
+
+def test_unpack_many(demo):
+    did = demo.create_peer_did()
+    packed_msgs = [demo.pack(msg=f"msg{i}", to=did).packed_msg for i in range(3)]
+    results = demo.unpack_many(packed_msgs + ["{}"])
+    assert [r[0] for r in results[:3]] == ["msg0", "msg1", "msg2"]
+    assert isinstance(results[3], MalformedMessageError)
+
+
+def test_unpack_recipients(tmp_path, demo, did_to):
+    # encrypted to a key of another party first and then to both keys of `did_to`
+    other = DIDCommDemo(SecretsResolverDemo(tmp_path / "other.json"))
+    did_other = other.create_peer_did()
+    keys = []
+    for did in (did_other, did_to):
+        did_doc = _run(demo.resolvers_config.did_resolver.resolve(did))
+        keys += [Key(kid=kid, key=did_doc.get_key(kid)) for kid in did_doc.key_agreement_kids]
+    message = Message(body={"msg": "hello"}, id="1", type="my-protocol/1.0", to=[did_other, did_to])
+    packed_msg = json.dumps(anoncrypt(message.as_dict(), keys, DEF_ENC_ALG_ANON).msg)
+
+    res = demo.unpack(packed_msg)
+    unpacked_msg, frm, to, _ = res
+    assert (unpacked_msg, frm, to) == ("hello", None, did_to)
+    assert res.recipients == [k.kid for k in keys[1:]]
+    assert pickle.loads(pickle.dumps(res)).recipients == res.recipients
+    assert other.unpack(packed_msg).recipients == [keys[0].kid]
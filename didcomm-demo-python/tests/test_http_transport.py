@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_demo import DIDCommDemo, PackRequest
+from didcomm_demo.http_transport import DIDCommHTTPReceiver, DIDCommHTTPSender, HTTPClient, HTTPTransportError, \
+    read_http_message
+
+
+@pytest.fixture()
+def demo(tmp_path):
+    return DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"))
+
+
+async def start_receiver(demo, **kwargs):
+    receiver = DIDCommHTTPReceiver(demo, **kwargs)
+    await receiver.start()
+    did = await demo.create_peer_did_async(service_endpoint=receiver.endpoint)
+    return receiver, did
+
+
+async def start_server_responding(statuses):
+    # answers each connection with the next status and closes it
+    async def serve(reader, writer):
+        await read_http_message(reader)
+        writer.write(f"HTTP/1.1 {statuses.pop(0)} X\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+
+
+@pytest.mark.asyncio
+async def test_send_receive(demo):
+    receiver, did_to = await start_receiver(demo)
+    did_frm = await demo.create_peer_did_async()
+    async with receiver, DIDCommHTTPSender(demo) as sender:
+        response = await sender.send(msg="hello", to=did_to, frm=did_frm)
+        assert response.status == 202
+        msg, frm, to, _ = await receiver.messages.get()
+        assert (msg, frm, to) == ("hello", did_frm, did_to)
+
+
+@pytest.mark.asyncio
+async def test_send_via_mediator_endpoint(demo):
+    # the service endpoint of the recipient is the DID of its mediator
+    receiver, mediator_did = await start_receiver(demo)
+    did_to = await demo.create_peer_did_async(service_endpoint=mediator_did)
+    async with receiver, DIDCommHTTPSender(demo) as sender:
+        assert await sender.find_endpoint(did_to) == receiver.endpoint
+        assert (await sender.send(msg="hello", to=did_to)).status == 202
+        assert (await receiver.messages.get())[:3] == ("hello", None, did_to)
+
+
+@pytest.mark.asyncio
+async def test_keep_alive(demo):
+    receiver, did_to = await start_receiver(demo)
+    async with receiver, DIDCommHTTPSender(demo) as sender:
+        for i in range(5):
+            await sender.send(msg=f"msg{i}", to=did_to)
+        assert sender.client.connections_opened == 1
+        assert [(await receiver.messages.get())[0] for _ in range(5)] == [f"msg{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_send_many_limits_connections(demo):
+    received = []
+
+    async def on_message(res):
+        received.append(res[0])
+        await asyncio.sleep(0.01)
+
+    receiver, did_to = await start_receiver(demo, on_message=on_message)
+    async with receiver, DIDCommHTTPSender(demo, HTTPClient(max_connections_per_host=2)) as sender:
+        results = await sender.send_many(
+            [PackRequest(f"msg{i}", did_to) for i in range(10)] + [PackRequest("x", "did:peer:0invalid")]
+        )
+        assert [r.status for r in results[:10]] == [202] * 10
+        assert isinstance(results[10], Exception)
+        assert sender.client.connections_opened == 2
+    assert sorted(received) == sorted(f"msg{i}" for i in range(10))
+
+
+@pytest.mark.asyncio
+async def test_send_many_body_and_type(demo):
+    received = []
+
+    async def on_message(res):
+        received.append(res[3].message)
+
+    receiver, did_to = await start_receiver(demo, on_message=on_message)
+    async with receiver, DIDCommHTTPSender(demo) as sender:
+        [response] = await sender.send_many([PackRequest(None, did_to, body={"hello": "world"}, type="example/1.0")])
+        assert response.status == 202
+    assert [(m.type, m.body) for m in received] == [("example/1.0", {"hello": "world"})]
+
+
+@pytest.mark.asyncio
+async def test_no_http_service(demo):
+    did_to = await demo.create_peer_did_async()
+    async with DIDCommHTTPSender(demo) as sender:
+        with pytest.raises(HTTPTransportError):
+            await sender.send(msg="hello", to=did_to)
+
+
+@pytest.mark.asyncio
+async def test_receiver_errors(demo):
+    receiver, _ = await start_receiver(demo)
+    async with receiver, HTTPClient() as client:
+        assert (await client.post(receiver.endpoint, b"not a message")).status == 400
+        assert (await client.post(receiver.endpoint, b"{}", content_type="text/plain")).status == 415
+
+    receiver = DIDCommHTTPReceiver(demo, max_body_size=10)
+    await receiver.start()
+    async with receiver, HTTPClient() as client:
+        assert (await client.post(receiver.endpoint, b"x" * 11)).status == 413
+
+
+@pytest.mark.asyncio
+async def test_retries():
+    server, url = await start_server_responding([503, 503, 202])
+    async with server, HTTPClient(retries=2, backoff=0.001) as client:
+        assert (await client.post(url, b"{}")).status == 202
+        assert client.connections_opened == 3
+
+    server, url = await start_server_responding([503, 503])
+    async with server, HTTPClient(retries=1, backoff=0.001) as client:
+        assert (await client.post(url, b"{}")).status == 503
+
+
+@pytest.mark.asyncio
+async def test_connection_failed():
+    server, url = await start_server_responding([])
+    server.close()
+    await server.wait_closed()
+    async with HTTPClient(retries=1, backoff=0.001) as client:
+        with pytest.raises(HTTPTransportError):
+            await client.post(url, b"{}")
+        with pytest.raises(HTTPTransportError):
+            await client.post("ftp://example.com", b"{}")
+
+
+@pytest.mark.asyncio
+async def test_no_retry_after_request_written():
+    received = []
+
+    # reads the request and closes the connection without a response
+    async def serve(reader, writer):
+        received.append(await read_http_message(reader))
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+    async with server, HTTPClient(retries=2, backoff=0.001) as client:
+        with pytest.raises(HTTPTransportError, match="may have been delivered"):
+            await client.post(url, b"{}")
+        assert len(received) == 1
+        assert client.connections_opened == 1
+
+
+@pytest.mark.asyncio
+async def test_close_delimited_response():
+    # a response body without Content-Length ends with the connection
+    async def serve(reader, writer):
+        await read_http_message(reader)
+        writer.write(b"HTTP/1.1 200 OK\r\n\r\nresponse body")
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+    async with server, HTTPClient() as client:
+        assert (await client.post(url, b"{}")).body == b"response body"
+        assert (await client.post(url, b"{}")).body == b"response body"
+        assert client.connections_opened == 2
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+HEAVY_MODULES = ["didcomm", "peerdid", "authlib", "asyncio"]
+
+DID = "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V"
+
+
+def run_python(code: str, cwd: Path, *args) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    return subprocess.run([sys.executable, *args, "-c", code], cwd=cwd, env=env, capture_output=True, text=True,
+                          check=True)
+
+
+def loaded_modules(code: str, cwd: Path) -> set:
+    res = run_python(code + "\nimport sys\nprint(' '.join(sys.modules))", cwd)
+    return {m.split(".")[0] for m in res.stdout.split()}
+
+
+def import_time_us(module: str, cwd: Path) -> int:
+    # cumulative import time of the module as reported by `python -X importtime`
+    res = run_python(f"import {module}", cwd, "-X", "importtime")
+    for line in res.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise AssertionError(f"No import time for {module}")
+
+
+def test_cli_import_is_lightweight(tmp_path):
+    modules = loaded_modules("import didcomm_demo.didcomm_cli", tmp_path)
+    assert modules.isdisjoint(HEAVY_MODULES)
+    assert not (tmp_path / "secrets.json").exists()
+
+
+def test_help_is_lightweight(tmp_path):
+    modules = loaded_modules(
+        "from didcomm_demo.didcomm_cli import cli\n"
+        "try:\n"
+        "    cli(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass", tmp_path)
+    assert modules.isdisjoint(HEAVY_MODULES)
+    assert not (tmp_path / "secrets.json").exists()
+
+
+def test_resolve_peer_did_needs_only_peerdid(tmp_path):
+    modules = loaded_modules(
+        "from didcomm_demo.didcomm_cli import cli\n"
+        f"cli(['resolve-peer-did', '{DID}'], standalone_mode=False)", tmp_path)
+    assert "peerdid" in modules
+    assert modules.isdisjoint(["didcomm", "authlib", "asyncio"])
+    assert not (tmp_path / "secrets.json").exists()
+
+
+def test_cli_import_time_budget(tmp_path):
+    # loading the CLI must stay well below loading didcomm itself
+    assert import_time_us("didcomm_demo.didcomm_cli", tmp_path) < import_time_us("didcomm.pack_encrypted", tmp_path) / 2
+
+
+def test_library_doesnt_need_fcntl(tmp_path):
+    # the file lock of SecretsResolverFile is only used by the CLI; fcntl is missing on Windows
+    run_python("import sys\nsys.modules['fcntl'] = None\n"
+               "from didcomm_demo.didcomm_demo import DIDCommDemo\nDIDCommDemo().create_peer_did()", tmp_path)
+    assert not (tmp_path / "secrets.json.lock").exists()
@@ -0,0 +1,118 @@
+import time
+from contextlib import contextmanager
+
+import pytest
+from didcomm.errors import MalformedMessageError
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.instrumentation import StageTimer, OpenTelemetryInstrumentation, NO_INSTRUMENTATION
+
+
+@pytest.fixture()
+def timer():
+    return StageTimer()
+
+
+@pytest.fixture()
+def demo(tmp_path, timer):
+    return DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"), instrumentation=timer)
+
+
+def test_stage_timer_self_time(timer):
+    with timer.stage("outer"):
+        with timer.stage("inner"):
+            time.sleep(0.02)
+    stages = timer.report()["stages"]
+    assert stages["outer"]["count"] == 1
+    assert stages["inner"]["count"] == 1
+    assert stages["outer"]["total_ms"] >= stages["inner"]["total_ms"] >= 20
+    assert stages["outer"]["self_ms"] < stages["inner"]["self_ms"]
+
+
+def test_stage_timer_count_and_reset(timer):
+    timer.count("x")
+    timer.count("x", 2)
+    assert timer.report()["counters"] == {"x": 3}
+    timer.reset()
+    assert timer.report() == {"stages": {}, "counters": {}}
+
+
+def test_no_instrumentation(tmp_path):
+    with NO_INSTRUMENTATION.stage("x"):
+        NO_INSTRUMENTATION.count("y")
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"))
+    assert demo.instrumentation is NO_INSTRUMENTATION
+    assert demo.resolvers_config.secrets_resolver is demo.secrets_resolver
+
+
+def test_demo_stages(demo, timer):
+    did_frm = demo.create_peer_did()
+    did_to = demo.create_peer_did()
+    packed_msg = demo.pack(msg="hello", to=did_to, frm=did_frm).packed_msg
+    demo.unpack(packed_msg)
+
+    report = timer.report()
+    assert {
+        "create_peer_did",
+        "create_peer_did.generate_keys",
+        "create_peer_did.encode_did",
+        "create_peer_did.store_secrets",
+        "pack",
+        "pack.crypto",
+        "unpack",
+        "unpack.crypto",
+        "resolve_did",
+        "resolve_peer_did",
+        "get_secret",
+        "find_secrets"
+    } <= set(report["stages"])
+    assert report["stages"]["create_peer_did"]["count"] == 2
+    assert report["counters"]["did_doc_cache.miss"] == 2
+    assert report["counters"]["did_doc_cache.hit"] > 0
+    assert "pack.crypto" in timer.format()
+
+
+def test_open_telemetry(demo):
+    spans = []
+    records = {}
+    outcomes = {}
+
+    class Tracer:
+        @contextmanager
+        def start_as_current_span(self, name):
+            spans.append(name)
+            yield
+
+    class Instrument:
+        def __init__(self, name):
+            self.name = name
+
+        def record(self, value, attributes=None):
+            records.setdefault(self.name, []).append(value)
+            outcomes.setdefault(self.name, []).append((attributes or {}).get("outcome"))
+
+        def add(self, value):
+            records.setdefault(self.name, []).append(value)
+
+    class Meter:
+        def create_histogram(self, name, unit=""):
+            return Instrument(name)
+
+        def create_counter(self, name):
+            return Instrument(name)
+
+    demo = DIDCommDemo(demo.secrets_resolver, instrumentation=OpenTelemetryInstrumentation(Tracer(), Meter()))
+    did = demo.create_peer_did()
+    demo.unpack(demo.pack(msg="hello", to=did).packed_msg)
+
+    assert "didcomm.pack" in spans
+    assert "didcomm.unpack.crypto" in spans
+    assert len(records["didcomm.pack.duration"]) == 1
+    assert outcomes["didcomm.pack.duration"] == ["success"]
+    assert records["didcomm.did_doc_cache.miss"] == [1]
+
+    # failed stages are recorded too
+    with pytest.raises(MalformedMessageError):
+        demo.unpack("not a packed message")
+    assert outcomes["didcomm.unpack.duration"] == ["success", "error"]
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from peerdid.peer_did import is_peer_did
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.key_pool import KeyPool
+from tests.common import get_secret_resolver_kids, check_expected_did_doc
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture()
+def key_pool():
+    key_pool = KeyPool(size=8, low_water_mark=4)
+    yield key_pool
+    key_pool.close()
+
+
+def test_filled_on_start(key_pool):
+    wait_for(lambda: key_pool.stats().x25519_depth == 8 and key_pool.stats().ed25519_depth == 8)
+    stats = key_pool.stats()
+    assert stats.generated == 16
+    assert stats.refill_rate > 0
+
+
+def test_key_pairs(key_pool):
+    private_key, public_key = key_pool.get_x25519()
+    assert private_key["crv"] == "X25519"
+    assert public_key["x"] == private_key["x"]
+    private_key, public_key = key_pool.get_ed25519()
+    assert private_key["crv"] == "Ed25519"
+    assert public_key["x"] == private_key["x"]
+
+
+def test_refill_below_low_water_mark(key_pool):
+    wait_for(lambda: key_pool.stats().x25519_depth == 8)
+    keys = {key_pool.get_x25519()[0]["x"] for _ in range(6)}
+    assert len(keys) == 6
+    wait_for(lambda: key_pool.stats().x25519_depth == 8)
+    assert key_pool.stats().served == 6
+
+
+def test_miss_generates_inline():
+    key_pool = KeyPool(size=2, start=False)
+    private_key, _ = key_pool.get_ed25519()
+    assert private_key["crv"] == "Ed25519"
+    assert key_pool.stats().misses == 1
+    key_pool.fill()
+    assert key_pool.stats().ed25519_depth == 2
+    key_pool.close()
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        KeyPool(size=0)
+
+
+def test_create_peer_did_from_pool(tmp_path, key_pool):
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"), key_pool=key_pool)
+    did = demo.create_peer_did(auth_keys_count=2, agreement_keys_count=2)
+    assert is_peer_did(did)
+    assert len(get_secret_resolver_kids(demo.secrets_resolver)) == 4
+    check_expected_did_doc(did, auth_keys_count=2, agreement_keys_count=2)
+    assert key_pool.stats().served == 4
+
+    packed = demo.pack(msg="hello", frm=did, to=did, sign_frm=did)
+    assert demo.unpack(packed.packed_msg)[0] == "hello"
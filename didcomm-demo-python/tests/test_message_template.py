@@ -0,0 +1,33 @@
+import json
+
+from didcomm.message import Message, Attachment, AttachmentDataJson, AttachmentDataBase64
+
+from didcomm_demo.message_template import MessageTemplate, DEFAULT_MESSAGE_TYPE
+
+FRM = "did:example:alice"
+TO = "did:example:bob"
+
+
+def test_serialize():
+    template = MessageTemplate("example/1.0/ping", FRM, [TO])
+    attachment = Attachment(id="1", data=AttachmentDataJson(json={"a": 1}))
+    message = Message.from_json(template.serialize({"x": [1, 2]}, [attachment], id="123"))
+    assert message == Message(id="123", type="example/1.0/ping", body={"x": [1, 2]}, frm=FRM, to=[TO],
+                              attachments=[attachment])
+    assert message == Message.from_dict(template.message({"x": [1, 2]}, [attachment], id="123").as_dict())
+
+
+def test_serialize_json_as_is():
+    template = MessageTemplate()
+    body = json.dumps({"msg": "x" * 100}).encode()
+    attachment = json.dumps({"id": "1", "data": {"base64": "eHl6"}}).encode()
+    plaintext = template.serialize(memoryview(body), [memoryview(attachment), attachment])
+    assert body in plaintext
+    message = Message.from_json(plaintext)
+    assert message.type == DEFAULT_MESSAGE_TYPE
+    assert message.frm is None and message.to is None
+    assert message.body == {"msg": "x" * 100}
+    assert message.attachments == [Attachment(id="1", data=AttachmentDataBase64(base64="eHl6"))] * 2
+
+    # a new id for each message
+    assert Message.from_json(template.serialize(body)).id != Message.from_json(template.serialize(body)).id
@@ -0,0 +1,98 @@
+from functools import partial
+
+import pytest
+from didcomm.errors import MalformedMessageError, MalformedMessageCode
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from peerdid.errors import MalformedPeerDIDError
+
+from didcomm_demo.didcomm_demo import DIDCommDemo, PackRequest
+from didcomm_demo.parallel import ParallelDIDComm
+
+
+@pytest.fixture()
+def secrets_file(tmp_path):
+    return tmp_path / "secrets.json"
+
+
+@pytest.fixture()
+def demo(secrets_file):
+    return DIDCommDemo(SecretsResolverDemo(secrets_file))
+
+
+@pytest.fixture()
+def did_frm(demo):
+    return demo.create_peer_did()
+
+
+@pytest.fixture()
+def did_to(demo):
+    return demo.create_peer_did()
+
+
+@pytest.fixture()
+def parallel(secrets_file, did_frm, did_to):
+    # the DIDs are created before the workers start, so the workers load their secrets
+    with ParallelDIDComm(partial(SecretsResolverDemo, secrets_file), max_workers=2) as parallel:
+        yield parallel
+
+
+def test_pack_unpack(parallel, did_frm, did_to):
+    packed = parallel.pack(msg="hello", frm=did_frm, to=did_to, sign_frm=did_frm)
+    unpacked_msg, frm, to, unpack_res = parallel.unpack(packed.packed_msg)
+    assert unpacked_msg == "hello"
+    assert frm == did_frm
+    assert to == did_to
+    assert unpack_res.metadata.non_repudiation is True
+
+
+@pytest.mark.asyncio
+async def test_pack_unpack_async(parallel, did_frm, did_to):
+    packed = await parallel.pack_async(msg="hello", frm=did_frm, to=did_to)
+    unpacked_msg, frm, to, _ = await parallel.unpack_async(packed.packed_msg)
+    assert unpacked_msg == "hello"
+    assert frm == did_frm
+    assert to == did_to
+
+
+def test_pack_many_unpack_many(parallel, demo, did_frm, did_to):
+    input_msgs = [f"msg-{i}" for i in range(10)]
+    requests = [PackRequest(msg=m, to=did_to, frm=did_frm) for m in input_msgs]
+
+    packed = parallel.pack_many(requests, chunksize=3)
+    unpacked = parallel.unpack_many([p.packed_msg for p in packed] + ["not a packed message"], chunksize=3)
+
+    assert isinstance(unpacked[-1], MalformedMessageError)
+    for input_msg, (unpacked_msg, frm, to, _) in zip(input_msgs, unpacked):
+        assert unpacked_msg == input_msg
+        assert frm == did_frm
+        assert to == did_to
+
+
+def test_errors_from_workers(parallel, demo, did_frm):
+    bad_did = "did:peer:0bad"
+    with pytest.raises(MalformedPeerDIDError) as expected:
+        demo.pack(msg="hello", frm=did_frm, to=bad_did)
+
+    with pytest.raises(MalformedPeerDIDError) as e:
+        parallel.pack(msg="hello", frm=did_frm, to=bad_did)
+    assert str(e.value) == str(expected.value)
+    [res] = parallel.pack_many([PackRequest(msg="hello", to=bad_did, frm=did_frm)])
+    assert type(res) is MalformedPeerDIDError
+    assert str(res) == str(expected.value)
+    with pytest.raises(MalformedMessageError) as e:
+        parallel.unpack("not a packed message")
+    assert e.value.code == MalformedMessageCode.INVALID_MESSAGE
+
+
+def test_restart_picks_up_new_secrets(parallel, demo, did_frm):
+    did_to = demo.create_peer_did()
+    packed = demo.pack(msg="hello", frm=did_frm, to=did_to)
+    parallel.restart()
+    unpacked_msg, _, to, _ = parallel.unpack(packed.packed_msg)
+    assert unpacked_msg == "hello"
+    assert to == did_to
+
+
+def test_default_secrets_resolver_same_as_demo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert ParallelDIDComm.__init__.__defaults__[0] is type(DIDCommDemo().secrets_resolver.secrets_resolver)
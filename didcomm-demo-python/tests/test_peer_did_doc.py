@@ -0,0 +1,103 @@
+import json
+
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from peerdid import peer_did
+from peerdid.errors import MalformedPeerDIDError
+from peerdid.types import VerificationMaterialFormatPeerDID
+
+from didcomm_demo.did_doc_cache import DIDDocCache
+from didcomm_demo.didcomm_demo import DIDCommDemo, generate_peer_did
+from didcomm_demo.peer_did_doc import resolve_peer_did_doc, resolve_peer_did_doc_json, clear_segment_caches, \
+    resolve_peer_dids, _decode_service
+
+DID_0 = "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V"
+DID_2 = "did:peer:2.Ez6LSbysY2xFMRpGMhb7tFTLMpeuPRaqaWM1yECx2AtzE3KCc.Vz6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V.Vz6MkgoLTnTypo3tDRwCkZXSccTPHRLhF4ZnjhueYAFpEX6vg.SeyJ0IjoiZG0iLCJzIjoiaHR0cHM6Ly9leGFtcGxlLmNvbS9lbmRwb2ludCIsInIiOlsiZGlkOmV4YW1wbGU6c29tZW1lZGlhdG9yI3NvbWVrZXkiXSwiYSI6WyJkaWRjb21tL3YyIiwiZGlkY29tbS9haXAyO2Vudj1yZmM1ODciXX0"
+
+
+@pytest.mark.parametrize("did", [
+    DID_0,
+    DID_2,
+    generate_peer_did(auth_keys_count=2, agreement_keys_count=3)[0],
+    generate_peer_did(agreement_keys_count=0, service_endpoint="http://localhost:8000/")[0],
+    generate_peer_did(service_endpoint="http://localhost:8000/", service_routing_keys=["did:example:m#1"])[0],
+])
+def test_same_as_json_path(did):
+    clear_segment_caches()
+    expected = resolve_peer_did_doc_json(did)
+    assert resolve_peer_did_doc(did) == expected
+    # and again from the memoized segments
+    assert resolve_peer_did_doc(did) == expected
+
+
+def test_shared_service_decoded_once():
+    clear_segment_caches()
+    dids = [
+        generate_peer_did(service_endpoint="http://mediator/", service_routing_keys=["did:example:m#1"])[0]
+        for _ in range(3)
+    ]
+    did_docs = [resolve_peer_did_doc(did) for did in dids]
+    assert _decode_service.cache_info().misses == 1
+    assert _decode_service.cache_info().hits == 2
+    assert [d.didcomm_services[0].id for d in did_docs] == [did + "#didcommmessaging-0" for did in dids]
+
+    # DID Docs don't share the decoded lists
+    did_docs[0].didcomm_services[0].routing_keys.append("did:example:m#2")
+    assert resolve_peer_did_doc(dids[1]).didcomm_services[0].routing_keys == ["did:example:m#1"]
+
+
+@pytest.mark.parametrize("did", [
+    "did:peer:1z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V",
+    # an agreement key used for authentication and vice versa
+    "did:peer:0z6LSbysY2xFMRpGMhb7tFTLMpeuPRaqaWM1yECx2AtzE3KCc",
+    "did:peer:2.Ez6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V",
+    # invalid base58 key
+    "did:peer:2.Vz6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7l",
+    # invalid service
+    "did:peer:2.Vz6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V.SeyJ0eXBlIjoiZG0ifQ",
+    "did:peer:2.Vz6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V.Sbm90anNvbg",
+])
+def test_malformed(did):
+    with pytest.raises(MalformedPeerDIDError) as expected:
+        resolve_peer_did_doc_json(did)
+    with pytest.raises(MalformedPeerDIDError) as e:
+        resolve_peer_did_doc(did)
+    assert str(e.value) == str(expected.value)
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_resolve_peer_dids(workers):
+    dids = [DID_0, "did:peer:0bad", DID_2, None, generate_peer_did()[0]]
+    cache = DIDDocCache()
+    results = list(resolve_peer_dids(iter(dids), format=VerificationMaterialFormatPeerDID.MULTIBASE, workers=workers,
+                                     batch_size=2, did_doc_cache=cache))
+    assert [did for did, _ in results] == dids
+    for did, res in results:
+        if did in (None, "did:peer:0bad"):
+            assert isinstance(res, MalformedPeerDIDError)
+            # the same message as in the parent process
+            assert str(res) == str(next(resolve_peer_dids([did]))[1])
+        else:
+            assert res == peer_did.resolve_peer_did(did, format=VerificationMaterialFormatPeerDID.MULTIBASE)
+            assert cache.get(did) == resolve_peer_did_doc(did)
+    assert cache.stats().size == 3
+
+
+@pytest.mark.parametrize("format", list(VerificationMaterialFormatPeerDID))
+def test_resolve_peer_dids_did_docs(format):
+    dids = [DID_0, DID_2, generate_peer_did(service_endpoint="http://localhost:8000/")[0]]
+    cache = DIDDocCache()
+    list(resolve_peer_dids(dids, format=format, did_doc_cache=cache))
+    for did in dids:
+        assert cache.get(did) == resolve_peer_did_doc(did)
+
+
+def test_demo_resolve_peer_dids(tmp_path):
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"))
+    did = demo.create_peer_did()
+    [(_, res)] = demo.resolve_peer_dids([did])
+    assert json.loads(res)["id"] == did
+    assert did not in demo.did_doc_cache
+
+    list(demo.resolve_peer_dids([did], populate_cache=True))
+    assert did in demo.did_doc_cache
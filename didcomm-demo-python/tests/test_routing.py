@@ -0,0 +1,139 @@
+import json
+
+import pytest
+from didcomm.errors import MalformedMessageError
+from didcomm.pack_encrypted import PackEncryptedConfig
+from didcomm.protocols.routing.forward import unpack_forward
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.mediator import LocalMediator
+
+
+@pytest.fixture()
+def new_demo(tmp_path):
+    count = 0
+
+    def new_demo(**kwargs):
+        nonlocal count
+        count += 1
+        return DIDCommDemo(SecretsResolverDemo(tmp_path / f"secrets{count}.json"), **kwargs)
+
+    return new_demo
+
+
+@pytest.mark.asyncio
+async def test_forward_one_mediator(new_demo):
+    alice, bob = new_demo(forward=True), new_demo()
+    mediator = await LocalMediator.create(new_demo())
+    did_alice = await alice.create_peer_did_async()
+    did_bob = await bob.create_peer_did_async(service_endpoint="https://mediator.example/",
+                                              service_routing_keys=[mediator.routing_key])
+
+    res = await alice.pack_async(msg="hello", to=did_bob, frm=did_alice)
+    assert json.loads(res.packed_msg)["recipients"][0]["header"]["kid"] == mediator.routing_key
+    assert res.service_metadata.service_endpoint == "https://mediator.example/"
+    # can be unwrapped by any mediator
+    fwd = await unpack_forward(mediator.demo.resolvers_config, res.packed_msg, True)
+    assert fwd.forward_msg.body.next == did_bob
+
+    await mediator.relay(res.packed_msg)
+    [packed_msg] = mediator.pickup(did_bob)
+    msg, frm, to, _ = await bob.unpack_async(packed_msg)
+    assert (msg, frm, to) == ("hello", did_alice, did_bob)
+    assert mediator.pickup(did_bob) == []
+
+
+@pytest.mark.asyncio
+async def test_forward_two_mediators(new_demo):
+    alice, bob = new_demo(forward=True), new_demo()
+    mediator1 = await LocalMediator.create(new_demo())
+    mediator2 = await LocalMediator.create(new_demo())
+    mediator1.add_route(mediator2)
+    did_bob = await bob.create_peer_did_async(service_endpoint="https://mediator.example/",
+                                              service_routing_keys=[mediator1.routing_key, mediator2.routing_key])
+
+    res = await alice.pack_async(msg="hello", to=did_bob)
+    await mediator1.relay(res.packed_msg)
+    assert mediator1.pickup(did_bob) == []
+    [packed_msg] = mediator2.pickup(did_bob)
+    assert (await bob.unpack_async(packed_msg))[0] == "hello"
+
+
+@pytest.mark.asyncio
+async def test_forward_routing_chain_cached(new_demo):
+    alice, bob = new_demo(forward=True), new_demo()
+    mediator = await LocalMediator.create(new_demo())
+    did_bob = await bob.create_peer_did_async(service_endpoint="https://mediator.example/",
+                                              service_routing_keys=[mediator.routing_key])
+
+    await alice.pack_async(msg="hello", to=did_bob)
+    chain = alice._routing_chains.get(did_bob)
+    assert [hop.next for hop in chain.hops] == [did_bob]
+    assert [key.kid for key in chain.hops[0].keys] == [mediator.routing_key]
+
+    await alice.pack_async(msg="hello again", to=did_bob)
+    assert alice._routing_chains.get(did_bob) is chain
+    alice.clear_routing_chains()
+    assert len(alice._routing_chains) == 0
+
+
+@pytest.mark.asyncio
+async def test_forward_routing_chains_bounded(new_demo):
+    alice, bob = new_demo(forward=True, routing_chain_cache_size=2), new_demo()
+    dids = [await bob.create_peer_did_async(service_endpoint="https://bob.example/") for _ in range(3)]
+
+    for did in dids:
+        await alice.pack_async(msg="hello", to=did)
+    assert len(alice._routing_chains) == 2
+    assert dids[0] not in alice._routing_chains
+
+
+@pytest.mark.asyncio
+async def test_forward_off(new_demo):
+    alice, bob = new_demo(forward=True), new_demo()
+    mediator = await LocalMediator.create(new_demo())
+    did_bob = await bob.create_peer_did_async(service_endpoint="https://mediator.example/",
+                                              service_routing_keys=[mediator.routing_key])
+
+    # off by default and when opted out by the config
+    for demo, config in [(new_demo(), None), (alice, PackEncryptedConfig(forward=False))]:
+        res = await demo.pack_async(msg="hello", to=did_bob, config=config)
+        assert (await bob.unpack_async(res.packed_msg))[0] == "hello"
+    assert config.forward is False
+
+
+@pytest.mark.asyncio
+async def test_forward_no_routing_keys(new_demo):
+    alice, bob = new_demo(forward=True), new_demo()
+    did_bob = await bob.create_peer_did_async(service_endpoint="https://bob.example/")
+
+    res = await alice.pack_async(msg="hello", to=did_bob)
+    assert (await bob.unpack_async(res.packed_msg))[0] == "hello"
+    assert alice._routing_chains.get(did_bob).hops == []
+
+
+@pytest.mark.asyncio
+async def test_relay_many(new_demo):
+    alice, bob = new_demo(forward=True), new_demo()
+    mediator = await LocalMediator.create(new_demo())
+    did_bob = await bob.create_peer_did_async(service_endpoint="https://mediator.example/",
+                                              service_routing_keys=[mediator.routing_key])
+
+    packed = [(await alice.pack_async(msg=f"hello {i}", to=did_bob)).packed_msg for i in range(3)]
+    not_forward = (await alice.pack_async(msg="hello", to=await mediator.demo.create_peer_did_async())).packed_msg
+    errors = await mediator.relay_many(packed + ["{}", not_forward])
+    assert errors[:3] == [None] * 3
+    assert all(isinstance(e, Exception) for e in errors[3:])
+
+    msgs = [(await bob.unpack_async(m))[0] for m in mediator.pickup(did_bob)]
+    assert sorted(msgs) == ["hello 0", "hello 1", "hello 2"]
+
+
+@pytest.mark.asyncio
+async def test_relay_not_forward(new_demo):
+    alice = new_demo()
+    mediator = await LocalMediator.create(new_demo())
+    res = await alice.pack_async(msg="hello", to=mediator.did)
+    with pytest.raises(MalformedMessageError):
+        await mediator.relay(res.packed_msg)
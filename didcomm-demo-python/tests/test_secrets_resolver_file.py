@@ -0,0 +1,62 @@
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, jwk_to_secret
+
+from didcomm_demo.didcomm_demo import DIDCommDemo, _run, add_secrets
+from didcomm_demo.secrets_resolver_file import SecretsResolverFile
+from didcomm_demo.server import DIDCommServer
+
+
+def new_secret(kid):
+    private_key, _ = generate_x25519_keys_as_jwk_dict()
+    private_key["kid"] = kid
+    return jwk_to_secret(private_key)
+
+
+@pytest.mark.asyncio
+async def test_writers_merge(tmp_path):
+    file_path = tmp_path / "secrets.json"
+    first = SecretsResolverFile(file_path)
+    second = SecretsResolverFile(file_path)
+
+    await first.add_key(new_secret("did:example:alice#key-1"))
+    await second.add_keys([new_secret("did:example:bob#key-1"), new_secret("did:example:bob#key-2")])
+    await first.add_key(new_secret("did:example:alice#key-2"))
+
+    kids = {"did:example:alice#key-1", "did:example:alice#key-2", "did:example:bob#key-1", "did:example:bob#key-2"}
+    assert set(await SecretsResolverDemo(file_path).get_kids()) == kids
+    # written by the other one after it was loaded
+    assert (await second.get_key("did:example:alice#key-2")).kid == "did:example:alice#key-2"
+    assert await second.get_keys(["did:example:alice#key-2", "did:example:carol#key-1"]) == ["did:example:alice#key-2"]
+    assert await second.get_key("did:example:carol#key-1") is None
+
+
+@pytest.mark.asyncio
+async def test_add_secrets_single_write(tmp_path, monkeypatch):
+    secrets_resolver = SecretsResolverFile(tmp_path / "secrets.json")
+    demo = DIDCommDemo(secrets_resolver)
+    saves = []
+    save = secrets_resolver._save
+    monkeypatch.setattr(secrets_resolver, "_save", lambda: saves.append(1) or save())
+
+    secrets = [new_secret(f"did:example:alice#key-{i}") for i in range(3)]
+    await add_secrets(demo.secrets_resolver, secrets)
+    assert len(saves) == 1
+    assert set(await SecretsResolverDemo(tmp_path / "secrets.json").get_kids()) == {s.kid for s in secrets}
+
+
+def test_server_keeps_secrets_of_local_commands(tmp_path):
+    file_path = tmp_path / "secrets.json"
+    server = DIDCommServer(DIDCommDemo(SecretsResolverFile(file_path)))
+    local = DIDCommDemo(SecretsResolverFile(file_path))
+
+    local_dids = list(local.create_peer_dids(3))
+    server_did = _run(server.handle({"command": "create-peer-did", "args": {}}))["did"]
+
+    kids = set(_run(SecretsResolverDemo(file_path).get_kids()))
+    for did in local_dids + [server_did]:
+        assert any(kid.startswith(did) for kid in kids)
+    # and the server can unpack messages to the DIDs created locally
+    packed_msg = local.pack("hello", to=local_dids[0], frm=local_dids[1]).packed_msg
+    res = _run(server.handle({"command": "unpack", "args": {"packed_msg": packed_msg}}))
+    assert res == {"msg": "hello", "frm": local_dids[1], "to": local_dids[0]}
@@ -0,0 +1,151 @@
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, jwk_to_secret
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.secrets_resolver_indexed import SecretsResolverIndexed, BloomFilter
+from didcomm_demo.secrets_resolver_sqlite import SecretsResolverSqlite
+
+
+def new_secret(kid):
+    private_key, _ = generate_x25519_keys_as_jwk_dict()
+    private_key["kid"] = kid
+    return jwk_to_secret(private_key)
+
+
+class CountingSecretsResolver(SecretsResolverSqlite):
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self.get_key_calls = 0
+        self.get_keys_calls = 0
+
+    async def get_key(self, kid):
+        self.get_key_calls += 1
+        return await super().get_key(kid)
+
+    async def get_keys(self, kids):
+        self.get_keys_calls += 1
+        return await super().get_keys(kids)
+
+
+@pytest.fixture()
+def store(tmp_path):
+    store = CountingSecretsResolver(tmp_path / "secrets.db")
+    yield store
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_set_index(store):
+    await store.add_keys([new_secret(f"did:example:alice#key-{i}") for i in range(3)])
+    resolver = SecretsResolverIndexed(store)
+
+    kids = [f"did:example:alice#key-{i}" for i in range(5)][::-1]
+    assert await resolver.get_keys(kids) == kids[2:]
+    assert await resolver.get_key("did:example:unknown#key-1") is None
+    assert (await resolver.get_key("did:example:alice#key-1")).kid == "did:example:alice#key-1"
+    # the store is only read for owned kids
+    assert store.get_keys_calls == 0
+    assert store.get_key_calls == 1
+
+    await resolver.add_keys([new_secret("did:example:alice#key-3")])
+    await resolver.add_key(new_secret("did:example:alice#key-4"))
+    assert await resolver.get_keys(kids) == kids
+    assert await store.get_keys(kids) == kids
+
+
+@pytest.mark.asyncio
+async def test_bloom_filter_index(store):
+    await store.add_keys([new_secret(f"did:example:alice#key-{i}") for i in range(3)])
+    resolver = SecretsResolverIndexed(store, bloom_filter_size=1024)
+
+    assert await resolver.get_keys([f"did:example:bob#key-{i}" for i in range(10)]) == []
+    assert store.get_keys_calls == 0
+    assert await resolver.get_keys(["did:example:bob#key-1", "did:example:alice#key-2"]) == ["did:example:alice#key-2"]
+    assert store.get_keys_calls == 1
+
+    await resolver.add_key(new_secret("did:example:alice#key-3"))
+    assert await resolver.get_keys(["did:example:alice#key-3"]) == ["did:example:alice#key-3"]
+
+
+@pytest.mark.asyncio
+async def test_bloom_filter_false_positives_confirmed(store):
+    # a single bit: everything passes the filter and is confirmed by the store
+    await store.add_keys([new_secret("did:example:alice#key-1")])
+    resolver = SecretsResolverIndexed(store, bloom_filter_size=1)
+    assert await resolver.get_keys(["did:example:bob#key-1", "did:example:alice#key-1"]) == ["did:example:alice#key-1"]
+    assert await resolver.get_key("did:example:bob#key-1") is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bloom_filter_size", [None, 1 << 16])
+async def test_unknown_kids_not_looked_up(store, bloom_filter_size):
+    await store.add_keys([new_secret(f"did:example:alice#key-{i}") for i in range(3)])
+    resolver = SecretsResolverIndexed(store, bloom_filter_size=bloom_filter_size)
+
+    unknown = [f"did:example:bob#key-{i}" for i in range(1000)]
+    for kid in unknown:
+        assert await resolver.get_key(kid) is None
+    assert await resolver.get_keys(unknown) == []
+    assert store.get_key_calls == 0
+    assert store.get_keys_calls == 0
+    # an owned kid is read from the store once
+    assert (await resolver.get_key("did:example:alice#key-1")).kid == "did:example:alice#key-1"
+    assert store.get_key_calls == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bloom_filter_size", [None, 1024])
+async def test_shared_store(store, bloom_filter_size):
+    resolver = SecretsResolverIndexed(store, bloom_filter_size=bloom_filter_size)
+    other = SecretsResolverIndexed(store, bloom_filter_size=bloom_filter_size)
+    await other.add_key(new_secret("did:example:alice#key-1"))
+    assert await resolver.get_keys(["did:example:bob#key-1"]) == []
+
+    # added through the other resolver after the index of this one was loaded
+    await other.add_key(new_secret("did:example:alice#key-2"))
+    kids = ["did:example:bob#key-1", "did:example:alice#key-2", "did:example:alice#key-1"]
+    assert await resolver.get_keys(kids) == kids[1:]
+    assert (await resolver.get_key("did:example:alice#key-2")).kid == "did:example:alice#key-2"
+
+
+@pytest.mark.asyncio
+async def test_store_written_by_other_connection(store, tmp_path):
+    resolver = SecretsResolverIndexed(store)
+    assert await resolver.get_keys(["did:example:alice#key-1"]) == []
+
+    other = SecretsResolverSqlite(tmp_path / "secrets.db")
+    await other.add_key(new_secret("did:example:alice#key-1"))
+    other.close()
+    assert await resolver.get_keys(["did:example:alice#key-1"]) == ["did:example:alice#key-1"]
+
+
+def test_demos_sharing_store(tmp_path):
+    resolver = SecretsResolverDemo(tmp_path / "secrets.json")
+    demo_a = DIDCommDemo(resolver)
+    demo_b = DIDCommDemo(resolver)
+    did_frm = demo_a.create_peer_did()
+    demo_b.unpack(demo_a.pack("hello", to=demo_a.create_peer_did()).packed_msg)
+
+    did_to = demo_a.create_peer_did()
+    packed_msg = demo_a.pack("hello", to=did_to, frm=did_frm).packed_msg
+    assert demo_b.unpack(packed_msg)[:3] == ("hello", did_frm, did_to)
+
+
+def test_bloom_filter():
+    bloom_filter = BloomFilter(4096)
+    items = [f"did:example:alice#key-{i}" for i in range(100)]
+    for item in items:
+        bloom_filter.add(item)
+    assert all(item in bloom_filter for item in items)
+    assert sum(f"did:example:bob#key-{i}" in bloom_filter for i in range(1000)) < 50
+    with pytest.raises(ValueError):
+        BloomFilter(0)
+
+
+def test_demo_resolver_indexed(tmp_path):
+    resolver = SecretsResolverDemo(tmp_path / "secrets.json")
+    demo = DIDCommDemo(resolver)
+    assert isinstance(demo.secrets_resolver, SecretsResolverIndexed)
+    assert DIDCommDemo(demo.secrets_resolver).secrets_resolver is demo.secrets_resolver
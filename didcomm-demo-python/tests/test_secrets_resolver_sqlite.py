@@ -0,0 +1,82 @@
+import pytest
+from click.testing import CliRunner
+from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, jwk_to_secret
+
+from didcomm_demo.didcomm_cli import set_secrets_resolver, cli
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.secrets_resolver_sqlite import SecretsResolverSqlite
+
+
+@pytest.fixture()
+def secrets_resolver(tmp_path):
+    secrets_resolver = SecretsResolverSqlite(tmp_path / "secrets.db")
+    yield secrets_resolver
+    secrets_resolver.close()
+
+
+def new_secret(kid):
+    private_key, _ = generate_x25519_keys_as_jwk_dict()
+    private_key["kid"] = kid
+    return jwk_to_secret(private_key)
+
+
+@pytest.mark.asyncio
+async def test_add_get(secrets_resolver):
+    secret = new_secret("did:example:alice#key-1")
+    await secrets_resolver.add_key(secret)
+    await secrets_resolver.add_keys([new_secret(f"did:example:bob#key-{i}") for i in range(3)])
+
+    assert await secrets_resolver.get_key("did:example:alice#key-1") == secret
+    assert await secrets_resolver.get_key("did:example:unknown#key-1") is None
+    assert await secrets_resolver.get_kids() == [
+        "did:example:alice#key-1", "did:example:bob#key-0", "did:example:bob#key-1", "did:example:bob#key-2"
+    ]
+    assert await secrets_resolver.get_keys(
+        ["did:example:bob#key-2", "did:example:unknown#key-1", "did:example:alice#key-1"]
+    ) == ["did:example:bob#key-2", "did:example:alice#key-1"]
+
+
+@pytest.mark.asyncio
+async def test_get_keys_many(secrets_resolver):
+    kids = [f"did:example:alice#key-{i}" for i in range(1200)]
+    await secrets_resolver.add_keys([new_secret(kid) for kid in kids[::2]])
+    assert await secrets_resolver.get_keys(kids) == kids[::2]
+
+
+@pytest.mark.asyncio
+async def test_persisted(tmp_path):
+    secret = new_secret("did:example:alice#key-1")
+    secrets_resolver = SecretsResolverSqlite(tmp_path / "secrets.db")
+    await secrets_resolver.add_key(secret)
+    secrets_resolver.close()
+
+    secrets_resolver = SecretsResolverSqlite(tmp_path / "secrets.db")
+    assert await secrets_resolver.get_key("did:example:alice#key-1") == secret
+    secrets_resolver.close()
+
+
+def test_demo(secrets_resolver):
+    demo = DIDCommDemo(secrets_resolver)
+    did_frm = demo.create_peer_did(auth_keys_count=2, agreement_keys_count=2)
+    did_to = demo.create_peer_did(auth_keys_count=1, agreement_keys_count=3)
+
+    packed = demo.pack(msg="hello", frm=did_frm, to=did_to, sign_frm=did_frm)
+    unpacked_msg, frm, to, _ = demo.unpack(packed.packed_msg)
+    assert unpacked_msg == "hello"
+    assert frm == did_frm
+    assert to == did_to
+
+
+def test_cli(secrets_resolver):
+    set_secrets_resolver(secrets_resolver)
+    runner = CliRunner()
+    result = runner.invoke(cli, ['create-peer-did', '--auth-keys-count=1', '--agreement-keys-count=2'])
+    assert result.exit_code == 0
+    did = result.output.strip()
+
+    result = runner.invoke(cli, ['pack', 'hello', f'--to={did}'])
+    assert result.exit_code == 0
+    result = runner.invoke(cli, ['unpack', result.output.strip()])
+    assert result.exit_code == 0
+    assert "hello" in result.output
+    assert did in result.output
@@ -0,0 +1,167 @@
+import asyncio
+import io
+import json
+import threading
+
+import pytest
+from click.testing import CliRunner
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from peerdid.peer_did import is_peer_did
+
+from didcomm_demo.didcomm_cli import set_secrets_resolver, cli
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.client import DIDCommClient
+from didcomm_demo.server import DIDCommServer
+from tests.common import get_secret_resolver_kids
+
+
+@pytest.fixture()
+def server(tmp_path):
+    return DIDCommServer(DIDCommDemo(SecretsResolverDemo(tmp_path / "server-secrets.json")))
+
+
+@pytest.fixture()
+def socket_path(server, tmp_path):
+    path = str(tmp_path / "didcomm.sock")
+    loop = asyncio.new_event_loop()
+    unix_server = loop.run_until_complete(server.start_unix(path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield path
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    unix_server.close()
+    loop.run_until_complete(unix_server.wait_closed())
+    loop.close()
+
+
+@pytest.mark.asyncio
+async def test_pack_unpack(server):
+    did_frm = (await server.handle({"command": "create-peer-did", "args": {}}))["did"]
+    did_to = (await server.handle({"command": "create-peer-did", "args": {"agreement_keys_count": 2}}))["did"]
+    assert is_peer_did(did_frm) and is_peer_did(did_to)
+
+    res = await server.handle({"id": 7, "command": "pack", "args": {"msg": "hello", "to": did_to, "frm": did_frm}})
+    assert res["id"] == 7
+    res = await server.handle({"command": "unpack", "args": {"packed_msg": res["packed_msg"]}})
+    assert res == {"msg": "hello", "frm": did_frm, "to": did_to}
+
+
+@pytest.mark.asyncio
+async def test_pack_modes(server):
+    did_frm = (await server.handle({"command": "create-peer-did", "args": {}}))["did"]
+    dids_to = [(await server.handle({"command": "create-peer-did", "args": {}}))["did"] for _ in range(2)]
+
+    res = await server.handle({"command": "pack", "args": {"msg": "hello", "sign_frm": did_frm, "mode": "signed"}})
+    res = await server.handle({"command": "unpack", "args": {"packed_msg": res["packed_msg"]}})
+    assert res == {"msg": "hello", "frm": did_frm, "to": None, "signed": True}
+
+    res = await server.handle({"command": "pack", "args": {"msg": "hello", "to": dids_to[0], "mode": "plaintext"}})
+    res = await server.handle({"command": "unpack", "args": {"packed_msg": res["packed_msg"]}})
+    assert res == {"msg": "hello", "frm": None, "to": dids_to[0], "signed": False}
+
+    res = await server.handle({"command": "pack", "args": {"msg": "hello", "to": dids_to, "frm": did_frm,
+                                                           "sign_frm": did_frm, "sign_once": True}})
+    for did_to, r in zip(dids_to, res["results"]):
+        r = await server.handle({"command": "unpack", "args": {"packed_msg": r["packed_msg"]}})
+        assert r == {"msg": "hello", "frm": did_frm, "to": did_to}
+
+    res = await server.handle({"command": "pack", "args": {"msg": "hello", "mode": "unknown"}})
+    assert "error" in res
+
+
+@pytest.mark.asyncio
+async def test_errors(server):
+    res = await server.handle({"command": "resolve-peer-did", "args": {"did": "did:peer:0invalid"}})
+    assert "error" in res
+    res = await server.handle({"command": "unpack", "args": {"packed_msg": "{}"}})
+    assert "error" in res
+    res = await server.handle({"id": 1, "command": "unknown"})
+    assert res == {"id": 1, "error": "Unknown command: unknown"}
+    res = await server.handle({"command": "pack", "args": {}})
+    assert "error" in res
+    assert "error" in json.loads(await server.handle_line("not json"))
+
+
+def test_serve_stdio(server):
+    output = io.StringIO()
+    server.serve_stdio(io.StringIO('{"id": 1, "command": "ping"}\n\n{"id": 2, "command": "create-peer-did"}\n'), output)
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert responses[0] == {"id": 1}
+    assert responses[1]["id"] == 2
+    assert is_peer_did(responses[1]["did"])
+
+
+def test_client(socket_path):
+    with DIDCommClient.connect(socket_path) as client:
+        did = client.call("create-peer-did", agreement_keys_count=1)["did"]
+        res = client.call("pack", msg="hello", to=[did, did])
+        assert len(res["results"]) == 2
+        assert client.call("unpack", packed_msg=res["results"][1]["packed_msg"])["msg"] == "hello"
+
+
+def test_client_large_request(socket_path):
+    # over the default 64 KiB stream limit (and under the 256 kB segment limit of authlib)
+    msg = "x" * 100_000
+    with DIDCommClient.connect(socket_path) as client:
+        did = client.call("create-peer-did")["did"]
+        res = client.call("pack", msg=msg, to=did)
+        assert client.call("unpack", packed_msg=res["packed_msg"])["msg"] == msg
+
+
+@pytest.mark.asyncio
+async def test_request_too_long(tmp_path):
+    server = DIDCommServer(DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json")), max_request_size=1024)
+    path = str(tmp_path / "didcomm.sock")
+    unix_server = await server.start_unix(path)
+    try:
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(json.dumps({"id": 1, "command": "ping", "args": {"x": "x" * 2048}}).encode() + b"\n")
+        await writer.drain()
+        assert "error" in json.loads(await reader.readline())
+        assert await reader.readline() == b""
+        writer.close()
+    finally:
+        unix_server.close()
+        await unix_server.wait_closed()
+
+
+def test_client_not_running(tmp_path):
+    assert DIDCommClient.connect(str(tmp_path / "missing.sock")) is None
+
+
+def test_cli_forwards_to_server(server, socket_path, tmp_path):
+    cli_secrets_resolver = SecretsResolverDemo(tmp_path / "cli-secrets.json")
+    set_secrets_resolver(cli_secrets_resolver)
+    runner = CliRunner()
+
+    result = runner.invoke(cli, [f'--socket={socket_path}', 'create-peer-did'])
+    assert result.exit_code == 0
+    did = result.output.strip()
+    assert is_peer_did(did)
+    # the secrets are kept by the server
+    assert get_secret_resolver_kids(cli_secrets_resolver) == []
+    assert len(get_secret_resolver_kids(server.demo.secrets_resolver)) == 2
+
+    result = runner.invoke(cli, ['pack', 'hello', f'--to={did}'], env={"DIDCOMM_CLI_SOCKET": socket_path})
+    assert result.exit_code == 0
+    result = runner.invoke(cli, [f'--socket={socket_path}', 'unpack', result.output.strip()])
+    assert result.exit_code == 0
+    assert result.output.strip() == f"anoncrypted hello to {did}"
+
+
+def test_cli_falls_back_to_local(tmp_path):
+    secrets_resolver = SecretsResolverDemo(tmp_path / "secrets.json")
+    set_secrets_resolver(secrets_resolver)
+    runner = CliRunner()
+    result = runner.invoke(cli, [f'--socket={tmp_path / "missing.sock"}', 'create-peer-did'])
+    assert result.exit_code == 0
+    assert len(get_secret_resolver_kids(secrets_resolver)) == 2
+
+
+def test_cli_serve_stdio(tmp_path):
+    set_secrets_resolver(SecretsResolverDemo(tmp_path / "secrets.json"))
+    runner = CliRunner()
+    result = runner.invoke(cli, ['serve'], input='{"id": "a", "command": "ping"}\n')
+    assert result.exit_code == 0
+    assert json.loads(result.output) == {"id": "a"}
@@ -0,0 +1,131 @@
+import io
+import mmap
+import os
+import tracemalloc
+
+import pytest
+from didcomm.errors import MalformedMessageError
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.streaming import encrypt_stream, decrypt_stream, StreamKey, ENCRYPTED_CONTENT_TYPE, MAX_CHUNK_SIZE
+
+CHUNK_SIZE = 64
+
+
+def encrypt(content: bytes, chunk_size: int = CHUNK_SIZE):
+    encrypted = io.BytesIO()
+    stream_key = encrypt_stream(io.BytesIO(content), encrypted, chunk_size)
+    return stream_key, encrypted.getvalue()
+
+
+def decrypt(encrypted: bytes, stream_key) -> bytes:
+    dst = io.BytesIO()
+    assert decrypt_stream(io.BytesIO(encrypted), dst, stream_key) == stream_key.size
+    return dst.getvalue()
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 5 * CHUNK_SIZE])
+def test_encrypt_decrypt(size):
+    content = os.urandom(size)
+    stream_key, encrypted = encrypt(content)
+    assert stream_key.size == size
+    assert len(encrypted) == size + (size // CHUNK_SIZE + 1) * 16
+    assert decrypt(encrypted, stream_key) == content
+
+
+def test_tampered():
+    stream_key, encrypted = encrypt(os.urandom(3 * CHUNK_SIZE + 10))
+    chunk = CHUNK_SIZE + 16
+    tampered = [
+        encrypted[:5] + bytes([encrypted[5] ^ 1]) + encrypted[6:],
+        # truncated at a chunk boundary, chunks swapped, data appended
+        encrypted[:3 * chunk],
+        encrypted[chunk:2 * chunk] + encrypted[:chunk] + encrypted[2 * chunk:],
+        encrypted + b"x",
+    ]
+    for encrypted in tampered:
+        with pytest.raises(MalformedMessageError):
+            decrypt(encrypted, stream_key)
+
+
+def test_mmap_source(tmp_path):
+    content = os.urandom(10 * CHUNK_SIZE + 3)
+    (tmp_path / "content").write_bytes(content)
+    with open(tmp_path / "content", "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        with open(tmp_path / "content.enc", "wb") as dst:
+            stream_key = encrypt_stream(m, dst, CHUNK_SIZE)
+    assert decrypt((tmp_path / "content.enc").read_bytes(), stream_key) == content
+
+
+@pytest.mark.parametrize("authcrypt", [True, False])
+def test_pack_unpack_file(tmp_path, authcrypt):
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"))
+    did_frm = demo.create_peer_did() if authcrypt else None
+    did_to = demo.create_peer_did()
+    content = os.urandom(1000)
+    encrypted = io.BytesIO()
+    res = demo.pack_file(io.BytesIO(content), encrypted, to=did_to, frm=did_frm, chunk_size=CHUNK_SIZE,
+                         link=str(tmp_path / "content.enc"), filename="content")
+    (tmp_path / "content.enc").write_bytes(encrypted.getvalue())
+
+    dst = io.BytesIO()
+    msg, frm, to, unpack_res = demo.unpack_file(res.packed_msg, io.BytesIO(encrypted.getvalue()), dst)
+    assert (msg, frm, to) == (None, did_frm, did_to)
+    assert dst.getvalue() == content
+    assert unpack_res.message.type == ENCRYPTED_CONTENT_TYPE
+    [attachment] = unpack_res.message.attachments
+    assert (attachment.filename, attachment.byte_count) == ("content", 1000)
+    assert attachment.data.links == [str(tmp_path / "content.enc")]
+
+    # read from the linked file inside the content directory
+    dst = io.BytesIO()
+    demo.unpack_file(res.packed_msg, None, dst, content_dir=str(tmp_path))
+    assert dst.getvalue() == content
+
+    # not an encrypted content message
+    with pytest.raises(MalformedMessageError):
+        demo.unpack_file(demo.pack("hello", to=did_to).packed_msg, None, io.BytesIO(), content_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("link", ["/dev/zero", "../content.enc", "../secrets.json"])
+def test_unpack_file_link_outside_content_dir(tmp_path, link):
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"))
+    did_to = demo.create_peer_did()
+    (tmp_path / "content").mkdir()
+    res = demo.pack_file(io.BytesIO(b"content"), io.BytesIO(), to=did_to, link=link)
+
+    with pytest.raises(ValueError):
+        demo.unpack_file(res.packed_msg, None, io.BytesIO())
+    with pytest.raises(MalformedMessageError):
+        demo.unpack_file(res.packed_msg, None, io.BytesIO(), content_dir=str(tmp_path / "content"))
+
+
+def test_chunk_size_limited():
+    stream_key = encrypt_stream(io.BytesIO(b"content"), io.BytesIO())
+    for chunk_size in (0, MAX_CHUNK_SIZE + 1):
+        with pytest.raises(MalformedMessageError):
+            StreamKey.from_dict({**stream_key.as_dict(), "chunk_size": chunk_size}, stream_key.hash)
+        with pytest.raises(ValueError):
+            encrypt_stream(io.BytesIO(b"content"), io.BytesIO(), chunk_size)
+    assert StreamKey.from_dict({**stream_key.as_dict(), "chunk_size": MAX_CHUNK_SIZE}, stream_key.hash)
+
+
+def test_bounded_memory(tmp_path):
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"))
+    did_to = demo.create_peer_did()
+    with open(tmp_path / "content", "wb") as f:
+        for _ in range(16):
+            f.write(os.urandom(1024 * 1024))
+
+    tracemalloc.start()
+    try:
+        with open(tmp_path / "content", "rb") as src, open(tmp_path / "content.enc", "wb") as dst:
+            res = demo.pack_file(src, dst, to=did_to, chunk_size=64 * 1024)
+        with open(tmp_path / "content.enc", "rb") as src, open(tmp_path / "content.out", "wb") as dst:
+            demo.unpack_file(res.packed_msg, src, dst)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 2 * 1024 * 1024
+    assert (tmp_path / "content.out").read_bytes() == (tmp_path / "content").read_bytes()
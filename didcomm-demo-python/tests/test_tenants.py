@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from didcomm.errors import DIDCommError
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+import didcomm_demo.tenants
+from didcomm_demo.tenants import MultiTenantDIDComm
+
+
+@pytest.fixture()
+def created():
+    return []
+
+
+@pytest.fixture()
+def factory(tmp_path, created):
+    def factory(tenant_id):
+        created.append(tenant_id)
+        return SecretsResolverDemo(tmp_path / f"{tenant_id}.json")
+
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_tenants_isolated(factory):
+    tenants = MultiTenantDIDComm(factory)
+    did_alice = await tenants.create_peer_did_async("alice")
+    did_bob = await tenants.create_peer_did_async("bob")
+
+    packed = await tenants.pack_async("alice", msg="hello", to=did_bob, frm=did_alice)
+    assert (await tenants.unpack_async("bob", packed.packed_msg))[:3] == ("hello", did_alice, did_bob)
+    with pytest.raises(DIDCommError):
+        await tenants.unpack_async("alice", packed.packed_msg)
+    [res] = await tenants.unpack_many_async("alice", [packed.packed_msg])
+    assert isinstance(res, DIDCommError)
+
+    # the DID Doc cache is shared
+    assert tenants.tenant("alice").did_doc_cache is tenants.tenant("bob").did_doc_cache
+    assert did_alice in tenants.did_doc_cache and did_bob in tenants.did_doc_cache
+
+
+@pytest.mark.asyncio
+async def test_evict_lru(factory, created):
+    tenants = MultiTenantDIDComm(factory, max_tenants=2)
+    did_alice = await tenants.create_peer_did_async("alice")
+    did_bob = await tenants.create_peer_did_async("bob")
+    tenants.tenant("alice")
+    await tenants.create_peer_did_async("carol")
+    assert "bob" not in tenants and "alice" in tenants and len(tenants) == 2
+    assert tenants.evictions == 1
+
+    # reloaded from its store
+    packed = await tenants.pack_async("alice", msg="hello", to=did_bob, frm=did_alice)
+    assert (await tenants.unpack_async("bob", packed.packed_msg))[0] == "hello"
+    assert created == ["alice", "bob", "carol", "bob"]
+
+    tenants.evict("bob")
+    assert "bob" not in tenants
+
+
+@pytest.mark.asyncio
+async def test_evict_idle(factory, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(didcomm_demo.tenants, "monotonic", lambda: now[0])
+    tenants = MultiTenantDIDComm(factory, idle_timeout=10)
+    tenants.tenant("alice")
+    now[0] += 5
+    tenants.tenant("bob")
+    now[0] += 6
+    tenants.evict_idle()
+    assert "alice" not in tenants and "bob" in tenants
+    now[0] += 11
+    tenants.tenant("carol")
+    assert "bob" not in tenants and "carol" in tenants
+
+
+def test_max_tenants():
+    with pytest.raises(ValueError):
+        MultiTenantDIDComm(SecretsResolverDemo, max_tenants=0)
+
+
+@pytest.mark.asyncio
+async def test_shared_executor(factory):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        tenants = MultiTenantDIDComm(factory, executor=executor)
+        did_alice = await tenants.create_peer_did_async("alice")
+        did_bob = await tenants.create_peer_did_async("bob")
+        packed = await tenants.pack_async("alice", msg="hello", to=did_bob, frm=did_alice)
+        assert (await tenants.unpack_async("bob", packed.packed_msg))[:3] == ("hello", did_alice, did_bob)
+
+
+def test_tenant_loaded_outside_lock(factory):
+    loading, loaded = threading.Event(), threading.Event()
+
+    def slow_factory(tenant_id):
+        if tenant_id == "slow":
+            loading.set()
+            assert loaded.wait(timeout=5)
+        return factory(tenant_id)
+
+    tenants = MultiTenantDIDComm(slow_factory)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        slow = executor.submit(tenants.tenant, "slow")
+        assert loading.wait(timeout=5)
+        # other tenants are served while "slow" is being loaded
+        tenants.create_peer_did("alice")
+        assert "alice" in tenants and "slow" not in tenants
+        loaded.set()
+        assert slow.result() is tenants.tenant("slow")